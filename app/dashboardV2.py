@@ -1,10 +1,23 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
 import plotly.express as px
+import os
+import sys
+import threading
+import time
 from datetime import datetime, timedelta
 
+# Accès aux modules du projet (src/) quand on lance `streamlit run app/dashboardV2.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import dashboard_data, instrumentation, live_feed, scenario_cube, storage
+
+# Mode diagnostic (case de la sidebar) : chronométrage des étapes de ce rerun, activé pour
+# le seul thread de cette session. Désactivé, l'instrumentation ne mesure rien (cf. src.instrumentation)
+debug_mode = st.session_state.get("debug", False)
+spans_rerun = instrumentation.collect(debug_mode)
+t0_rerun = time.perf_counter()
+
 # ==========================================
 # 1. CONFIGURATION & STYLE (TON DESIGN PRÉFÉRÉ)
 # ==========================================
@@ -64,87 +77,54 @@ st.markdown("""
 # ==========================================
 # 2. MOTEUR DE DONNÉES (2018-2026 + SCÉNARIOS)
 # ==========================================
-@st.cache_data
-def load_data():
-    # Génération longue durée pour "Explorer les tendances"
-    start_date = datetime(2018, 1, 1)
-    end_date = datetime(2026, 12, 31)
-    dates = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    data = []
-    for date in dates:
-        # Tendance +5/an
-        year_trend = (date.year - 2018) * 5 
-        # Saisonnalité Hiver
-        day_of_year = date.timetuple().tm_yday
-        seasonality = np.cos((day_of_year / 365) * 2 * np.pi) * 40 
-        # Pic Covid 2020-21
-        covid = 50 if 2020 <= date.year <= 2021 else 0
-        
-        base_flux = int(300 + year_trend + seasonality + covid + np.random.normal(0, 15))
-        data.append({'date': date, 'flux_base': base_flux})
-    
-    return pd.DataFrame(data)
+# Service de prévision : modèle persisté chargé une fois par processus, requêtes
+# mémoïsées (LRU/TTL) et rechargement automatique si un nouveau modèle ou de
+# nouvelles données arrivent
+# Un service par site (None = site principal). Sans modèle entraîné, service de repli
+# (prévisions précalculées) : xgboost n'est importé que si un modèle est présent
+@st.cache_resource
+def _forecast_service(site, modele):
+    if not modele:
+        return dashboard_data.PrecomputedService(site)
+    from src import forecast_service
+    if site is None:
+        return forecast_service.ForecastService()
+    return forecast_service.site_service(site)
+
+def get_forecast_service(site=None):
+    return _forecast_service(site, dashboard_data.model_trained(site))
+
+# Série indexée par version du service : recalculée seulement quand la version change.
+# Sans modèle ni prévision précalculée : série synthétique seedée (data/cache), site principal seulement
+@st.cache_resource(max_entries=8)
+def load_data(site, version):
+    service = get_forecast_service(site)
+    if service.available:
+        return dashboard_data.load_forecast_history(service)
+    if site is not None:
+        return pd.DataFrame()
+    # Génération longue durée pour "Explorer les tendances" (2018-2026)
+    return dashboard_data.load_flux_history()
+
+# Seuils d'alerte : quantiles du notebook 03 tenus à jour jour après jour (src.thresholds)
+@st.cache_resource(max_entries=8)
+def load_thresholds(site, version):
+    return dashboard_data.load_alert_thresholds(get_forecast_service(site))
 
 # Recalcul dynamique de l'alerte selon les sliders
-def calculate_alert_level(flux_total):
-    if flux_total > 410: return "CRITIQUE"
-    elif flux_total > 370: return "ALERTE"
-    elif flux_total > 330: return "PRE-ALERTE"
-    else: return "NORMAL"
-
-# Générateur de la vue Lits/Personnel/Matériel
-def generate_operational_view(total_flux, alerte_level, sim_rh_percent):
-    services = ['Urgences', 'Pneumologie', 'Infectieux', 'Gériatrie', 'Chirurgie']
-    capacite_totale = {'Urgences': 120, 'Pneumologie': 100, 'Infectieux': 80, 'Gériatrie': 200, 'Chirurgie': 350}
-    flux_weights = [0.45, 0.15, 0.10, 0.20, 0.10]
-    
-    # Absentéisme de base (selon alerte) + SURCHARGE SIMULÉE (Grève, Epidémie)
-    abs_base = 0.10
-    if alerte_level == "ALERTE": abs_base = 0.15
-    if alerte_level == "CRITIQUE": abs_base = 0.20
-    
-    abs_total = abs_base + (sim_rh_percent / 100.0)
-    if abs_total > 1.0: abs_total = 1.0
-
-    np.random.seed(int(total_flux)) 
-
-    data = []
-    for i, svc in enumerate(services):
-        # Répartition Patients
-        patients = int(total_flux * flux_weights[i])
-        
-        # Impact RH (Lits fermés)
-        taux_abs_svc = abs_total + np.random.uniform(-0.02, 0.05)
-        if taux_abs_svc < 0: taux_abs_svc = 0
-        
-        lits_totaux = capacite_totale[svc]
-        lits_fermes = int(lits_totaux * taux_abs_svc)
-        lits_ouverts = lits_totaux - lits_fermes
-        
-        # Dispo & Occupation
-        lits_dispos = lits_ouverts - patients
-        if lits_dispos < 0: lits_dispos = 0
-        
-        if lits_ouverts > 0:
-            taux_occ = (patients / lits_ouverts) * 100
-        else:
-            taux_occ = 100
-        if taux_occ > 100: taux_occ = 100
-
-        data.append({
-            "Service": svc,
-            "Capacité Totale": lits_totaux,
-            "Lits Fermés (RH)": lits_fermes, # KPI Clé pour "Prévision Besoins Personnel"
-            "Lits Occupés": patients,
-            "Lits Dispos": lits_dispos,      # KPI Clé pour "Prévision Besoins Lits"
-            "Taux Occ. %": round(taux_occ, 1),
-            "CCMU Moyen": round(np.random.uniform(2.1, 3.8), 1)
-        })
-        
-    return pd.DataFrame(data)
-
-df = load_data()
+def calculate_alert_level(flux_total, seuils):
+    return scenario_cube.alert_level(flux_total, seuils)
+
+# Vue Lits/Personnel/Matériel précalculée pour toutes les positions des sliders
+# (date x sim_flux x sim_rh x service) : chargée une fois, puis simples lectures
+# Répartition du flux entre services : prévisions des modèles par service si entraînés
+# Capacités à l'échelle du site sélectionné
+@st.cache_resource(max_entries=8)
+def load_operational_cube(_df, site, version):
+    weights = dashboard_data.load_service_weights(get_forecast_service(site), _df['date'])
+    capacites = dashboard_data.site_capacities(dashboard_data.load_site_config(site)) if site else None
+    return dashboard_data.load_operational_cube(_df, weights=weights, capacites=capacites,
+                                                seuils=load_thresholds(site, version))
 
 # ==========================================
 # 3. SIDEBAR : EXPLORATION & SCÉNARIOS
@@ -152,14 +132,34 @@ df = load_data()
 with st.sidebar:
     st.title("🎛️ Pilotage")
     st.markdown("---")
-    
+
+    # Multi-sites : shards agrégés par `python -m src.preprocessing --all-sites`
+    sites = storage.list_sites(os.path.join(dashboard_data.PROJECT_ROOT, "data", "processed"))
+    site = None
+    if sites:
+        choix = st.selectbox("🏥 Site", ["Site principal"] + sites)
+        site = None if choix == "Site principal" else choix
+
+service = get_forecast_service(site)
+with instrumentation.span("dashboard.load_data"):
+    service.refresh()
+    df = load_data(site, service.version)
+
+if df.empty:
+    st.warning(f"Aucune prévision pour le site {site} : lancer `python -m src.training --site {site}`.")
+    st.stop()
+with instrumentation.span("dashboard.cube"):
+    seuils = load_thresholds(site, service.version)
+    ops_cube = load_operational_cube(df, site, service.version)
+
+with st.sidebar:
     if not df.empty:
         # A. NAVIGATION (Exploration Temporelle)
         st.subheader("1. Navigation")
         view_mode = st.radio("Vue :", ["Quotidien (Jour)", "Hebdo (Semaine)", "Mensuel (Mois)"], index=0)
         
         min_d, max_d = df['date'].min().date(), df['date'].max().date()
-        default_val = datetime(2025, 2, 28).date()
+        default_val = min(max(datetime(2025, 2, 28).date(), min_d), max_d)
 
         if view_mode == "Quotidien (Jour)":
             selected_date = st.date_input("Date Cible", value=default_val, min_value=min_d, max_value=max_d)
@@ -170,7 +170,8 @@ with st.sidebar:
             end_date = start_date + timedelta(days=6)
         else:
             c_y, c_m = st.columns(2)
-            with c_y: year = st.selectbox("Année", range(2018, 2027), index=7)
+            years = list(range(min_d.year, max_d.year + 1))
+            with c_y: year = st.selectbox("Année", years, index=years.index(default_val.year))
             with c_m: month = st.selectbox("Mois", range(1, 13), index=1)
             start_date = pd.to_datetime(f"{year}-{month}-01")
             end_date = (start_date + pd.DateOffset(months=1)) - timedelta(days=1)
@@ -180,11 +181,36 @@ with st.sidebar:
         # B. SCÉNARIOS (Répond à l'exigence "Simuler épidémie, grève...")
         st.subheader("2. Scénarios (Stress Test)")
         
-        sim_flux = st.slider("🌊 Impact Flux (Afflux/Épidémie)", -50, 150, 0, step=10, 
+        flux_steps, rh_steps = scenario_cube.SIM_FLUX_STEPS, scenario_cube.SIM_RH_STEPS
+        sim_flux = st.slider("🌊 Impact Flux (Afflux/Épidémie)", int(flux_steps[0]), int(flux_steps[-1]), 0,
+                             step=int(flux_steps[1] - flux_steps[0]),
                              help="Ajoute des patients au flux prévu par l'IA.")
         
-        sim_rh = st.slider("⚠️ Impact RH (Grève/Absentéisme)", 0, 30, 0, step=5, format="+%d%%",
+        sim_rh = st.slider("⚠️ Impact RH (Grève/Absentéisme)", int(rh_steps[0]), int(rh_steps[-1]), 0,
+                           step=int(rh_steps[1] - rh_steps[0]), format="+%d%%",
                            help="Simule une réduction du personnel (augmente les lits fermés).")
+
+        st.markdown("---")
+
+        # C. TEMPS RÉEL (flux d'événements de `python -m src.live_feed`)
+        st.subheader("3. Temps Réel")
+        live_mode = st.toggle("📡 Flux d'événements en direct", value=False,
+                              help="Lit les événements diffusés par `python -m src.live_feed` (admissions, relèves, inventaires).")
+        live_transport = "file"
+        if live_mode:
+            live_transport = st.radio("Source", ["file", "socket"], horizontal=True,
+                                      format_func={"file": "Fichier", "socket": f"Socket :{live_feed.PORT}"}.get,
+                                      help="Fichier data/live/feed.jsonl (--sink file) ou socket TCP locale (--sink socket)")
+
+        st.markdown("---")
+        if service.source == "modele":
+            st.caption(f"🤖 Prévisions du modèle XGBoost (version {service.version})")
+        elif service.source == "precalcule":
+            st.caption("🤖 Prévisions précalculées (notebook 03). Entraîner le modèle : `python -m src.training`")
+        else:
+            st.caption("⚠️ Série de démonstration (aucun modèle entraîné)")
+        st.toggle("⏱️ Mode diagnostic", key="debug",
+                  help="Affiche le temps de chaque étape du rafraîchissement (chargement, cube, vues, graphiques).")
             
     else:
         st.stop()
@@ -192,8 +218,7 @@ with st.sidebar:
 # ==========================================
 # 4. CALCULS (MOTEUR DE SIMULATION)
 # ==========================================
-mask_period = (df['date'] >= start_date) & (df['date'] <= end_date)
-period_data = df.loc[mask_period]
+period_data = dashboard_data.slice_period(df, start_date, end_date)
 
 if period_data.empty:
     st.error("Pas de données.")
@@ -209,10 +234,16 @@ else:
 final_flux = base_flux + sim_flux
 
 # ALERTE FINALE = Recalculée sur le flux simulé
-alerte_display = calculate_alert_level(final_flux)
+alerte_display = calculate_alert_level(final_flux, seuils)
 
-# TABLEAU OPÉRATIONNEL = Prend en compte Flux Simulé + RH Simulé
-df_ops = generate_operational_view(final_flux, alerte_display, sim_rh)
+# TABLEAU OPÉRATIONNEL = Prend en compte Flux Simulé + RH Simulé (lecture du cube)
+# Semaine / Mois : moyenne des états réels de chaque jour, et non l'état d'un jour moyen
+with instrumentation.span("dashboard.vue"):
+    if view_mode == "Quotidien (Jour)":
+        df_ops = scenario_cube.day_view(ops_cube, start_date, sim_flux, sim_rh)
+    else:
+        df_states = scenario_cube.period_states(ops_cube, start_date, end_date, sim_flux, sim_rh)
+        df_ops = scenario_cube.period_view(ops_cube, start_date, end_date, sim_flux, sim_rh)
 
 # KPIs Globaux
 total_dispos = df_ops['Lits Dispos'].sum()
@@ -263,6 +294,51 @@ with c3:
 with c4: 
     st.metric("Flux Total (Simulé)", f"{final_flux}", delta=f"{sim_flux:+} Scénario" if sim_flux!=0 else "Flux Base")
 
+# Socket : un seul serveur par processus (le port est unique), état partagé entre les sessions
+@st.cache_resource
+def live_socket():
+    return live_feed.SocketSource(live_feed.HOTE, live_feed.PORT), live_feed.LiveState(), threading.Lock()
+
+# Fichier : lecture propre à chaque session
+def live_file():
+    if "live_etat" not in st.session_state:
+        st.session_state["live_source"] = live_feed.FileSource(
+            os.path.join(dashboard_data.PROJECT_ROOT, live_feed.FEED_PATH), from_start=True)
+        st.session_state["live_etat"] = live_feed.LiveState()
+        st.session_state["live_verrou"] = threading.Lock()
+    return st.session_state["live_source"], st.session_state["live_etat"], st.session_state["live_verrou"]
+
+# Temps réel : seuls les nouveaux événements sont lus à chaque rafraîchissement, dans un
+# tampon circulaire ; seul ce fragment est réexécuté
+@st.fragment(run_every=live_feed.RAFRAICHISSEMENT)
+def live_panel(seuils, transport):
+    source, etat, verrou = live_socket() if transport == "socket" else live_file()
+    with verrou:
+        etat.ingest(source.poll())
+        kpis = etat.kpis(seuils)
+        par_service = etat.par_service()
+
+    st.subheader("📡 Temps Réel")
+    if kpis["evenements"] == 0:
+        commande = "python -m src.live_feed --speedup 3600" + (" --sink socket" if transport == "socket" else "")
+        st.info(f"En attente d'événements : lancer `{commande}`.")
+        return
+    l1, l2, l3, l4 = st.columns(4)
+    with l1:
+        st.metric("Instant Simulé", kpis["instant"].strftime("%d/%m %H:%M"))
+    with l2:
+        st.metric("Admissions du Jour", kpis["admissions_jour"], delta=f"{kpis['flux_projete']:.0f} projetés (24h)",
+                  delta_color="off")
+    with l3:
+        st.metric("Niveau Projeté", kpis["niveau"], delta_color="off")
+    with l4:
+        st.metric("Latence p95", f"{kpis['latence_p95'] * 1000:.0f} ms", delta=f"{kpis['debit']:.0f} év/s",
+                  delta_color="off")
+    st.dataframe(par_service, use_container_width=True, hide_index=True)
+
+if live_mode:
+    live_panel(seuils, live_transport)
+
 # ==========================================
 # 6. GRAPHIQUE (TENDANCES ADMISSIONS)
 # ==========================================
@@ -274,30 +350,35 @@ if view_mode == "Quotidien (Jour)":
 else:
     p_start, p_end = start_date, end_date
 
-mask_plot = (df['date'] >= p_start) & (df['date'] <= p_end)
-chart_data = df.loc[mask_plot].copy()
+with instrumentation.span("dashboard.graphique"):
+    chart_data = dashboard_data.slice_period(df, p_start, p_end).copy()
 
-# Ajout simulation graphique
-chart_data['Flux Affiché'] = chart_data['flux_base'] + sim_flux
-chart_data['Type'] = np.where(chart_data['date'] <= today_real, 'Historique', 'Simulation' if sim_flux!=0 else 'Prédiction')
+    # Ajout simulation graphique
+    chart_data['Flux Affiché'] = chart_data['flux_base'] + sim_flux
+    chart_data['Type'] = np.where(chart_data['date'] <= today_real, 'Historique', 'Simulation' if sim_flux!=0 else 'Prédiction')
+    # Flux réellement observé (quand la série vient du modèle)
+    if 'flux_reel' in chart_data:
+        reel = chart_data.dropna(subset=['flux_reel'])
+        chart_data = pd.concat([chart_data, reel.assign(**{'Flux Affiché': reel['flux_reel'], 'Type': 'Réel'})])
 
-fig = px.line(chart_data, x='date', y='Flux Affiché', color='Type', 
-              color_discrete_map={'Historique': 'grey', 'Prédiction': '#0f4c81', 'Simulation': '#e67e22'},
-              markers=True)
+    fig = px.line(chart_data, x='date', y='Flux Affiché', color='Type', 
+                  color_discrete_map={'Historique': 'grey', 'Prédiction': '#0f4c81', 'Simulation': '#e67e22', 'Réel': '#2c3e50'},
+                  markers=True)
 
-# Seuils
-fig.add_hline(y=370, line_dash="dot", line_color="orange", annotation_text="Alerte")
-fig.add_hline(y=410, line_dash="dot", line_color="red", annotation_text="Critique")
+    # Seuils
+    fig.add_hline(y=seuils["ALERTE"], line_dash="dot", line_color="orange", annotation_text="Alerte")
+    fig.add_hline(y=seuils["CRITIQUE"], line_dash="dot", line_color="red", annotation_text="Critique")
 
-fig.update_layout(height=350, xaxis_title="", yaxis_title="Nb Patients", template="plotly_white")
-st.plotly_chart(fig, use_container_width=True)
+    fig.update_layout(height=350, xaxis_title="", yaxis_title="Nb Patients", template="plotly_white")
+    st.plotly_chart(fig, use_container_width=True)
 
 # ==========================================
 # 7. DÉTAILS (AJUSTER RESSOURCES)
 # ==========================================
 st.subheader("🔍 Analyse Opérationnelle & Besoins")
 
-t1, t2, t3 = st.tabs(["📊 Capacité & RH", "🔥 Gravité", "📋 Tableau Gestion"])
+t1, t2, t3, t4, t5 = st.tabs(["📊 Capacité & RH", "🔥 Gravité", "📋 Tableau Gestion", "📅 États Journaliers",
+                              "🧠 Pourquoi ?"])
 
 with t1:
     # Visualisation des besoins en lits vs personnel manquant
@@ -321,4 +402,69 @@ with t3:
         use_container_width=True
     )
     if sim_rh > 0:
-        st.warning(f"⚠️ **Note :** Le tableau intègre une perte de capacité de {sim_rh}% due au scénario RH.")
\ No newline at end of file
+        st.warning(f"⚠️ **Note :** Le tableau intègre une perte de capacité de {sim_rh}% due au scénario RH.")
+
+with t4:
+    # Semaine / Mois : état opérationnel réel de chaque jour de la période
+    if view_mode == "Quotidien (Jour)":
+        st.info("Sélectionnez une vue Hebdo ou Mensuelle pour afficher l'état de chaque jour.")
+    else:
+        heatmap = df_states.pivot(index='Service', columns='date', values='Taux Occ. %')
+        fig_days = px.imshow(heatmap, color_continuous_scale='Reds', zmin=50, zmax=100, aspect='auto',
+                             labels=dict(x="", y="", color="Taux Occ. %"),
+                             title="Taux d'Occupation par Service et par Jour")
+        st.plotly_chart(fig_days, use_container_width=True)
+
+with t5:
+    # Explication SHAP de la prévision (stock précalculé par version du modèle, src.explain)
+    # Semaine / Mois : jour le plus tendu de la période
+    if service.source != "modele":
+        st.info("Explications disponibles avec un modèle entraîné : `python -m src.training`.")
+    else:
+        from src import explain
+        with instrumentation.span("dashboard.explications"):
+            explication = service.explain(start_date, end_date)
+        if explication.empty:
+            st.info("Aucune prévision du modèle sur cette période.")
+        else:
+            jour = explication['flux_predit'].idxmax()
+            ligne = explication.loc[jour]
+            niveau = calculate_alert_level(int(round(ligne['flux_predit'])), seuils)
+            st.markdown(f"**{jour.strftime('%d/%m/%Y')} : {ligne['flux_predit']:.0f} patients prévus ({niveau})** "
+                        f"= niveau moyen du modèle ({ligne['base']:.0f}) + effet de chaque variable ci-dessous.")
+            top = explain.top_contributions(explication, jour, n=len(explain.FEATURES))
+            top['Effet'] = np.where(top['contribution'] >= 0, 'Hausse', 'Baisse')
+            top['libelle'] = top['variable'] + " = " + top['valeur'].round(2).astype(str)
+            fig_shap = px.bar(top.iloc[::-1], x='contribution', y='libelle', color='Effet', orientation='h',
+                              color_discrete_map={'Hausse': '#e74c3c', 'Baisse': '#2ecc71'},
+                              labels={'contribution': "Effet sur la prévision (patients)", 'libelle': ""},
+                              title="Contribution de chaque variable (valeurs SHAP)")
+            st.plotly_chart(fig_shap, use_container_width=True)
+
+# ==========================================
+# 8. DIAGNOSTIC (TEMPS PAR ÉTAPE DE CE RERUN)
+# ==========================================
+if debug_mode:
+    etapes = instrumentation.spans(spans_rerun)
+    with st.expander(f"⏱️ Diagnostic : rerun en {(time.perf_counter() - t0_rerun) * 1000:.0f} ms", expanded=True):
+        if etapes.empty:
+            st.info("Aucune étape mesurée sur ce rerun.")
+        else:
+            d1, d2 = st.columns([3, 2])
+            with d1:
+                # Ordre de démarrage, étapes imbriquées indentées sous leur parent
+                ordre = etapes.sort_values('debut', kind='stable')
+                st.dataframe(pd.DataFrame({
+                    "Étape": ["· " * p + nom for p, nom in zip(ordre['profondeur'], ordre['nom'])],
+                    "Durée (ms)": (ordre['duree_s'] * 1000).round(1),
+                    "Lignes": ordre['lignes'],
+                    "Mémoire (Mo)": ordre['memoire_mo'].round(1),
+                }), use_container_width=True, hide_index=True)
+            with d2:
+                resume = instrumentation.summary(etapes)
+                fig_debug = px.bar(resume, x=resume['total_s'] * 1000, y='nom', orientation='h',
+                                   labels={'x': "Temps cumulé (ms)", 'nom': ""})
+                fig_debug.update_layout(height=300, template="plotly_white", yaxis={'autorange': 'reversed'})
+                st.plotly_chart(fig_debug, use_container_width=True)
+            st.download_button("💾 Exporter (JSON)", etapes.to_json(orient="records", force_ascii=False),
+                               file_name="diagnostic_rerun.json", mime="application/json")
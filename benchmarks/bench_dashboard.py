@@ -0,0 +1,112 @@
+"""Latence du dashboard : démarrage à froid et interactions (sliders, navigation).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_dashboard --runs 20
+Code de sortie non nul si un budget de latence est dépassé.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+import logging
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from src import dashboard_data
+
+APP = os.path.join(dashboard_data.PROJECT_ROOT, "app", "dashboardV2.py")
+
+# Budgets (secondes) : premier rerun dans un processus neuf (imports du script compris ;
+# sans modèle entraîné, xgboost n'est pas importé), démarrage après redémarrage serveur
+# (cache disque froid / chaud) et p95 d'un rerun
+BUDGETS = {
+    "demarrage_processus": 2.0,
+    "demarrage_processus_modele": 4.0,
+    "demarrage_cache_disque_froid": 5.0,
+    "demarrage_cache_disque_chaud": 3.0,
+    "interaction_p95": 0.5,
+}
+
+# Premier rerun dans un processus neuf : seul streamlit est déjà importé (serveur)
+_PROCESSUS = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+t0 = time.perf_counter()
+at.run()
+print(time.perf_counter() - t0, "xgboost" in sys.modules, bool(at.exception))
+"""
+
+def _demarrage_processus():
+    """(durée, xgboost importé ?) du premier rerun d'un processus neuf, cache disque chaud"""
+    sortie = subprocess.run([sys.executable, "-c", _PROCESSUS, APP], cwd=dashboard_data.PROJECT_ROOT,
+                            capture_output=True, text=True, check=True).stdout.split()
+    if sortie[2] == "True":
+        raise RuntimeError("Exception au démarrage du dashboard")
+    return float(sortie[0]), sortie[1] == "True"
+
+def _demarrage(vider_disque):
+    """Simule un redémarrage serveur : caches mémoire Streamlit vidés, disque optionnellement"""
+    if vider_disque and os.path.isdir(dashboard_data.CACHE_DIR):
+        shutil.rmtree(dashboard_data.CACHE_DIR)
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    for module in [m for m in sys.modules if m.startswith("plotly")]:
+        del sys.modules[module]
+    at = AppTest.from_file(APP, default_timeout=120)
+    t0 = time.perf_counter()
+    at.run()
+    duree = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(at.exception)
+    return at, duree
+
+def run(runs=20, seed=0):
+    rng = np.random.default_rng(seed)
+    resultats = {}
+    _, resultats["demarrage_cache_disque_froid"] = _demarrage(vider_disque=True)
+    at, resultats["demarrage_cache_disque_chaud"] = _demarrage(vider_disque=False)
+    nom = "demarrage_processus_modele" if dashboard_data.model_trained() else "demarrage_processus"
+    resultats[nom], resultats["xgboost_importe"] = _demarrage_processus()
+
+    vues = ["Quotidien (Jour)", "Hebdo (Semaine)", "Mensuel (Mois)"]
+    durees = []
+    for _ in range(runs):
+        at.radio[0].set_value(vues[rng.integers(len(vues))])
+        at.slider[0].set_value(int(rng.choice(np.arange(-50, 151, 10))))
+        at.slider[1].set_value(int(rng.choice(np.arange(0, 31, 5))))
+        t0 = time.perf_counter()
+        at.run()
+        durees.append(time.perf_counter() - t0)
+        if at.exception:
+            raise RuntimeError(at.exception)
+
+    resultats["interaction_p50"] = float(np.percentile(durees, 50))
+    resultats["interaction_p95"] = float(np.percentile(durees, 95))
+    return resultats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="Nombre d'interactions simulées")
+    args = parser.parse_args()
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+    resultats = run(runs=args.runs)
+    depassements = 0
+    print("⏱️ Latence dashboard")
+    xgboost_importe = resultats.pop("xgboost_importe")
+    modele = dashboard_data.model_trained()
+    # Sans modèle, le démarrage ne doit pas importer xgboost
+    depassements += xgboost_importe and not modele
+    print(f"   modèle entraîné : {'oui' if modele else 'non'}, xgboost importé au démarrage : "
+          f"{'oui' if xgboost_importe else 'non'} {'❌' if xgboost_importe and not modele else '✅'}")
+    for nom, duree in resultats.items():
+        budget = BUDGETS.get(nom)
+        statut = "" if budget is None else ("✅" if duree <= budget else "❌")
+        depassements += budget is not None and duree > budget
+        print(f"   {nom:<30} {duree * 1000:8.1f} ms" + (f"  (budget {budget * 1000:.0f} ms) {statut}" if budget else ""))
+    sys.exit(1 if depassements else 0)
@@ -0,0 +1,87 @@
+"""Prévision J+1..J+14 : moteur récursif vs modèle direct multi-horizon (latence et MAE par horizon).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_horizon --trajectories 1000
+Entraînement sur les premiers 80 % de l'historique (comme le notebook 03), évaluation depuis
+chaque jour d'origine de la période de test, ressources des jours cibles connues (mêmes
+entrées pour les deux méthodes).
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import training
+from src.forecast import FEATURES, HORIZONS, TARGET, direct_forecast, recursive_forecast
+
+def _mesure(fonction, repetitions=5):
+    """Meilleur temps sur `repetitions` appels"""
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur
+
+def _matrices(df, origines, horizons):
+    """Features des jours cibles de chaque origine (N, H, F) et vérité terrain (N, H)"""
+    X = df[FEATURES].to_numpy(dtype=np.float32)
+    y = df[TARGET].to_numpy(dtype=np.float32)
+    cibles = origines[:, None] + np.arange(1, horizons + 1)
+    return X[cibles], y[cibles], y[origines]
+
+def _direct_X(X_cibles, dernier):
+    i_hier = FEATURES.index('patients_hier')
+    Xd = np.concatenate([X_cibles, np.broadcast_to(np.arange(1, X_cibles.shape[1] + 1, dtype=np.float32),
+                                                   X_cibles.shape[:2])[:, :, None]], axis=2)
+    Xd[:, :, i_hier] = dernier[:, None]
+    return Xd
+
+def run(df, horizons=HORIZONS, n_trajectories=1000, split=0.8):
+    df = df.sort_values('date').reset_index(drop=True)
+    coupure = int(len(df) * split)
+    train = df.iloc[:coupure]
+
+    t0 = time.perf_counter()
+    recursif = training.train_model(train)
+    t_recursif = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    direct = training.train_direct_model(train, horizons)
+    t_direct = time.perf_counter() - t0
+
+    # Précision : une origine par jour de test (le dernier jour connu est l'origine)
+    origines = np.arange(coupure - 1, len(df) - horizons)
+    X_cibles, reel, dernier = _matrices(df, origines, horizons)
+    p_rec = recursive_forecast(recursif, None, None, dernier, X=X_cibles.copy())
+    p_dir = direct_forecast(direct, None, None, dernier, X=_direct_X(X_cibles, dernier), horizons=horizons)
+    precision = pd.DataFrame({
+        "horizon": np.arange(1, horizons + 1),
+        "mae_recursif": np.abs(p_rec - reel).mean(axis=0),
+        "mae_direct": np.abs(p_dir - reel).mean(axis=0),
+    })
+
+    # Latence : une trajectoire (requête du dashboard) et un lot de trajectoires (scénarios)
+    latence = {"entrainement_recursif": t_recursif, "entrainement_direct": t_direct}
+    for n in (1, n_trajectories):
+        sel = np.resize(np.arange(len(origines)), n)
+        Xr, Xd = X_cibles[sel], _direct_X(X_cibles[sel], dernier[sel])
+        latence[f"recursif_{n}"] = _mesure(lambda: recursive_forecast(recursif, None, None, dernier[sel], X=Xr))
+        latence[f"direct_{n}"] = _mesure(lambda: direct_forecast(direct, None, None, dernier[sel], X=Xd,
+                                                                 horizons=horizons))
+    return precision, latence
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data", default=training.TRAIN_PATH)
+    parser.add_argument("--horizons", type=int, default=HORIZONS)
+    parser.add_argument("--trajectories", type=int, default=1000, help="Taille du lot de trajectoires chronométré")
+    args = parser.parse_args()
+
+    precision, latence = run(training.load_train_data(args.data), args.horizons, args.trajectories)
+    print("🎯 MAE par horizon (période de test)")
+    print(precision.to_string(index=False, float_format="{:.2f}".format))
+    print(f"   moyenne : récursif {precision['mae_recursif'].mean():.2f} / direct {precision['mae_direct'].mean():.2f}")
+    print(f"\n⏱️ Latence J+1..J+{args.horizons}")
+    for nom, duree in latence.items():
+        print(f"   {nom:<26} {duree * 1000:8.2f} ms")
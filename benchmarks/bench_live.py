@@ -0,0 +1,99 @@
+"""Test de charge du mode temps réel : débit soutenu et latence bout en bout (émission -> KPI).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_live --rate 5000 --duration 10 --transport file
+Code de sortie non nul si le débit visé n'est pas tenu ou si la latence dépasse le budget.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src import data_generator, live_feed
+
+TRANSPORTS = ["queue", "file", "socket"]
+
+# Budgets : part du débit visé effectivement ingérée, latence p95 / p99 (secondes)
+BUDGETS = {
+    "debit_relatif": 0.95,
+    "latence_p95": 0.25,
+    "latence_p99": 0.50,
+}
+
+def _evenements(n_min, seed=0):
+    """Blocs d'événements du générateur totalisant au moins `n_min` événements"""
+    blocs, total = [], 0
+    for bloc in data_generator.iter_events("2025-01-01", "2025-12-31", seed=seed):
+        blocs.append(bloc)
+        total += len(bloc)
+        if total >= n_min:
+            break
+    return blocs
+
+def _transport(nom, dossier):
+    if nom == "queue":
+        sink = live_feed.QueueSink()
+        return sink, live_feed.QueueSource(sink.file)
+    if nom == "file":
+        chemin = os.path.join(dossier, "feed.jsonl")
+        sink = live_feed.FileSink(chemin)
+        return sink, live_feed.FileSource(chemin, from_start=True)
+    source = live_feed.SocketSource(port=0)
+    return live_feed.SocketSink(*source.serveur.getsockname()), source
+
+def run(rate=5000, duration=10.0, transport="file", poll=0.05, seed=0):
+    n_total = int(rate * duration)
+    blocs = _evenements(n_total, seed)
+    etat = live_feed.LiveState(capacity=max(n_total, live_feed.TAILLE_TAMPON))
+
+    with tempfile.TemporaryDirectory() as dossier:
+        sink, source = _transport(transport, dossier)
+        t0 = time.perf_counter()
+        thread, _ = live_feed.start_feed(blocs, sink, rate=rate, max_events=n_total)
+        durees_maj = []
+        while etat.n < n_total and time.perf_counter() - t0 < duration * 3:
+            debut = time.perf_counter()
+            etat.ingest(source.poll())
+            etat.kpis()
+            durees_maj.append(time.perf_counter() - debut)
+            time.sleep(poll)
+        ecoule = time.perf_counter() - t0
+        thread.join()
+        sink.close()
+        source.close()
+
+    latence = etat.latence[:min(etat.n, etat.capacity)]
+    return {
+        "evenements": etat.n,
+        "debit": etat.n / ecoule,
+        "debit_relatif": etat.n / ecoule / rate,
+        "latence_p50": float(np.percentile(latence, 50)),
+        "latence_p95": float(np.percentile(latence, 95)),
+        "latence_p99": float(np.percentile(latence, 99)),
+        "maj_kpi_p95": float(np.percentile(durees_maj, 95)),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=5000, help="Débit visé (événements/s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée de la diffusion (secondes)")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="file")
+    parser.add_argument("--poll", type=float, default=0.05, help="Période de lecture du consommateur (secondes)")
+    args = parser.parse_args()
+
+    resultats = run(args.rate, args.duration, args.transport, args.poll)
+    depassements = (resultats["debit_relatif"] < BUDGETS["debit_relatif"]) \
+        + sum(resultats[nom] > BUDGETS[nom] for nom in ["latence_p95", "latence_p99"])
+    print(f"📡 Mode temps réel ({args.transport}, {args.rate:.0f} év/s visés, {args.duration:.0f}s)")
+    print(f"   {'evenements':<16} {resultats['evenements']:>10,}")
+    print(f"   {'debit':<16} {resultats['debit']:>10.0f} év/s  "
+          f"({resultats['debit_relatif']:.0%}, budget >= {BUDGETS['debit_relatif']:.0%}) "
+          f"{'✅' if resultats['debit_relatif'] >= BUDGETS['debit_relatif'] else '❌'}")
+    for nom in ["latence_p50", "latence_p95", "latence_p99", "maj_kpi_p95"]:
+        budget = BUDGETS.get(nom)
+        statut = "" if budget is None else ("✅" if resultats[nom] <= budget else "❌")
+        print(f"   {nom:<16} {resultats[nom] * 1000:>10.1f} ms" + (f"  (budget {budget * 1000:.0f} ms) {statut}" if budget else ""))
+    sys.exit(1 if depassements else 0)
@@ -0,0 +1,302 @@
+"""Suite de benchmarks bout en bout : génération, agrégation, entraînement, prévision, dashboard.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_pipeline                      # échelles 1an, 8ans, multisite
+    python -m benchmarks.bench_pipeline --scales 50ans
+    python -m benchmarks.bench_pipeline --update-baseline    # enregistre les références
+Chaque étape est comparée à sa référence (benchmarks/baselines.json) : code de sortie non nul
+et message explicite dès qu'une étape est plus lente ou plus gourmande que la tolérance.
+
+Chaque échelle tourne dans un processus neuf. Mémoire : pic de RSS pendant l'étape au-delà
+du RSS de départ (VmHWM, remis à zéro avant chaque étape), processus de l'échelle seulement
+(les workers multi-sites ne sont pas comptés).
+
+Étapes : "generation" (flux mensuel iter_period, sans écriture) et "generation_ecriture"
+(chemin de generate_grand_dataset en mode vectorisé : generate_period puis écriture CSV des
+trois tables, sur la plage de l'échelle), puis agrégation, entraînement, prévision et dashboard.
+
+Machines différentes : les références sont ramenées à la machine courante par le rapport
+des temps d'une boucle de calibration (NumPy + Python) mesurée à chaque enregistrement et
+à chaque comparaison. Avec un autre nombre de cœurs, les étapes parallèles (multi-sites) ne
+sont pas comparées ; un autre système ou processeur donne un avertissement.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src import dashboard_data, data_generator, forecast_service, preprocessing, scenario_cube, storage, training
+from src.forecast import TARGET, build_feature_matrix, default_scenario, recursive_forecast
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+FIN = date(2025, 12, 31)
+ECHELLES = {
+    "1an": {"annees": 1},
+    "8ans": {"annees": 8},
+    "50ans": {"annees": 50},
+    "multisite": {"annees": 1, "sites": 4},
+}
+ECHELLES_DEFAUT = ["1an", "8ans", "multisite"]
+
+HORIZON_PREVISION = 90
+TRAJECTOIRES = 1000
+APPELS_VUE = 200
+
+# Régression : plus lent que référence x TOLERANCE_TEMPS (et d'au moins PLANCHER_TEMPS),
+# ou pic mémoire au-delà de référence x TOLERANCE_MEMOIRE (et d'au moins PLANCHER_MEMOIRE)
+TOLERANCE_TEMPS = 1.5
+TOLERANCE_MEMOIRE = 1.3
+PLANCHER_TEMPS = 0.05       # secondes
+PLANCHER_MEMOIRE = 20.0     # Mo
+ECHELLES_PARALLELES = ["multisite"]     # Temps dépendant du nombre de cœurs
+
+# --- Machine (calibration) ---
+
+def calibrate(repetitions=5):
+    """Meilleur temps d'une charge fixe (tri et bincount NumPy, boucle Python), en secondes"""
+    rng = np.random.default_rng(0)
+    valeurs, codes = rng.random(4_000_000), rng.integers(0, 1000, 4_000_000)
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        np.sort(valeurs)
+        np.bincount(codes, weights=valeurs)
+        total = 0
+        for i in range(1_500_000):
+            total += i % 7
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur
+
+def machine_info():
+    return {"python": platform.python_version(), "systeme": platform.system(), "processeur": platform.machine(),
+            "coeurs": os.cpu_count(), "calibration_s": round(calibrate(), 5)}
+
+# --- Mesure (temps + pic mémoire) ---
+
+def _statut_mo(champ):
+    try:
+        with open("/proc/self/status") as f:
+            for ligne in f:
+                if ligne.startswith(champ):
+                    return int(ligne.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _reset_pic():
+    """Ramène le pic de RSS (VmHWM) au RSS courant (Linux ; sans effet ailleurs)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+class Mesures:
+    """Temps cumulé, pic mémoire et lignes traitées par étape"""
+
+    def __init__(self):
+        self.temps, self.pic, self.lignes = defaultdict(float), defaultdict(float), defaultdict(int)
+
+    def mesure(self, etape, fonction, *args, lignes=None, **kwargs):
+        avant = _statut_mo("VmRSS")
+        _reset_pic()
+        t0 = time.perf_counter()
+        resultat = fonction(*args, **kwargs)
+        self.temps[etape] += time.perf_counter() - t0
+        self.pic[etape] = max(self.pic[etape], _statut_mo("VmHWM") - avant)
+        self.lignes[etape] += lignes(resultat) if callable(lignes) else (lignes or 0)
+        return resultat
+
+    def lignes_resultat(self, echelle):
+        return [{"echelle": echelle, "etape": etape, "temps_s": round(self.temps[etape], 4),
+                 "pic_mo": round(self.pic[etape], 1), "lignes": self.lignes[etape],
+                 "lignes_s": round(self.lignes[etape] / self.temps[etape]) if self.temps[etape] else 0}
+                for etape in self.temps]
+
+# --- Étapes ---
+
+def _debut(annees):
+    return date(FIN.year - annees + 1, 1, 1)
+
+def _pipeline_site(m, annees, seed, dossier):
+    """Génération (flux mensuel) + agrégation journalière, puis modèle, prévision et dashboard"""
+    blocs = data_generator.iter_period(_debut(annees), FIN, seed=seed)
+    jours = []
+    while True:
+        tables = m.mesure("generation", next, blocs, None, lignes=lambda t: 0 if t is None else sum(map(len, t[1])))
+        if tables is None:
+            break
+        jours.append(m.mesure("agregation", preprocessing.aggregate_days, *tables[1], lignes=len(tables[1][0])))
+    df = m.mesure("agregation", lambda: preprocessing.finalize(pd.concat(jours, ignore_index=True)))
+
+    model = m.mesure("entrainement", training.train_model, df, lignes=len(df))
+
+    dates = pd.date_range(pd.Timestamp(FIN) + pd.Timedelta(days=1), periods=HORIZON_PREVISION, freq="D")
+    scenario = default_scenario(df)
+    X = build_feature_matrix(dates, scenario, TRAJECTOIRES)
+    m.mesure("prevision_recursive", recursive_forecast, model, dates, scenario, df[TARGET].iloc[-1],
+             n_trajectories=TRAJECTOIRES, X=X, lignes=TRAJECTOIRES * HORIZON_PREVISION)
+
+    # Dashboard : load_data (service de prévision sur modèle et dataset persistés) puis vue opérationnelle
+    model_dir, train_path = os.path.join(dossier, "models"), os.path.join(dossier, "train.csv")
+    training.save_model(model, model_dir, df_train=df)
+    df.to_csv(train_path, index=False)
+
+    def load_data():
+        service = forecast_service.ForecastService(model_dir=model_dir, train_path=train_path,
+                                                   alertes_path=os.path.join(dossier, "absent.csv"))
+        return dashboard_data.load_forecast_history(service, df['date'].iloc[0], df['date'].iloc[-1])
+    serie = m.mesure("dashboard_load_data", load_data, lignes=len)
+
+    cube = m.mesure("vue_operationnelle_cube", scenario_cube.build_cube, serie['date'], serie['flux_base'],
+                    lignes=len(serie))
+    tirages = np.random.default_rng(seed).integers(0, len(serie), APPELS_VUE)
+    m.mesure("vue_operationnelle_jour", lambda: [scenario_cube.day_view(cube, serie['date'].iloc[i], 50, 10)
+                                                 for i in tirages], lignes=APPELS_VUE)
+
+    # generate_grand_dataset (vectorisé, non streaming) sur la plage de l'échelle : un bloc, puis CSV
+    def generation_ecriture():
+        tables = data_generator.generate_period(_debut(annees), FIN, seed=seed)
+        for table, nom in zip(tables, data_generator.RAW_TABLES):
+            storage.write_table(table, nom, os.path.join(dossier, "raw"), fmt="csv")
+        return sum(map(len, tables))
+    m.mesure("generation_ecriture", generation_ecriture, lignes=lambda n: n)
+
+def _pipeline_multisite(m, annees, n_sites, seed, dossier, n_workers):
+    raw, processed = os.path.join(dossier, "raw"), os.path.join(dossier, "processed")
+    sites = data_generator.synthetic_sites(n_sites, seed=seed)
+    m.mesure("generation", data_generator.generate_sites, sites, _debut(annees), FIN, output_dir=raw, seed=seed,
+             n_workers=n_workers, verbose=False, lignes=lambda t: sum(sum(l.values()) for l in t.values()))
+    m.mesure("agregation", preprocessing.run_sites, raw, processed, full=True, n_workers=n_workers,
+             lignes=lambda t: sum(t.values()))
+
+def run_scale(nom, seed=42, n_workers=os.cpu_count()):
+    """Mesures d'une échelle dans le processus courant"""
+    cfg = ECHELLES[nom]
+    m = Mesures()
+    with tempfile.TemporaryDirectory() as dossier:
+        if "sites" in cfg:
+            _pipeline_multisite(m, cfg["annees"], cfg["sites"], seed, dossier, n_workers)
+        else:
+            _pipeline_site(m, cfg["annees"], seed, dossier)
+    return m.lignes_resultat(nom)
+
+def run(echelles=ECHELLES_DEFAUT, seed=42, n_workers=os.cpu_count()):
+    """Toutes les échelles, chacune dans un processus neuf (mémoire non partagée entre échelles)"""
+    lignes = []
+    for nom in echelles:
+        sortie = subprocess.run([sys.executable, "-m", "benchmarks.bench_pipeline", "--one-scale", nom,
+                                 "--seed", str(seed), "--workers", str(n_workers)],
+                                check=True, capture_output=True, text=True).stdout
+        lignes.extend(json.loads(sortie.strip().splitlines()[-1]))
+    return pd.DataFrame(lignes)
+
+# --- Références ---
+
+def load_baselines(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_baselines(resultats, machine, path=BASELINE_PATH):
+    refs = load_baselines(path)
+    if refs.get("machine", {}).get("calibration_s") != machine["calibration_s"] and refs.get("mesures"):
+        # Références d'une autre mesure de machine : ne pas mélanger les échelles non remesurées
+        remesurees = set(resultats["echelle"])
+        refs["mesures"] = {e: v for e, v in refs["mesures"].items() if e in remesurees}
+    refs.setdefault("mesures", {})
+    for r in resultats.itertuples():
+        refs["mesures"].setdefault(r.echelle, {})[r.etape] = {"temps_s": r.temps_s, "pic_mo": r.pic_mo}
+    refs["machine"] = machine
+    refs["mis_a_jour"] = pd.Timestamp.now().isoformat(timespec="seconds")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(refs, f, indent=1, ensure_ascii=False)
+
+def machine_differences(machine, ref_machine):
+    """Caractéristiques (hors calibration) qui diffèrent de la machine des références"""
+    return [cle for cle in ("systeme", "processeur", "python", "coeurs")
+            if cle in ref_machine and ref_machine[cle] != machine.get(cle)]
+
+def compare(resultats, refs, machine):
+    """Ajoute les références (temps ramenés à la machine courante) et le statut de chaque
+    étape (ok, REGRESSION, nouveau, non comparable)"""
+    mesures, ref_machine = refs.get("mesures", {}), refs.get("machine", {})
+    facteur = machine["calibration_s"] / ref_machine["calibration_s"] if ref_machine.get("calibration_s") else 1.0
+    autres_coeurs = "coeurs" in machine_differences(machine, ref_machine)
+    ref_t, ref_m, statuts = [], [], []
+    for r in resultats.itertuples():
+        ref = mesures.get(r.echelle, {}).get(r.etape)
+        if ref is None:
+            ref_t.append(np.nan), ref_m.append(np.nan), statuts.append("nouveau")
+            continue
+        temps = ref["temps_s"] * facteur
+        ref_t.append(round(temps, 4)), ref_m.append(ref["pic_mo"])
+        if autres_coeurs and r.echelle in ECHELLES_PARALLELES:
+            statuts.append("non comparable")
+            continue
+        lent = r.temps_s > max(temps * TOLERANCE_TEMPS, temps + PLANCHER_TEMPS)
+        lourd = r.pic_mo > max(ref["pic_mo"] * TOLERANCE_MEMOIRE, ref["pic_mo"] + PLANCHER_MEMOIRE)
+        statuts.append("REGRESSION" if lent or lourd else "ok")
+    return resultats.assign(ref_temps_s=ref_t, ref_pic_mo=ref_m, statut=statuts)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default=",".join(ECHELLES_DEFAUT),
+                        help=f"Échelles séparées par des virgules, parmi {list(ECHELLES)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processus (multi-sites)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Enregistre ces mesures comme références")
+    parser.add_argument("--one-scale", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one_scale:
+        print(json.dumps(run_scale(args.one_scale, args.seed, args.workers)))
+        sys.exit(0)
+
+    echelles = args.scales.split(",")
+    inconnues = set(echelles) - set(ECHELLES)
+    if inconnues:
+        parser.error(f"Échelles inconnues : {sorted(inconnues)}")
+
+    machine, refs = machine_info(), load_baselines(args.baseline)
+    resultats = compare(run(echelles, args.seed, args.workers), refs, machine)
+    pd.set_option("display.width", 160)
+    print("📏 Pipeline de bout en bout")
+    ref_machine = refs.get("machine", {})
+    if ref_machine.get("calibration_s"):
+        print(f"   calibration {machine['calibration_s']:.3f}s (références : {ref_machine['calibration_s']:.3f}s), "
+              f"temps de référence x{machine['calibration_s'] / ref_machine['calibration_s']:.2f}")
+    elif refs.get("mesures"):
+        print("⚠️ Références sans calibration : temps comparés tels quels (relancer avec --update-baseline)")
+    differences = machine_differences(machine, ref_machine)
+    if differences:
+        print(f"⚠️ Machine différente de celle des références ({', '.join(differences)}) : "
+              f"{ {c: ref_machine[c] for c in differences} } -> { {c: machine.get(c) for c in differences} }")
+    print(resultats.to_string(index=False))
+
+    if args.update_baseline:
+        save_baselines(resultats, machine, args.baseline)
+        print(f"💾 Références mises à jour : {args.baseline}")
+        sys.exit(0)
+    regressions = resultats[resultats["statut"] == "REGRESSION"]
+    if len(regressions):
+        print(f"\n❌ RÉGRESSION sur {len(regressions)} étape(s) (tolérance temps x{TOLERANCE_TEMPS}, "
+              f"mémoire x{TOLERANCE_MEMOIRE}) :")
+        for r in regressions.itertuples():
+            print(f"   {r.echelle}/{r.etape} : {r.temps_s:.3f}s (réf. {r.ref_temps_s:.3f}s), "
+                  f"{r.pic_mo:.0f} Mo (réf. {r.ref_pic_mo:.0f} Mo)")
+        sys.exit(1)
+    print("\n✅ Aucune régression")
@@ -0,0 +1,82 @@
+"""Benchmark CSV vs Parquet partitionné pour les tables brutes du générateur.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_storage --years 2
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+import pandas as pd
+
+from src import data_generator, storage
+
+def _taille_disque(chemin):
+    if os.path.isfile(chemin):
+        return os.path.getsize(chemin)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(chemin) for f in fs)
+
+def _mesure(fonction, repetitions=3):
+    """Meilleur temps sur `repetitions` appels, et le DataFrame obtenu"""
+    meilleur, df = float("inf"), None
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        df = fonction()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur, df
+
+def _lecture_csv_actuelle(dossier, columns=None, start=None, end=None):
+    """Lecture telle que pratiquée aujourd'hui (notebook 02) : read_csv puis filtre"""
+    date_col = storage.DATE_COLUMNS["patients"]
+    usecols = None if columns is None else list(columns) + [date_col]
+    df = pd.read_csv(storage.table_path("patients", dossier, "csv"), usecols=usecols, parse_dates=[date_col])
+    if start is not None:
+        df = df[(df[date_col] >= start) & (df[date_col] < end + pd.Timedelta(days=1))]
+    return df if columns is None else df[list(columns)]
+
+def run(years=2, seed=42):
+    debut, fin = date(2018, 1, 1), date(2018 + years - 1, 12, 31)
+    mois_cible = (pd.Timestamp(fin.year, 6, 1), pd.Timestamp(fin.year, 6, 30))
+    scenarios = {
+        "complet": dict(),
+        "2 colonnes": dict(columns=["service_admission", "ccmu"]),
+        "1 mois": dict(start=mois_cible[0], end=mois_cible[1]),
+        "1 mois x 2 col.": dict(columns=["service_admission", "ccmu"], start=mois_cible[0], end=mois_cible[1]),
+    }
+    lignes = []
+
+    with tempfile.TemporaryDirectory() as racine:
+        for fmt in storage.FORMATS:
+            dossier = os.path.join(racine, fmt)
+            data_generator.stream_period(debut, fin, output_dir=dossier, seed=seed, fmt=fmt, verbose=False)
+            taille = _taille_disque(storage.table_path("patients", dossier, fmt))
+
+            for nom, kwargs in scenarios.items():
+                if fmt == "csv":
+                    duree, df = _mesure(lambda: _lecture_csv_actuelle(dossier, **kwargs))
+                else:
+                    duree, df = _mesure(lambda: storage.read_table("patients", dossier, fmt=fmt, **kwargs))
+                lignes.append({
+                    "format": fmt,
+                    "lecture": nom,
+                    "lignes": len(df),
+                    "temps_s": round(duree, 4),
+                    "memoire_mo": round(df.memory_usage(deep=True).sum() / 1e6, 2),
+                    "disque_mo": round(taille / 1e6, 1),
+                })
+
+    resultats = pd.DataFrame(lignes)
+    ref = resultats[resultats["format"] == "csv"].set_index("lecture")
+    resultats["gain_temps"] = resultats.apply(lambda r: round(ref.loc[r["lecture"], "temps_s"] / r["temps_s"], 1), axis=1)
+    resultats["gain_memoire"] = resultats.apply(lambda r: round(ref.loc[r["lecture"], "memoire_mo"] / max(r["memoire_mo"], 0.01), 1), axis=1)
+    return resultats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=2, help="Nombre d'années générées (à partir de 2018)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(f"📊 Table patients, {args.years} an(s) : CSV vs Parquet")
+    print(run(years=args.years, seed=args.seed).to_string(index=False))
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+from src import instrumentation
+from src.data_generator import SERVICES
+
+# --- MOTEUR D'AGRÉGATION (CUBE JOUR x SERVICE x CRÉNEAU) ---
+# Chaque table brute est parcourue une seule fois : on calcule pour chaque ligne
+# l'indice plat de sa cellule (jour, service, créneau), puis chaque mesure est une
+# somme pondérée via np.bincount. Aucun groupby, aucune chaîne manipulée par ligne.
+#
+# Créneaux :
+#   - "shift" : Jour (07h-19h) / Nuit (reste de la journée calendaire), comme le générateur
+#   - "hour"  : 24 heures de la journée calendaire
+# Les mesures RH sont rattachées à l'heure de prise de poste, le matériel à l'heure
+# d'inventaire : la somme sur les créneaux redonne exactement le total du jour.
+
+RESOLUTIONS = {
+    "shift": ["Jour", "Nuit"],
+    "hour": [f"{h:02d}h" for h in range(24)],
+}
+
+# Mesure -> (table, colonne sommée ou None pour un simple comptage)
+MEASURES = {
+    "nb_patients": ("patients", None),
+    "somme_ccmu": ("patients", "ccmu"),
+    "somme_duree": ("patients", "duree_hospitalisation"),
+    "effectif_present": ("personnel", "effectif_present"),
+    "effectif_theorique": ("personnel", "effectif_theorique"),
+    "heures_supp": ("personnel", "heures_supp"),
+    "somme_taux_absenteisme": ("personnel", "taux_absenteisme"),
+    "nb_equipes": ("personnel", None),
+    "nbre_lits_dispos": ("materiel", "nbre_lits_dispos"),
+    "nb_pannes": ("materiel", "equipements_disponibles"),
+    "nb_inventaires": ("materiel", None),
+}
+
+# Colonnes (horodatage, service) de chaque table brute
+KEYS = {
+    "patients": ("date_et_heure_admission", "service_admission"),
+    "personnel": ("date_heure_prise_poste", "service"),
+    "materiel": ("date_heure_inventaire", "services"),
+}
+
+def _day_and_hour(ts):
+    """Jour (datetime64[D]) et heure (0-23) d'une colonne de timestamps, sans passer par .dt"""
+    valeurs = ts.to_numpy(dtype="datetime64[ns]")
+    jours = valeurs.astype("datetime64[D]")
+    heures = (valeurs.astype("datetime64[h]") - jours).astype(int)
+    return jours, heures
+
+def _service_codes(col, services):
+    """Code entier du service de chaque ligne (-1 si service inconnu)"""
+    if isinstance(col.dtype, pd.CategoricalDtype) and list(col.cat.categories) == list(services):
+        return col.cat.codes.to_numpy()
+    return pd.Categorical(col, categories=services).codes
+
+def _slot_codes(heures, resolution):
+    if resolution == "hour":
+        return heures
+    return np.where((heures >= 7) & (heures < 19), 0, 1)
+
+def _weights(df, colonne):
+    if colonne is None:
+        return None
+    if colonne == "equipements_disponibles":
+        return (df[colonne] == "Indisponible").to_numpy(dtype=float)
+    return df[colonne].to_numpy(dtype=float)
+
+@instrumentation.traced("agregation.build_cube", lignes=lambda cube: len(cube["dates"]))
+def build_cube(tables, resolution="shift", services=SERVICES, start=None, end=None):
+    """Construit le cube (jour x service x créneau) à partir des tables brutes.
+
+    tables : dict {"patients": df, "personnel": df, "materiel": df} (tables absentes tolérées).
+    Retourne un dict : dates, services, creneaux et mesures {nom: ndarray (n_jours, n_svc, n_creneaux)}.
+    Seules les mesures dont les colonnes sont présentes sont calculées.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Résolution inconnue : {resolution!r} (attendu parmi {list(RESOLUTIONS)})")
+    creneaux = RESOLUTIONS[resolution]
+
+    # Un seul passage par table pour les clés (jour, service, créneau)
+    cles = {}
+    for nom, df in tables.items():
+        if df is None:
+            continue
+        col_ts, col_svc = KEYS[nom]
+        jours, heures = _day_and_hour(df[col_ts])
+        cles[nom] = (df, jours, _service_codes(df[col_svc], services), _slot_codes(heures, resolution))
+
+    bornes = [j for _, j, _, _ in cles.values() if len(j)]
+    debut = np.datetime64(pd.Timestamp(start).date()) if start is not None else min(j.min() for j in bornes)
+    fin = np.datetime64(pd.Timestamp(end).date()) if end is not None else max(j.max() for j in bornes)
+    n_jours, n_svc, n_cr = int((fin - debut).astype(int)) + 1, len(services), len(creneaux)
+    taille = n_jours * n_svc * n_cr
+
+    indices = {}
+    for nom, (df, jours, svc, slot) in cles.items():
+        jour_idx = (jours - debut).astype(int)
+        valide = (svc >= 0) & (jour_idx >= 0) & (jour_idx < n_jours)
+        indices[nom] = (df, valide, ((jour_idx * n_svc + svc) * n_cr + slot)[valide])
+
+    mesures = {}
+    for mesure, (nom, colonne) in MEASURES.items():
+        if nom not in indices:
+            continue
+        df, valide, idx = indices[nom]
+        if colonne is not None and colonne not in df.columns:
+            continue
+        poids = _weights(df, colonne)
+        compte = np.bincount(idx, weights=None if poids is None else poids[valide], minlength=taille)
+        mesures[mesure] = compte.reshape(n_jours, n_svc, n_cr)
+
+    return {
+        "dates": pd.DatetimeIndex(debut + np.arange(n_jours)).astype("datetime64[ns]"),
+        "services": list(services),
+        "creneaux": creneaux,
+        "mesures": mesures,
+    }
+
+def cube_to_frame(cube, measures=None):
+    """Vue longue du cube : une ligne par (date, service, créneau)"""
+    n_jours, n_svc, n_cr = len(cube["dates"]), len(cube["services"]), len(cube["creneaux"])
+    index = pd.MultiIndex.from_product([cube["dates"], cube["services"], cube["creneaux"]],
+                                       names=["date", "service", "creneau"])
+    noms = measures or list(cube["mesures"])
+    return pd.DataFrame({m: cube["mesures"][m].reshape(n_jours * n_svc * n_cr) for m in noms}, index=index)
+
+@instrumentation.traced("agregation.rollup_daily", lignes=len)
+def rollup_daily(cube):
+    """Agrégat hôpital / jour, aux colonnes de train_data_hybride (avant la variable d'inertie).
+
+    Comme dans le notebook 02, seuls les jours ayant au moins un patient sont conservés
+    et un jour sans donnée RH / matériel donne des valeurs manquantes.
+    """
+    m = {nom: v.sum(axis=(1, 2)) for nom, v in cube["mesures"].items()}
+    dates = cube["dates"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        taux = np.where(m["nb_equipes"] > 0, m["somme_taux_absenteisme"] / m["nb_equipes"], np.nan)
+
+    df = pd.DataFrame({
+        "date": dates,
+        "nb_patients": m["nb_patients"].astype("int64"),
+        "jour_semaine": dates.weekday,
+        "weekend": dates.weekday.isin([5, 6]).astype(int),
+        "mois": dates.month,
+        "hiver": dates.month.isin([12, 1, 2]).astype(int),
+        "effectif_present": np.where(m["nb_equipes"] > 0, m["effectif_present"], np.nan),
+        "taux_absenteisme": taux,
+        "nbre_lits_dispos": np.where(m["nb_inventaires"] > 0, m["nbre_lits_dispos"], np.nan),
+        "panne_materiel": np.where(m["nb_inventaires"] > 0, (m["nb_pannes"] > 0).astype(int), np.nan),
+    })
+    df = df[df["nb_patients"] > 0].reset_index(drop=True)
+
+    # Entiers quand aucun jour ne manque (comme un merge pandas sans trou)
+    for col in ["effectif_present", "nbre_lits_dispos", "panne_materiel"]:
+        if df[col].notna().all():
+            df[col] = df[col].astype("int64")
+    return df
+
+@instrumentation.traced("agregation.rollup_service_daily", lignes=len)
+def rollup_service_daily(cube):
+    """Agrégat service / jour (format long, une ligne par date x service), mêmes colonnes
+    que rollup_daily plus "service". Les ressources sont celles du service.
+
+    Les jours sans aucun patient dans l'hôpital sont écartés (comme rollup_daily) ;
+    un service sans admission un jour donné garde une ligne à 0 patient.
+    """
+    m = {nom: v.sum(axis=2) for nom, v in cube["mesures"].items()}           # (n_jours, n_svc)
+    garde = m["nb_patients"].sum(axis=1) > 0
+    m = {nom: v[garde] for nom, v in m.items()}
+    dates = cube["dates"][garde]
+    n_jours, n_svc = len(dates), len(cube["services"])
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        taux = np.where(m["nb_equipes"] > 0, m["somme_taux_absenteisme"] / m["nb_equipes"], np.nan)
+    date_col = dates.repeat(n_svc)
+
+    return pd.DataFrame({
+        "date": date_col,
+        "service": pd.Categorical(np.tile(cube["services"], n_jours), categories=cube["services"]),
+        "nb_patients": m["nb_patients"].ravel().astype("int64"),
+        "jour_semaine": date_col.weekday,
+        "weekend": date_col.weekday.isin([5, 6]).astype(int),
+        "mois": date_col.month,
+        "hiver": date_col.month.isin([12, 1, 2]).astype(int),
+        "effectif_present": np.where(m["nb_equipes"] > 0, m["effectif_present"], np.nan).ravel(),
+        "taux_absenteisme": taux.ravel(),
+        "nbre_lits_dispos": np.where(m["nb_inventaires"] > 0, m["nbre_lits_dispos"], np.nan).ravel(),
+        "panne_materiel": np.where(m["nb_inventaires"] > 0, (m["nb_pannes"] > 0).astype(int), np.nan).ravel(),
+    })
@@ -0,0 +1,153 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+from src import training
+from src.forecast import FEATURES, TARGET
+from src.thresholds import SAISONS, alert_thresholds
+
+# --- BACKTESTING À ORIGINE GLISSANTE ---
+# Au lieu d'un unique découpage 80/20, on rejoue l'entraînement à plusieurs dates
+# d'origine : chaque pli entraîne sur le passé (fenêtre croissante ou glissante) et
+# prédit les `horizon` jours suivants (J+1, comme l'évaluation du notebook 03).
+# La matrice de features est construite une seule fois : les plis n'en lisent que
+# des tranches (vues, sans copie). En parallèle, chaque worker la reçoit une seule
+# fois à son démarrage, pas à chaque pli.
+
+MODES = ["expanding", "sliding"]
+NB_PLIS = 8
+HORIZON = 90            # Jours de test par pli
+MIN_TRAIN = 365         # Jours d'entraînement minimum (et taille de la fenêtre glissante)
+
+NIVEAUX = ["NORMAL", "PRE-ALERTE", "ALERTE", "CRITIQUE"]
+
+# Matrices partagées par les plis d'un même processus (remplies par _init_worker)
+_MATRICES = {}
+
+def feature_matrices(df):
+    """(X, y) float32 du dataset complet, construits une fois pour tous les plis"""
+    return df[FEATURES].to_numpy(dtype=np.float32), df[TARGET].to_numpy(dtype=np.float32)
+
+def make_folds(n_jours, n_folds=NB_PLIS, horizon=HORIZON, mode="expanding", min_train=MIN_TRAIN):
+    """Plis (debut_train, origine, fin_test) en indices de lignes, les derniers jours en dernier test.
+
+    expanding : l'entraînement commence toujours au premier jour.
+    sliding   : l'entraînement couvre les `min_train` jours précédant l'origine.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode inconnu : {mode!r} (attendu parmi {MODES})")
+    plis = []
+    for k in range(n_folds, 0, -1):
+        origine = n_jours - k * horizon
+        if origine < min_train:
+            continue
+        debut = 0 if mode == "expanding" else origine - min_train
+        plis.append((debut, origine, min(origine + horizon, n_jours)))
+    if not plis:
+        raise ValueError(f"Historique trop court : {n_jours} jours pour min_train={min_train} et horizon={horizon}")
+    return plis
+
+def _init_worker(X, y):
+    _MATRICES["X"], _MATRICES["y"] = X, y
+
+def _run_fold(args):
+    numero, (debut, origine, fin), params = args
+    X, y = _MATRICES["X"], _MATRICES["y"]
+
+    t0 = time.perf_counter()
+    model = XGBRegressor(**{**training.DEFAULT_PARAMS, **params})
+    model.fit(X[debut:origine], y[debut:origine])
+    t_train = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    preds = model.predict(X[origine:fin])
+    t_predict = time.perf_counter() - t0
+    return numero, preds, t_train, t_predict
+
+def _scores(reel, predit):
+    erreur = predit - reel
+    return {"n": len(erreur), "mae": float(np.abs(erreur).mean()), "rmse": float(np.sqrt((erreur ** 2).mean()))}
+
+def _par_groupe(predictions, colonne, ordre):
+    lignes = [{colonne: g, **_scores(sel['reel'].to_numpy(), sel['predit'].to_numpy())}
+              for g in ordre if len(sel := predictions[predictions[colonne] == g])]
+    return pd.DataFrame(lignes)
+
+def run_backtest(df, n_folds=NB_PLIS, horizon=HORIZON, mode="expanding", min_train=MIN_TRAIN,
+                 params=None, n_workers=1, seuils=None):
+    """Backtest complet. Retourne un dict de DataFrames :
+    plis (scores et temps par pli), predictions (une ligne par jour testé),
+    par_saison et par_niveau (niveau d'alerte du flux réel, seuils du notebook 03).
+    """
+    df = df.sort_values('date').reset_index(drop=True)
+    X, y = feature_matrices(df)
+    plis = make_folds(len(df), n_folds, horizon, mode, min_train)
+    params = dict(params or {})
+    if n_workers > 1:
+        # Un cœur par pli : le parallélisme vient du pool, pas des threads XGBoost
+        params.setdefault("n_jobs", 1)
+    taches = [(i, pli, params) for i, pli in enumerate(plis)]
+
+    if n_workers > 1 and len(taches) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(X, y)) as pool:
+            resultats = list(pool.map(_run_fold, taches))
+    else:
+        _init_worker(X, y)
+        resultats = [_run_fold(t) for t in taches]
+        _MATRICES.clear()
+
+    seuils = seuils or alert_thresholds(df)
+    bornes = [seuils["SEUIL_PREALERTE"], seuils["SEUIL_ALERTE"], seuils["SEUIL_CRITIQUE"]]
+    lignes_plis, predictions = [], []
+    for numero, preds, t_train, t_predict in resultats:
+        debut, origine, fin = plis[numero]
+        reel = y[origine:fin]
+        lignes_plis.append({
+            "pli": numero, "debut_train": df['date'].iloc[debut], "debut_test": df['date'].iloc[origine],
+            "fin_test": df['date'].iloc[fin - 1], "n_train": origine - debut,
+            **_scores(reel, preds), "t_train": t_train, "t_predict": t_predict})
+        dates = df['date'].iloc[origine:fin]
+        predictions.append(pd.DataFrame({
+            "date": dates.to_numpy(), "pli": numero, "reel": reel, "predit": preds,
+            "saison": dates.dt.month.map(SAISONS).to_numpy(),
+            "niveau": np.array(NIVEAUX)[np.searchsorted(bornes, reel, side="right")]}))
+
+    predictions = pd.concat(predictions, ignore_index=True)
+    return {
+        "plis": pd.DataFrame(lignes_plis),
+        "predictions": predictions,
+        "par_saison": _par_groupe(predictions, "saison", ["Hiver", "Printemps", "Été", "Automne"]),
+        "par_niveau": _par_groupe(predictions, "niveau", NIVEAUX),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtesting à origine glissante du modèle de flux")
+    parser.add_argument("--data", default=training.TRAIN_PATH)
+    parser.add_argument("--folds", type=int, default=NB_PLIS)
+    parser.add_argument("--horizon", type=int, default=HORIZON)
+    parser.add_argument("--mode", choices=MODES, default="expanding")
+    parser.add_argument("--min-train", type=int, default=MIN_TRAIN)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="Dossier où écrire les tableaux (CSV)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    rapport = run_backtest(training.load_train_data(args.data), args.folds, args.horizon, args.mode,
+                           args.min_train, n_workers=args.workers)
+    duree = time.perf_counter() - t0
+
+    pd.set_option("display.width", 160)
+    for nom in ["plis", "par_saison", "par_niveau"]:
+        print(f"\n=== {nom} ===")
+        print(rapport[nom].to_string(index=False, float_format="{:.3f}".format))
+    global_ = _scores(rapport["predictions"]["reel"].to_numpy(), rapport["predictions"]["predit"].to_numpy())
+    print(f"\n✅ {len(rapport['plis'])} plis ({args.mode}) en {duree:.1f}s - "
+          f"MAE {global_['mae']:.2f} / RMSE {global_['rmse']:.2f}")
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        for nom, table in rapport.items():
+            table.to_csv(os.path.join(args.output, f"backtest_{nom}.csv"), index=False)
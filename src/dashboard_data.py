@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from src import scenario_cube, storage, thresholds
+from src.data_generator import CAPACITY_CONFIG, RAW_DIR
+
+# --- COUCHE DE DONNÉES DU DASHBOARD ---
+# - Série de flux construite en NumPy vectorisé, avec une graine fixe : le même
+#   historique à chaque démarrage (plus de tirage différent à chaque cache miss).
+# - Cache disque (data/cache) partagé entre processus et conservé après un
+#   redémarrage du serveur : un démarrage à froid relit au lieu de recalculer.
+# - Série indexée par date (index trié) : une période est une tranche obtenue par
+#   recherche dichotomique, sans masque booléen sur tout le DataFrame.
+# - Quand un modèle est entraîné (src.forecast_service), la série affichée est celle
+#   de ses prévisions ; la série synthétique ne sert plus que de repli.
+# - Les modules ML (xgboost, ~1 s d'import) ne sont chargés que si un modèle est
+#   entraîné : sans modèle, PrecomputedService sert dashboard_alertes.csv.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(PROJECT_ROOT, "data", "cache")
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, "data", "processed")
+ALERTES_FILE = "dashboard_alertes.csv"
+
+# Dataset et fichiers d'un modèle entraîné (hôpital, par service) : mêmes chemins que
+# src.training et src.service_forecast, recopiés pour ne pas importer xgboost
+TRAIN_FILE = "train_data_hybride.csv"
+MODEL_DIR = os.path.join(PROJECT_ROOT, "models")
+MODEL_FILES = ["xgb_flux.json", os.path.join("services", "services.meta.json")]
+
+HISTORY_START = "2018-01-01"
+HISTORY_END = "2026-12-31"
+FLUX_SEED = 42
+
+# À incrémenter dès que la formule de la série ou du cube change (invalide le cache disque)
+CACHE_VERSION = 1
+
+def build_flux_series(start=HISTORY_START, end=HISTORY_END, seed=FLUX_SEED):
+    """Flux de base journalier (tendance, saisonnalité hivernale, pic Covid, bruit)"""
+    dates = pd.date_range(start=start, end=end, freq='D')
+    rng = np.random.default_rng(seed)
+
+    # Tendance +5/an
+    year_trend = (dates.year - 2018) * 5
+    # Saisonnalité Hiver
+    seasonality = np.cos((dates.dayofyear / 365) * 2 * np.pi) * 40
+    # Pic Covid 2020-21
+    covid = np.where((dates.year >= 2020) & (dates.year <= 2021), 50, 0)
+
+    base_flux = np.trunc(300 + year_trend + seasonality + covid + rng.normal(0, 15, len(dates))).astype(int)
+    return pd.DataFrame({'date': dates, 'flux_base': base_flux})
+
+def _cache_path(nom, params, extension):
+    cle = hashlib.sha1(json.dumps({"v": CACHE_VERSION, **params}, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{nom}_{cle}.{extension}")
+
+def _save_npz(chemin, **tableaux):
+    """Écrit dans un fichier temporaire puis renomme : un lecteur concurrent ne voit
+    jamais un fichier à moitié écrit"""
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **tableaux)
+    os.replace(tmp, chemin)
+
+def load_flux_history(start=HISTORY_START, end=HISTORY_END, seed=FLUX_SEED, use_cache=True):
+    """Série de flux indexée par date, lue depuis le cache disque si disponible"""
+    chemin = _cache_path("flux_base", {"start": str(start), "end": str(end), "seed": seed}, "npz")
+    if use_cache and os.path.exists(chemin):
+        with np.load(chemin) as f:
+            df = pd.DataFrame({'date': f["date"].astype("datetime64[ns]"), 'flux_base': f["flux_base"]})
+    else:
+        df = build_flux_series(start, end, seed)
+        if use_cache:
+            _save_npz(chemin, date=df['date'].to_numpy().astype("datetime64[ns]"), flux_base=df['flux_base'].to_numpy())
+    return df.set_index('date', drop=False).rename_axis(None)
+
+def model_trained(site=None):
+    """Vrai si un modèle (hôpital ou par service) est entraîné pour le site"""
+    dossier = MODEL_DIR if site is None else storage.site_dir(MODEL_DIR, site)
+    return any(os.path.exists(os.path.join(dossier, f)) for f in MODEL_FILES)
+
+class PrecomputedService:
+    """Service de repli sans modèle entraîné : prévisions précalculées du notebook 03
+    (dashboard_alertes.csv), sans scénario, et dataset pour les seuils d'alerte. Même
+    interface que ForecastService pour le dashboard, sans importer les modules ML"""
+    model = service_models = hist_services = None
+
+    def __init__(self, site=None):
+        dossier = PROCESSED_DIR if site is None else storage.site_dir(PROCESSED_DIR, site)
+        self.alertes_path = os.path.join(dossier, ALERTES_FILE)
+        self.train_path = os.path.join(dossier, TRAIN_FILE)
+        self.model_dir = MODEL_DIR if site is None else storage.site_dir(MODEL_DIR, site)
+        self.alertes = self.hist = self._sig = None
+        self._verrou = threading.Lock()
+        self.refresh()
+
+    def refresh(self):
+        """Relit prévisions et dataset si un fichier a changé. Retourne True si rechargé"""
+        with self._verrou:
+            sig = []
+            for chemin in (self.alertes_path, self.train_path):
+                try:
+                    st = os.stat(chemin)
+                    sig.append((st.st_mtime_ns, st.st_size))
+                except FileNotFoundError:
+                    sig.append(None)
+            sig = tuple(sig)
+            if sig == self._sig:
+                return False
+            self.alertes = None if sig[0] is None else pd.read_csv(
+                self.alertes_path, parse_dates=['date'], usecols=['date', 'flux_reel', 'flux_predit'])
+            self.hist = None if sig[1] is None else pd.read_csv(self.train_path, parse_dates=['date'])
+            self._sig = sig
+            return True
+
+    @property
+    def source(self):
+        return None if self.alertes is None else "precalcule"
+
+    @property
+    def available(self):
+        return self.source is not None
+
+    @property
+    def version(self):
+        return f"aucun-{hashlib.sha1(repr(self._sig).encode()).hexdigest()[:8]}"
+
+    def predict_range(self, start, end, scenario=None):
+        """Prévisions précalculées de [start, end] (mêmes colonnes que ForecastService)"""
+        if scenario:
+            raise ValueError("Scénario indisponible sans modèle entraîné (lancer `python -m src.training`)")
+        self.refresh()
+        a = self.alertes
+        if a is None:
+            raise FileNotFoundError("Aucun modèle ni prévision précalculée disponible")
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        sel = a[(a['date'] >= start) & (a['date'] <= end)]
+        return sel.assign(source="precalcule").reset_index(drop=True)[['date', 'flux_reel', 'flux_predit', 'source']]
+
+def load_forecast_history(service, start=HISTORY_START, end=HISTORY_END):
+    """Série du dashboard issue du service de prévision (modèle entraîné) : flux_base =
+    prévision arrondie, flux_reel = nb_patients observé (NaN pour les jours futurs)"""
+    preds = service.predict_range(start, end).dropna(subset=['flux_predit'])
+    df = pd.DataFrame({'date': pd.DatetimeIndex(preds['date']).astype("datetime64[ns]"),
+                       'flux_base': np.round(preds['flux_predit'].to_numpy()).astype(int),
+                       'flux_reel': preds['flux_reel'].to_numpy(dtype=float)})
+    return df.set_index('date', drop=False).rename_axis(None)
+
+def load_service_weights(service, dates):
+    """Part de chaque service affiché, jour par jour, d'après les modèles par service.
+    None si aucun modèle par service ; répartition fixe pour les jours non couverts"""
+    if service.service_models is None:
+        return None
+    from src.service_forecast import service_shares
+    dates = pd.DatetimeIndex(dates)
+    preds = service.predict_services(dates[0], dates[-1])
+    parts = scenario_cube.SERVICES_SOURCES
+    poids = np.tile(np.asarray(scenario_cube.FLUX_WEIGHTS, dtype=float), (len(dates), 1))
+    if len(preds):
+        pos = dates.get_indexer(preds.index)
+        poids[pos[pos >= 0]] = service_shares(preds, parts)[pos >= 0]
+    return poids
+
+def load_site_config(site, raw_dir=os.path.join(PROJECT_ROOT, RAW_DIR)):
+    """Configuration d'un site (écrite par le générateur dans son shard), None si absente"""
+    chemin = os.path.join(storage.site_dir(raw_dir, site), storage.SITE_CONFIG_FILE)
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+def site_capacities(site_cfg):
+    """Capacités des services affichés pour un site : celles de la Pitié, à l'échelle des
+    lits du site (services sources de chaque service affiché)"""
+    if site_cfg is None:
+        return None
+    capacites = {}
+    for svc, sources in scenario_cube.SERVICES_SOURCES.items():
+        ratio = sum(site_cfg["capacites"][s]["Lits"] for s in sources) / sum(CAPACITY_CONFIG[s]["Lits"] for s in sources)
+        capacites[svc] = int(round(scenario_cube.CAPACITE_TOTALE[svc] * ratio))
+    return capacites
+
+def load_alert_thresholds(service):
+    """Seuils d'alerte du dashboard ({"PRE-ALERTE": ...}) : quantiles du notebook 03 tenus à jour
+    par src.thresholds (état persisté à côté du modèle). Seuils fixes pour la série de démonstration"""
+    if service.hist is not None:
+        chemin = os.path.join(service.model_dir, thresholds.THRESHOLDS_FILE)
+        return thresholds.refresh_engine(service.hist, chemin, service.hist_services).seuils()
+    if service.alertes is not None:
+        reel = service.alertes.dropna(subset=['flux_reel'])
+        return thresholds.ThresholdEngine().update(reel, 'flux_reel').seuils()
+    return dict(scenario_cube.SEUILS)
+
+def load_operational_cube(df_flux, weights=None, capacites=None, seuils=None, use_cache=True):
+    """Cube opérationnel (scenario_cube) de la série, lu depuis le cache disque si disponible"""
+    params = {
+        "flux": hashlib.sha1(np.ascontiguousarray(df_flux['flux_base'].to_numpy(dtype=np.int64))).hexdigest(),
+        "poids": None if weights is None else hashlib.sha1(np.ascontiguousarray(weights, dtype=float)).hexdigest(),
+        "capacites": capacites,
+        "debut": str(df_flux['date'].iloc[0]),
+        "sim_flux": scenario_cube.SIM_FLUX_STEPS.tolist(),
+        "sim_rh": scenario_cube.SIM_RH_STEPS.tolist(),
+        "seuils": seuils or scenario_cube.SEUILS,
+    }
+    chemin = _cache_path("ops_cube", params, "npz")
+    if use_cache and os.path.exists(chemin):
+        with np.load(chemin) as f:
+            cube = {k: f[k] for k in f.files}
+        cube["dates"] = pd.DatetimeIndex(cube["dates"].astype("datetime64[ns]"))
+        return cube
+
+    cube = scenario_cube.build_cube(df_flux['date'], df_flux['flux_base'], weights=weights, capacites=capacites,
+                                    seuils=seuils or scenario_cube.SEUILS)
+    if use_cache:
+        _save_npz(chemin, **{k: (v.values if k == "dates" else v) for k, v in cube.items()})
+    return cube
+
+def slice_period(df, start, end):
+    """Lignes de [start, end] (bornes incluses) par recherche dichotomique sur l'index trié"""
+    i0 = df.index.searchsorted(pd.Timestamp(start), side="left")
+    i1 = df.index.searchsorted(pd.Timestamp(end), side="right")
+    return df.iloc[i0:i1]
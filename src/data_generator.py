@@ -4,11 +4,21 @@ from datetime import timedelta, date
 import random
 import uuid
 import os
+import argparse
+import json
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from src import instrumentation, storage
 
 # --- 1. CONFIGURATION "VÉRITÉ TERRAIN" (2018-2025) ---
 START_DATE = date(2018, 1, 1)
 END_DATE = date(2025, 12, 31)
 
+RAW_DIR = "data/raw"
+RAW_TABLES = ["patients", "personnel", "materiel"]
+
 # Capacité officielle (~1717 lits) éclatée par spécialité
 CAPACITY_CONFIG = {
     "Cardiologie": {"Lits": 150, "Staff_Jour": 20},
@@ -66,16 +76,63 @@ def get_context_covid(current_date):
 
     return "Pre-Covid", impact
 
-def generate_grand_dataset():
-    print(f"🏥 Simulation Pitié-Salpêtrière {START_DATE.year}-{END_DATE.year} (SHIFTS 12H - JOUR/NUIT)...")
-    
+# --- CONFIGURATION D'UN SITE (MULTI-SITES) ---
+# Un site = capacités / effectifs par service, échelle du flux et calendrier
+# épidémique local. Le site par défaut reproduit exactement la Pitié-Salpêtrière
+# (CAPACITY_CONFIG et get_context_covid).
+# Une période du calendrier : nom, debut, fin (None = sans fin), facteur_flux,
+# priorite_infectieux, absenteisme, epidemie (effets "Covid" : staff de nuit renforcé,
+# intérim, détresses respiratoires) et deprogrammation (occupation réduite hors
+# services respiratoires). La première période qui contient le jour s'applique.
+CALENDRIER_DEFAUT = {
+    "defaut": {"nom": "Pre-Covid"},
+    "periodes": [
+        {"nom": "Crise Covid - Vague 1", "debut": "2020-03-15", "fin": "2020-05-15",
+         "facteur_flux": 0.6, "priorite_infectieux": 5.0, "absenteisme": 0.15},
+        {"nom": "Crise Covid - Vague 2", "debut": "2020-10-15", "fin": "2020-12-15",
+         "facteur_flux": 0.9, "priorite_infectieux": 3.0, "absenteisme": 0.10},
+        {"nom": "Post-Covid", "debut": "2022-01-01", "fin": None, "absenteisme": 0.05},
+    ],
+}
+
+DEFAULT_SITE = {
+    "nom": "pitie",
+    "capacites": CAPACITY_CONFIG,
+    "echelle_flux": 1.0,
+    "calendrier": CALENDRIER_DEFAUT,
+}
+
+def _periode(p):
+    """Période complétée par les valeurs neutres (mêmes règles que get_context_covid)"""
+    return {"facteur_flux": 1.0, "priorite_infectieux": 1.0, "absenteisme": 0.0,
+            "epidemie": "Covid" in p["nom"], "deprogrammation": p["nom"] == "Crise Covid - Vague 1", **p}
+
+def site_config(site=None):
+    """Site complet : valeurs du site par défaut pour tout ce qui n'est pas précisé.
+
+    Les capacités sont fusionnées service par service (mêmes services partout : les
+    tables de tous les sites partagent les mêmes catégories).
+    """
+    site = dict(site or {})
+    inconnus = set(site.get("capacites", {})) - set(SERVICES)
+    if inconnus:
+        raise ValueError(f"Services inconnus dans la configuration du site : {sorted(inconnus)}")
+    capacites = {svc: {**CAPACITY_CONFIG[svc], **site.get("capacites", {}).get(svc, {})} for svc in SERVICES}
+    return {**DEFAULT_SITE, **site, "capacites": capacites}
+
+def site_key(nom):
+    """Entier stable dérivé du nom du site (graines indépendantes de l'ordre des sites)"""
+    return zlib.crc32(nom.encode("utf-8"))
+
+def _generate_days_loop(start_date, end_date):
+    """Génération historique jour par jour, patient par patient (mode 'boucle')"""
     patients_data = []
     rh_data = []
     materiel_data = []
     
-    current_date = START_DATE
+    current_date = start_date
     
-    while current_date <= END_DATE:
+    while current_date <= end_date:
         # --- CONTEXTE ---
         month = current_date.month
         weekday = current_date.weekday()
@@ -85,164 +142,594 @@ def generate_grand_dataset():
         # --- 1. GÉNÉRATION RH (BOUCLE JOUR/NUIT) ---
         # On stocke le planning exact pour savoir qui travaille quand
         daily_staff_planning = {} 
+        with instrumentation.span("generation.boucle_rh") as span:
         
-        for svc in SERVICES:
-            cfg = CAPACITY_CONFIG[svc]
-            daily_staff_planning[svc] = {"Jour": 0, "Nuit": 0}
+            for svc in SERVICES:
+                cfg = CAPACITY_CONFIG[svc]
+                daily_staff_planning[svc] = {"Jour": 0, "Nuit": 0}
             
-            # ON GÉNÈRE 2 ÉQUIPES PAR JOUR : 07h-19h et 19h-07h
-            for shift_name in ["Jour", "Nuit"]:
+                # ON GÉNÈRE 2 ÉQUIPES PAR JOUR : 07h-19h et 19h-07h
+                for shift_name in ["Jour", "Nuit"]:
                 
-                if shift_name == "Jour":
-                    horaire = "07h-19h" # Shift 12h
-                    ts_poste = pd.Timestamp(current_date) + pd.Timedelta(hours=7)
-                    base_staff = cfg["Staff_Jour"]
-                else:
-                    horaire = "19h-07h" # Shift 12h
-                    ts_poste = pd.Timestamp(current_date) + pd.Timedelta(hours=19)
-                    
-                    # Règle Métier : Réduction la nuit
-                    if svc == "Urgences":
-                        base_staff = int(cfg["Staff_Jour"] * 0.75) 
-                    elif svc in ["Infectieux", "Pneumologie"] and "Covid" in periode_nom:
-                        base_staff = int(cfg["Staff_Jour"] * 0.6)
+                    if shift_name == "Jour":
+                        horaire = "07h-19h" # Shift 12h
+                        ts_poste = pd.Timestamp(current_date) + pd.Timedelta(hours=7)
+                        base_staff = cfg["Staff_Jour"]
                     else:
-                        base_staff = int(cfg["Staff_Jour"] * 0.35)
+                        horaire = "19h-07h" # Shift 12h
+                        ts_poste = pd.Timestamp(current_date) + pd.Timedelta(hours=19)
+                    
+                        # Règle Métier : Réduction la nuit
+                        if svc == "Urgences":
+                            base_staff = int(cfg["Staff_Jour"] * 0.75) 
+                        elif svc in ["Infectieux", "Pneumologie"] and "Covid" in periode_nom:
+                            base_staff = int(cfg["Staff_Jour"] * 0.6)
+                        else:
+                            base_staff = int(cfg["Staff_Jour"] * 0.35)
 
-                # Calcul Absenteisme
-                abs_base = 0.08
-                if is_winter: abs_base += 0.05
-                abs_total = abs_base + covid_ctx["absenteisme_covid"]
+                    # Calcul Absenteisme
+                    abs_base = 0.08
+                    if is_winter: abs_base += 0.05
+                    abs_total = abs_base + covid_ctx["absenteisme_covid"]
                 
-                taux_abs = min(0.40, np.random.beta(5, 50) + abs_total)
-                staff_pres = int(base_staff * (1 - taux_abs))
+                    taux_abs = min(0.40, np.random.beta(5, 50) + abs_total)
+                    staff_pres = int(base_staff * (1 - taux_abs))
                 
-                # Heures Supp (Si crise > 15% absents)
-                heures_supp = 0
-                if taux_abs > 0.15:
-                    heures_supp = int((base_staff - staff_pres) * 0.5 * 12) # Basé sur 12h
-
-                # Choix Type Personnel (Plus varié)
-                # Probabilités par défaut : Titulaire majoritaire
-                probs = [0.70, 0.10, 0.10, 0.05, 0.05] 
-                if "Covid" in periode_nom:
-                     # Plus d'interim et vacataires pendant le Covid
-                     probs = [0.55, 0.10, 0.20, 0.10, 0.05]
+                    # Heures Supp (Si crise > 15% absents)
+                    heures_supp = 0
+                    if taux_abs > 0.15:
+                        heures_supp = int((base_staff - staff_pres) * 0.5 * 12) # Basé sur 12h
+
+                    # Choix Type Personnel (Plus varié)
+                    # Probabilités par défaut : Titulaire majoritaire
+                    probs = [0.70, 0.10, 0.10, 0.05, 0.05] 
+                    if "Covid" in periode_nom:
+                         # Plus d'interim et vacataires pendant le Covid
+                         probs = [0.55, 0.10, 0.20, 0.10, 0.05]
                 
-                type_perso = np.random.choice(TYPES_PERSONNEL, p=probs)
-
-                # SAUVEGARDE RH
-                rh_data.append({
-                    "id_personnel": f"TEAM-{svc[:3]}-{shift_name[0]}-{current_date.strftime('%Y%m%d')}",
-                    "date_heure_prise_poste": ts_poste,
-                    "service": svc,
-                    "shift": shift_name,
-                    "horaires_de_travail": horaire,
-                    "type_de_personnel": type_perso,
-                    "effectif_theorique": base_staff,
-                    "effectif_present": staff_pres,
-                    "taux_absenteisme": round(taux_abs, 2),
-                    "heures_supp": heures_supp
-                })
+                    type_perso = np.random.choice(TYPES_PERSONNEL, p=probs)
+
+                    # SAUVEGARDE RH
+                    rh_data.append({
+                        "id_personnel": f"TEAM-{svc[:3]}-{shift_name[0]}-{current_date.strftime('%Y%m%d')}",
+                        "date_heure_prise_poste": ts_poste,
+                        "service": svc,
+                        "shift": shift_name,
+                        "horaires_de_travail": horaire,
+                        "type_de_personnel": type_perso,
+                        "effectif_theorique": base_staff,
+                        "effectif_present": staff_pres,
+                        "taux_absenteisme": round(taux_abs, 2),
+                        "heures_supp": heures_supp
+                    })
                 
-                # Mise en mémoire pour les patients
-                daily_staff_planning[svc][shift_name] = staff_pres
+                    # Mise en mémoire pour les patients
+                    daily_staff_planning[svc][shift_name] = staff_pres
+            span.add(2 * len(SERVICES))
 
         # --- 2. MATÉRIEL (Inventaire à 08h00) ---
         materiel_snapshot_ts = pd.Timestamp(current_date) + pd.Timedelta(hours=8)
         daily_lits_status = {}
+        with instrumentation.span("generation.boucle_materiel", len(SERVICES)):
         
-        for svc in SERVICES:
-            lits_total = CAPACITY_CONFIG[svc]["Lits"]
-            occ_rate = np.random.uniform(0.85, 0.98) 
-            if periode_nom == "Crise Covid - Vague 1" and svc not in ["Infectieux", "Pneumologie"]: occ_rate = 0.4
+            for svc in SERVICES:
+                lits_total = CAPACITY_CONFIG[svc]["Lits"]
+                occ_rate = np.random.uniform(0.85, 0.98) 
+                if periode_nom == "Crise Covid - Vague 1" and svc not in ["Infectieux", "Pneumologie"]: occ_rate = 0.4
             
-            lits_occ = int(lits_total * occ_rate)
-            lits_dispo = max(0, lits_total - lits_occ)
+                lits_occ = int(lits_total * occ_rate)
+                lits_dispo = max(0, lits_total - lits_occ)
             
-            equip_stat = "Operationnel"
-            if np.random.random() < 0.03: equip_stat = "Panne/Maintenance"
+                equip_stat = "Operationnel"
+                if np.random.random() < 0.03: equip_stat = "Panne/Maintenance"
             
-            type_lit = "Lit Standard"
-            if svc == "Urgences": type_lit = "Brancard"
-            elif svc == "Infectieux" and covid_ctx["priorite_infectieux"] > 1: type_lit = "Chambre Isolement"
-
-            materiel_data.append({
-                "date_heure_inventaire": materiel_snapshot_ts,
-                "services": svc,
-                "types_de_lits_disponibles": type_lit,
-                "nbre_lits_dispos": lits_dispo,
-                "equipements_disponibles": random.choice(TYPES_EQUIPEMENTS) if equip_stat == "Operationnel" else "Indisponible"
-            })
-            daily_lits_status[svc] = lits_dispo
+                type_lit = "Lit Standard"
+                if svc == "Urgences": type_lit = "Brancard"
+                elif svc == "Infectieux" and covid_ctx["priorite_infectieux"] > 1: type_lit = "Chambre Isolement"
+
+                materiel_data.append({
+                    "date_heure_inventaire": materiel_snapshot_ts,
+                    "services": svc,
+                    "types_de_lits_disponibles": type_lit,
+                    "nbre_lits_dispos": lits_dispo,
+                    "equipements_disponibles": random.choice(TYPES_EQUIPEMENTS) if equip_stat == "Operationnel" else "Indisponible"
+                })
+                daily_lits_status[svc] = lits_dispo
 
         # --- 3. PATIENTS (Flux Continu) ---
         season_factor = 1.3 if is_winter else 1.0
         day_factor = 1.15 if weekday == 0 else (0.85 if weekday == 6 else 1.0)
         lambd = 274 * season_factor * day_factor * covid_ctx["facteur_flux"]
         nb_patients = np.random.poisson(lambd)
+        with instrumentation.span("generation.boucle_patients", nb_patients):
         
-        for _ in range(nb_patients):
-            # Choix Service
-            weights = [100 if s == "Urgences" else (10 * covid_ctx["priorite_infectieux"] if s in ["Infectieux", "Pneumologie"] else 10) for s in SERVICES]
-            svc_adm = random.choices(SERVICES, weights=weights)[0]
+            for _ in range(nb_patients):
+                # Choix Service
+                weights = [100 if s == "Urgences" else (10 * covid_ctx["priorite_infectieux"] if s in ["Infectieux", "Pneumologie"] else 10) for s in SERVICES]
+                svc_adm = random.choices(SERVICES, weights=weights)[0]
             
-            # Motif & Gravité
-            motif = random.choice(MOTIFS_ADMISSION)
-            if svc_adm == "Cardiologie": motif = "Douleur Thoracique"
-            elif (svc_adm in ["Infectieux", "Pneumologie"]) and (is_winter or "Covid" in periode_nom): motif = "Detresse Respiratoire"
+                # Motif & Gravité
+                motif = random.choice(MOTIFS_ADMISSION)
+                if svc_adm == "Cardiologie": motif = "Douleur Thoracique"
+                elif (svc_adm in ["Infectieux", "Pneumologie"]) and (is_winter or "Covid" in periode_nom): motif = "Detresse Respiratoire"
             
-            ccmu = random.choices([1, 2, 3, 4, 5], weights=[0.3, 0.3, 0.25, 0.1, 0.05])[0]
+                ccmu = random.choices([1, 2, 3, 4, 5], weights=[0.3, 0.3, 0.25, 0.1, 0.05])[0]
             
-            # Timestamp Arrivée
-            hour_arrival = int(np.random.normal(14, 6)) % 24
-            ts_arrival = pd.Timestamp(current_date) + pd.Timedelta(hours=hour_arrival, minutes=random.randint(0,59))
+                # Timestamp Arrivée
+                hour_arrival = int(np.random.normal(14, 6)) % 24
+                ts_arrival = pd.Timestamp(current_date) + pd.Timedelta(hours=hour_arrival, minutes=random.randint(0,59))
             
-            # LOGIQUE COHÉRENTE : Quel staff est là QUAND le patient arrive ?
-            staff_actif = 0
-            # Si arrivée entre 07h et 19h -> Equipe Jour
-            if 7 <= hour_arrival < 19:
-                staff_actif = daily_staff_planning[svc_adm]["Jour"]
-            else:
-                staff_actif = daily_staff_planning[svc_adm]["Nuit"]
+                # LOGIQUE COHÉRENTE : Quel staff est là QUAND le patient arrive ?
+                staff_actif = 0
+                # Si arrivée entre 07h et 19h -> Equipe Jour
+                if 7 <= hour_arrival < 19:
+                    staff_actif = daily_staff_planning[svc_adm]["Jour"]
+                else:
+                    staff_actif = daily_staff_planning[svc_adm]["Nuit"]
             
-            # Durée Séjour (Impactée par le staff présent à l'instant T)
-            mu = 2.5 + (0.5 if hour_arrival > 20 or hour_arrival < 7 else 0)
+                # Durée Séjour (Impactée par le staff présent à l'instant T)
+                mu = 2.5 + (0.5 if hour_arrival > 20 or hour_arrival < 7 else 0)
             
-            # Pénalité Staff (Si ratio patients/staff explose)
-            if (nb_patients / 24) > max(1, staff_actif): # Sécurité division par 0
-                 mu += 0.5
+                # Pénalité Staff (Si ratio patients/staff explose)
+                if (nb_patients / 24) > max(1, staff_actif): # Sécurité division par 0
+                     mu += 0.5
 
-            los = np.random.lognormal(mu, 0.6)
+                los = np.random.lognormal(mu, 0.6)
             
-            # Pénalité Lit
-            if daily_lits_status[svc_adm] == 0: los += np.random.uniform(4, 12)
+                # Pénalité Lit
+                if daily_lits_status[svc_adm] == 0: los += np.random.uniform(4, 12)
             
-            # Issue
-            issue = "Retour Domicile"
-            if ccmu >= 3 or svc_adm != "Urgences": issue = "Transfert"
-            if ccmu == 5 and np.random.random() < 0.15: issue = "Deces"
-
-            patients_data.append({
-                "ID_Patient": str(uuid.uuid4())[:8],
-                "age": int(np.random.normal(60, 25)),
-                "sexe": random.choice(["M", "F"]),
-                "motif_admission": motif,
-                "ccmu": ccmu,
-                "duree_hospitalisation": round(los, 1),
-                "date_et_heure_admission": ts_arrival,
-                "service_admission": svc_adm,
-                "issue": issue
-            })
+                # Issue
+                issue = "Retour Domicile"
+                if ccmu >= 3 or svc_adm != "Urgences": issue = "Transfert"
+                if ccmu == 5 and np.random.random() < 0.15: issue = "Deces"
+
+                patients_data.append({
+                    "ID_Patient": str(uuid.uuid4())[:8],
+                    "age": int(np.random.normal(60, 25)),
+                    "sexe": random.choice(["M", "F"]),
+                    "motif_admission": motif,
+                    "ccmu": ccmu,
+                    "duree_hospitalisation": round(los, 1),
+                    "date_et_heure_admission": ts_arrival,
+                    "service_admission": svc_adm,
+                    "issue": issue
+                })
             
         current_date += timedelta(days=1)
 
+    return pd.DataFrame(patients_data), pd.DataFrame(rh_data), pd.DataFrame(materiel_data)
+
+# --- 2. GÉNÉRATION VECTORISÉE (TOUS LES JOURS D'UN COUP) ---
+# Mêmes règles métier que la boucle, mais chaque tirage est fait en un seul
+# appel NumPy sur l'ensemble des jours / services / patients de la période.
+
+SHIFTS = ["Jour", "Nuit"]
+HORAIRES = ["07h-19h", "19h-07h"]
+HEURES_PRISE_POSTE = [7, 19]
+PROBS_PERSONNEL = np.array([0.70, 0.10, 0.10, 0.05, 0.05])
+PROBS_PERSONNEL_COVID = np.array([0.55, 0.10, 0.20, 0.10, 0.05])
+PROBS_CCMU = np.array([0.3, 0.3, 0.25, 0.1, 0.05])
+TYPES_LITS = ["Lit Standard", "Brancard", "Chambre Isolement"]
+ISSUES = ["Retour Domicile", "Transfert", "Deces"]
+
+def _calendar_context(dates, site=None):
+    """Contexte (saison, calendrier épidémique, capacités du site) de chaque jour,
+    en tableaux alignés sur `dates`"""
+    site = site_config(site)
+    dates = pd.DatetimeIndex(dates).normalize()
+    calendrier = site["calendrier"]
+    defaut = _periode(calendrier.get("defaut", {"nom": "Pre-Covid"}))
+    champs = {"covid": "epidemie", "vague1": "deprogrammation", "facteur_flux": "facteur_flux",
+              "priorite_infectieux": "priorite_infectieux", "absenteisme_covid": "absenteisme"}
+    ctx = {cle: np.full(len(dates), defaut[champ], dtype=bool if cle in ("covid", "vague1") else float)
+           for cle, champ in champs.items()}
+
+    # La première période qui contient le jour s'applique
+    libre = np.ones(len(dates), dtype=bool)
+    for p in map(_periode, calendrier.get("periodes", [])):
+        dedans = libre & (dates >= pd.Timestamp(p["debut"]))
+        if p.get("fin") is not None:
+            dedans &= dates <= pd.Timestamp(p["fin"])
+        for cle, champ in champs.items():
+            ctx[cle][dedans] = p[champ]
+        libre &= ~dedans
+
+    return {
+        "dates": dates.values.astype("datetime64[D]"),
+        "weekday": dates.weekday.values,
+        "hiver": dates.month.isin([12, 1, 2]),
+        **ctx,
+        "staff_jour": np.array([site["capacites"][s]["Staff_Jour"] for s in SERVICES]),
+        "lits": np.array([site["capacites"][s]["Lits"] for s in SERVICES]),
+        "echelle_flux": float(site["echelle_flux"]),
+    }
+
+def _categorical(codes, categories):
+    return pd.Categorical.from_codes(np.asarray(codes), categories=categories)
+
+def _generate_rh_batch(ctx, rng):
+    """Planning RH (jour x service x shift). Retourne le DataFrame et l'effectif présent"""
+    n_days, n_svc = len(ctx["dates"]), len(SERVICES)
+    staff_jour = ctx["staff_jour"]
+    is_urg = np.array([s == "Urgences" for s in SERVICES])
+    is_resp = np.isin(SERVICES, ["Infectieux", "Pneumologie"])
+
+    # Règle Métier : Réduction la nuit (selon service et période Covid)
+    nuit = np.where(is_urg, (staff_jour * 0.75).astype(int), (staff_jour * 0.35).astype(int))
+    nuit = np.where(is_resp & ctx["covid"][:, None], (staff_jour * 0.6).astype(int), nuit)
+    base_staff = np.stack([np.broadcast_to(staff_jour, (n_days, n_svc)), nuit], axis=-1)
+
+    # Calcul Absenteisme
+    abs_total = np.where(ctx["hiver"], 0.08 + 0.05, 0.08) + ctx["absenteisme_covid"]
+    taux_abs = np.minimum(0.40, rng.beta(5, 50, size=base_staff.shape) + abs_total[:, None, None])
+    staff_pres = (base_staff * (1 - taux_abs)).astype(int)
+    heures_supp = np.where(taux_abs > 0.15, ((base_staff - staff_pres) * 0.5 * 12).astype(int), 0)
+
+    # Choix Type Personnel (Plus d'interim et vacataires pendant le Covid)
+    cum_probs = np.cumsum(np.stack([PROBS_PERSONNEL, PROBS_PERSONNEL_COVID]), axis=1)
+    u = rng.random(base_staff.shape)
+    type_perso = (u[..., None] >= cum_probs[ctx["covid"].astype(int)][:, None, None, :]).sum(-1)
+    type_perso = np.minimum(type_perso, len(TYPES_PERSONNEL) - 1)
+
+    jours_str = np.array(pd.DatetimeIndex(ctx["dates"]).strftime("%Y%m%d"), dtype=str)
+    prefixes = np.array([[f"TEAM-{svc[:3]}-{shift[0]}-" for shift in SHIFTS] for svc in SERVICES])
+    ts_poste = ctx["dates"][:, None, None] + np.array(HEURES_PRISE_POSTE, dtype="timedelta64[h]")
+    shape = base_staff.shape
+    shift_idx = np.broadcast_to(np.arange(2), shape).ravel()
+
+    df_rh = pd.DataFrame({
+        "id_personnel": np.char.add(prefixes[None, :, :], jours_str[:, None, None]).ravel(),
+        "date_heure_prise_poste": np.broadcast_to(ts_poste, shape).ravel().astype("datetime64[ns]"),
+        "service": _categorical(np.broadcast_to(np.arange(n_svc)[:, None], shape).ravel(), SERVICES),
+        "shift": _categorical(shift_idx, SHIFTS),
+        "horaires_de_travail": _categorical(shift_idx, HORAIRES),
+        "type_de_personnel": _categorical(type_perso.ravel(), TYPES_PERSONNEL),
+        "effectif_theorique": base_staff.ravel(),
+        "effectif_present": staff_pres.ravel(),
+        "taux_absenteisme": np.round(taux_abs, 2).ravel(),
+        "heures_supp": heures_supp.ravel(),
+    })
+    return df_rh, staff_pres
+
+def _generate_materiel_batch(ctx, rng):
+    """Inventaire à 08h00 (jour x service). Retourne le DataFrame et les lits dispos"""
+    n_days, n_svc = len(ctx["dates"]), len(SERVICES)
+    lits_total = ctx["lits"]
+    is_resp = np.isin(SERVICES, ["Infectieux", "Pneumologie"])
+
+    occ_rate = rng.uniform(0.85, 0.98, size=(n_days, n_svc))
+    occ_rate = np.where(ctx["vague1"][:, None] & ~is_resp, 0.4, occ_rate)
+    lits_occ = (lits_total * occ_rate).astype(int)
+    lits_dispo = np.maximum(0, lits_total - lits_occ)
+
+    panne = rng.random((n_days, n_svc)) < 0.03
+    equip = np.where(panne, len(TYPES_EQUIPEMENTS), rng.integers(0, len(TYPES_EQUIPEMENTS), size=(n_days, n_svc)))
+
+    type_lit = np.zeros((n_days, n_svc), dtype=int)
+    type_lit[:, SERVICES.index("Urgences")] = 1
+    type_lit[ctx["priorite_infectieux"] > 1, SERVICES.index("Infectieux")] = 2
+
+    ts_inventaire = ctx["dates"] + np.timedelta64(8, "h")
+    df_mat = pd.DataFrame({
+        "date_heure_inventaire": np.repeat(ts_inventaire, n_svc).astype("datetime64[ns]"),
+        "services": _categorical(np.tile(np.arange(n_svc), n_days), SERVICES),
+        "types_de_lits_disponibles": _categorical(type_lit.ravel(), TYPES_LITS),
+        "nbre_lits_dispos": lits_dispo.ravel(),
+        "equipements_disponibles": _categorical(equip.ravel(), TYPES_EQUIPEMENTS + ["Indisponible"]),
+    })
+    return df_mat, lits_dispo
+
+def _generate_patients_batch(ctx, rng, staff_pres, lits_dispo):
+    """Flux patients de tous les jours de la période, tirés en un seul passage"""
+    n_svc = len(SERVICES)
+    is_urg = np.array([s == "Urgences" for s in SERVICES])
+    is_resp = np.isin(SERVICES, ["Infectieux", "Pneumologie"])
+
+    # Nombre de patients par jour
+    season_factor = np.where(ctx["hiver"], 1.3, 1.0)
+    day_factor = np.where(ctx["weekday"] == 0, 1.15, np.where(ctx["weekday"] == 6, 0.85, 1.0))
+    lambd = 274 * ctx["echelle_flux"] * season_factor * day_factor * ctx["facteur_flux"]
+    nb_par_jour = rng.poisson(lambd)
+    jour = np.repeat(np.arange(len(nb_par_jour)), nb_par_jour)
+    n = len(jour)
+
+    # Choix Service (poids dépendant de la priorité infectieuse du jour)
+    svc = np.empty(n, dtype=int)
+    u = rng.random(n)
+    prio = ctx["priorite_infectieux"][jour]
+    for p in np.unique(prio):
+        cum_w = np.cumsum(np.where(is_urg, 100.0, np.where(is_resp, 10 * p, 10.0)))
+        sel = prio == p
+        svc[sel] = np.searchsorted(cum_w, u[sel] * cum_w[-1], side="right")
+    svc = np.minimum(svc, n_svc - 1)
+
+    # Motif & Gravité
+    motif = rng.integers(0, len(MOTIFS_ADMISSION), size=n)
+    resp_ctx = is_resp[svc] & (ctx["hiver"] | ctx["covid"])[jour]
+    motif = np.where(resp_ctx, MOTIFS_ADMISSION.index("Detresse Respiratoire"), motif)
+    motif = np.where(svc == SERVICES.index("Cardiologie"), MOTIFS_ADMISSION.index("Douleur Thoracique"), motif)
+    ccmu = np.minimum(np.searchsorted(np.cumsum(PROBS_CCMU), rng.random(n) * PROBS_CCMU.sum(), side="right"), 4) + 1
+
+    # Timestamp Arrivée
+    hour_arrival = np.trunc(rng.normal(14, 6, size=n)).astype(int) % 24
+    minutes = rng.integers(0, 60, size=n)
+    ts_arrival = (ctx["dates"][jour].astype("datetime64[m]")
+                  + hour_arrival.astype("timedelta64[h]") + minutes.astype("timedelta64[m]"))
+
+    # Staff présent QUAND le patient arrive (07h-19h -> Jour, sinon Nuit)
+    shift = np.where((hour_arrival >= 7) & (hour_arrival < 19), 0, 1)
+    staff_actif = staff_pres[jour, svc, shift]
+
+    # Durée Séjour (nuit, ratio patients/staff, absence de lit)
+    mu = 2.5 + np.where((hour_arrival > 20) | (hour_arrival < 7), 0.5, 0.0)
+    mu = mu + np.where(nb_par_jour[jour] / 24 > np.maximum(1, staff_actif), 0.5, 0.0)
+    los = rng.lognormal(mu, 0.6)
+    los = los + np.where(lits_dispo[jour, svc] == 0, rng.uniform(4, 12, size=n), 0.0)
+
+    # Issue
+    issue = np.where((ccmu >= 3) | ~is_urg[svc], 1, 0)
+    issue = np.where((ccmu == 5) & (rng.random(n) < 0.15), 2, issue)
+
+    ids = np.char.mod("%08x", rng.integers(0, 2**32, size=n, dtype=np.uint64))
+
+    return pd.DataFrame({
+        "ID_Patient": ids,
+        "age": np.trunc(rng.normal(60, 25, size=n)).astype(int),
+        "sexe": _categorical(rng.integers(0, 2, size=n), ["M", "F"]),
+        "motif_admission": _categorical(motif, MOTIFS_ADMISSION),
+        "ccmu": ccmu,
+        "duree_hospitalisation": np.round(los, 1),
+        "date_et_heure_admission": ts_arrival.astype("datetime64[ns]"),
+        "service_admission": _categorical(svc, SERVICES),
+        "issue": _categorical(issue, ISSUES),
+    })
+
+def generate_days_vectorized(dates, rng, site=None):
+    """Génère patients, RH et matériel pour une liste de jours, en tableaux NumPy"""
+    ctx = _calendar_context(dates, site)
+    with instrumentation.span("generation.rh") as span:
+        df_rh, staff_pres = _generate_rh_batch(ctx, rng)
+        span.add(len(df_rh))
+    with instrumentation.span("generation.materiel") as span:
+        df_mat, lits_dispo = _generate_materiel_batch(ctx, rng)
+        span.add(len(df_mat))
+    with instrumentation.span("generation.patients") as span:
+        df_patients = _generate_patients_batch(ctx, rng, staff_pres, lits_dispo)
+        span.add(len(df_patients))
+    return df_patients, df_rh, df_mat
+
+# --- 3. GÉNÉRATION PARALLÈLE & DÉTERMINISTE ---
+# La période est découpée en blocs mensuels FIXES. Chaque bloc reçoit son propre
+# flux aléatoire, dérivé de la graine maître et de l'index du mois : le résultat
+# ne dépend donc pas du nombre de workers (ni de l'ordre d'exécution des blocs).
+
+def month_chunks(start_date, end_date):
+    """Découpe [start_date, end_date] en blocs mensuels : [(clé_mois, dates), ...]"""
+    dates = pd.date_range(start_date, end_date, freq="D")
+    mois = dates.year * 12 + dates.month - 1
+    bornes = np.flatnonzero(np.diff(mois)) + 1
+    return [(int(bloc_mois[0]), bloc) for bloc_mois, bloc in zip(np.split(mois, bornes), np.split(dates, bornes))]
+
+def chunk_seed(master_seed, cle_mois, site=None):
+    """Flux aléatoire indépendant d'un bloc, dérivé de la graine maître (et du nom du
+    site : chaque site a ses propres tirages, le site par défaut garde les siens)"""
+    if site is None or site.get("nom", DEFAULT_SITE["nom"]) == DEFAULT_SITE["nom"]:
+        return np.random.SeedSequence(master_seed, spawn_key=(cle_mois,))
+    return np.random.SeedSequence(master_seed, spawn_key=(cle_mois, site_key(site["nom"])))
+
+def _generate_chunk(args):
+    dates, seed_seq, site = args
+    return generate_days_vectorized(dates, np.random.default_rng(seed_seq), site)
+
+def iter_period(start_date, end_date, seed=None, n_workers=1, site=None):
+    """Produit les blocs mensuels dans l'ordre : (clé_mois, (patients, rh, materiel)).
+
+    En parallèle, au plus 2 x n_workers blocs sont en vol : la mémoire reste
+    bornée quelle que soit la longueur de la période.
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    taches = ((cle, (dates, chunk_seed(seed, cle, site), site)) for cle, dates in month_chunks(start_date, end_date))
+
+    if n_workers <= 1:
+        for cle, tache in taches:
+            yield cle, _generate_chunk(tache)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        en_vol = deque()
+        for cle, tache in taches:
+            en_vol.append((cle, pool.submit(_generate_chunk, tache)))
+            if len(en_vol) >= 2 * n_workers:
+                cle_prete, future = en_vol.popleft()
+                yield cle_prete, future.result()
+        while en_vol:
+            cle_prete, future = en_vol.popleft()
+            yield cle_prete, future.result()
+
+def generate_period(start_date, end_date, seed=None, n_workers=1, site=None):
+    """Génère [start_date, end_date] par blocs mensuels, éventuellement en parallèle.
+
+    À graine égale, la sortie est identique bit à bit quel que soit n_workers.
+    """
+    resultats = [dfs for _, dfs in iter_period(start_date, end_date, seed=seed, n_workers=n_workers, site=site)]
+    return tuple(pd.concat(dfs, ignore_index=True) for dfs in zip(*resultats))
+
+# --- 4. ÉCRITURE EN FLUX (MÉMOIRE BORNÉE) ---
+
+def _format_mois(cle_mois):
+    return f"{cle_mois // 12}-{cle_mois % 12 + 1:02d}"
+
+def stream_period(start_date, end_date, output_dir=RAW_DIR, seed=None, n_workers=1, fmt="csv", verbose=True,
+                  site=None):
+    """Écrit la période bloc par bloc (un mois à la fois) sans tout garder en mémoire.
+
+    Chaque bloc est ajouté aux tables (CSV ou Parquet) dès qu'il est produit, puis libéré.
+    Retourne le nombre total de lignes écrites par table.
+    """
+    totaux = [0] * len(RAW_TABLES)
+    t0 = time.perf_counter()
+
+    for i, (cle, dfs) in enumerate(iter_period(start_date, end_date, seed=seed, n_workers=n_workers, site=site)):
+        t_bloc = time.perf_counter()
+        for j, (df, nom) in enumerate(zip(dfs, RAW_TABLES)):
+            storage.write_table(df, nom, output_dir, fmt=fmt, append=(i > 0))
+            totaux[j] += len(df)
+
+        if verbose:
+            duree = time.perf_counter() - t0
+            print(f"   📦 {_format_mois(cle)} : {len(dfs[0]):>7} patients | "
+                  f"écriture {time.perf_counter() - t_bloc:.2f}s | "
+                  f"cumul {totaux[0]:>9} patients ({totaux[0] / max(duree, 1e-9):,.0f} patients/s)")
+
+    return dict(zip(RAW_TABLES, totaux))
+
+# --- 5. MULTI-SITES (UN SHARD PAR SITE) ---
+# Un site = une tâche : chaque worker génère et écrit tout son site dans son propre
+# dossier (<output_dir>/sites/<nom>/). Aucune écriture partagée : le débit croît
+# linéairement avec le nombre de cœurs dès qu'il y a au moins autant de sites que de workers.
+
+def load_sites(path):
+    """Liste de sites depuis un fichier JSON (liste de configurations de site)"""
+    with open(path, encoding="utf-8") as f:
+        return [site_config(site) for site in json.load(f)]
+
+def synthetic_sites(n_sites, seed=0):
+    """N sites fictifs : capacités, effectifs et flux mis à l'échelle, vagues épidémiques décalées"""
+    rng = np.random.default_rng(seed)
+    sites = []
+    for i in range(n_sites):
+        echelle = float(np.round(rng.uniform(0.3, 1.5), 2))
+        decalage = int(rng.integers(-30, 31))
+        periodes = [{**p, "debut": str(pd.Timestamp(p["debut"]) + pd.Timedelta(days=decalage))[:10],
+                     "fin": None if p["fin"] is None else str(pd.Timestamp(p["fin"]) + pd.Timedelta(days=decalage))[:10]}
+                    for p in CALENDRIER_DEFAUT["periodes"]]
+        sites.append(site_config({
+            "nom": f"site_{i:03d}",
+            "echelle_flux": echelle,
+            "capacites": {svc: {"Lits": max(1, int(round(cfg["Lits"] * echelle))),
+                                "Staff_Jour": max(1, int(round(cfg["Staff_Jour"] * echelle)))}
+                          for svc, cfg in CAPACITY_CONFIG.items()},
+            "calendrier": {**CALENDRIER_DEFAUT, "periodes": periodes},
+        }))
+    return sites
+
+def _generate_site(args):
+    site, start_date, end_date, output_dir, seed, fmt = args
+    dossier = storage.site_dir(output_dir, site["nom"])
+    os.makedirs(dossier, exist_ok=True)
+    with open(os.path.join(dossier, storage.SITE_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(site, f, indent=1, ensure_ascii=False)
+    return site["nom"], stream_period(start_date, end_date, output_dir=dossier, seed=seed, fmt=fmt,
+                                      verbose=False, site=site)
+
+def _collect_sites(resultats, t0, verbose):
+    totaux = {}
+    for nom, lignes in resultats:
+        totaux[nom] = lignes
+        if verbose:
+            print(f"   🏥 {nom} : {lignes['patients']:>9} patients ({time.perf_counter() - t0:.1f}s)")
+    return totaux
+
+def generate_sites(sites, start_date=START_DATE, end_date=END_DATE, output_dir=RAW_DIR, seed=None,
+                   n_workers=1, fmt="csv", verbose=True):
+    """Génère N sites en parallèle, chacun dans son shard. Retourne {site: lignes par table}.
+
+    À graine égale, chaque site est identique quel que soit n_workers ou la liste des
+    autres sites (graines dérivées du nom du site).
+    """
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    sites = [site_config(site) for site in sites]
+    noms = [site["nom"] for site in sites]
+    if len(set(noms)) != len(noms):
+        raise ValueError("Noms de sites en double")
+    taches = [(site, start_date, end_date, output_dir, seed, fmt) for site in sites]
+
+    t0 = time.perf_counter()
+    if n_workers > 1 and len(taches) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            return _collect_sites(pool.map(_generate_site, taches), t0, verbose)
+    return _collect_sites(map(_generate_site, taches), t0, verbose)
+
+# --- 6. FLUX D'ÉVÉNEMENTS (MODE TEMPS RÉEL) ---
+# Les mêmes tables, vues comme un flux d'événements horodatés : admissions, relèves
+# de poste (effectif présent) et inventaires de lits, triés par instant simulé, mois
+# par mois. La diffusion (fichier, socket, file) est faite par src.live_feed.
+
+TYPES_EVENEMENTS = ["admission", "releve_poste", "inventaire"]
+
+def build_events(df_patients, df_rh, df_mat):
+    """Événements d'un bloc, triés par instant : DataFrame (ts, type, service, valeur).
+
+    valeur : CCMU (admission), effectif présent (relève de poste), lits disponibles (inventaire).
+    """
+    morceaux = [
+        (df_patients['date_et_heure_admission'], "admission", df_patients['service_admission'], df_patients['ccmu']),
+        (df_rh['date_heure_prise_poste'], "releve_poste", df_rh['service'], df_rh['effectif_present']),
+        (df_mat['date_heure_inventaire'], "inventaire", df_mat['services'], df_mat['nbre_lits_dispos']),
+    ]
+    events = pd.concat([pd.DataFrame({
+        'ts': pd.DatetimeIndex(ts).as_unit("ns"), 'type': type_, 'service': np.asarray(service, dtype=object),
+        'valeur': np.asarray(valeur, dtype=float)}) for ts, type_, service, valeur in morceaux], ignore_index=True)
+    return events.sort_values('ts', kind="stable", ignore_index=True)
+
+def iter_events(start_date, end_date, seed=None, site=None):
+    """Flux d'événements de la période, un bloc (mois) trié à la fois"""
+    for _, (df_patients, df_rh, df_mat) in iter_period(start_date, end_date, seed=seed, site=site):
+        yield build_events(df_patients, df_rh, df_mat)
+
+def generate_grand_dataset(mode="vectorise", seed=None, n_workers=1, streaming=False, fmt="csv"):
+    """Génère l'historique complet.
+
+    mode : 'vectorise' (défaut) ou 'boucle' (référence, non reproductible : pas de graine).
+    streaming : écrit mois par mois (mémoire constante) au lieu d'un seul bloc final.
+    fmt : 'csv' (défaut) ou 'parquet' (colonnaire, partitionné annee/mois).
+    """
+    # La boucle de référence tire dans l'état global de random / np.random et uuid4
+    # (aléa du système) : une graine ne la rendrait pas reproductible
+    if mode == "boucle" and seed is not None:
+        raise ValueError("Le mode 'boucle' ne prend pas de graine (utiliser le mode 'vectorise')")
+    print(f"🏥 Simulation Pitié-Salpêtrière {START_DATE.year}-{END_DATE.year} (SHIFTS 12H - JOUR/NUIT)...")
+
+    if streaming:
+        if mode != "vectorise":
+            raise ValueError("Le mode streaming n'est disponible qu'en mode 'vectorise'")
+        stream_period(START_DATE, END_DATE, seed=seed, n_workers=n_workers, fmt=fmt)
+        print(f"✅ Terminé !")
+        return
+
+    if mode not in ("vectorise", "boucle"):
+        raise ValueError(f"Mode inconnu : {mode!r} (attendu 'vectorise' ou 'boucle')")
+    with instrumentation.span(f"generation.{mode}") as span:
+        if mode == "boucle":
+            df_patients, df_rh, df_mat = _generate_days_loop(START_DATE, END_DATE)
+        else:
+            df_patients, df_rh, df_mat = generate_period(START_DATE, END_DATE, seed=seed, n_workers=n_workers)
+        span.add(len(df_patients) + len(df_rh) + len(df_mat))
+
     print("💾 Sauvegarde des fichiers...")
-    os.makedirs("data/raw", exist_ok=True)
-    pd.DataFrame(patients_data).to_csv("data/raw/patients.csv", index=False)
-    pd.DataFrame(rh_data).to_csv("data/raw/personnel.csv", index=False)
-    pd.DataFrame(materiel_data).to_csv("data/raw/materiel.csv", index=False)
+    for df, nom in zip((df_patients, df_rh, df_mat), RAW_TABLES):
+        storage.write_table(df, nom, RAW_DIR, fmt=fmt)
     print(f"✅ Terminé !")
 
 if __name__ == "__main__":
-    generate_grand_dataset()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Générateur de données hospitalières synthétiques")
+    parser.add_argument("--mode", choices=["vectorise", "boucle"], default="vectorise")
+    parser.add_argument("--seed", type=int, default=None, help="Graine maître (reproductibilité, mode vectorisé)")
+    parser.add_argument("--workers", type=int, default=1, help="Nombre de processus (mode vectorisé)")
+    parser.add_argument("--streaming", action="store_true", help="Écriture mois par mois (mémoire constante)")
+    parser.add_argument("--format", choices=storage.FORMATS, default="csv", help="Format de sortie")
+    parser.add_argument("--sites", help="Fichier JSON de configurations de sites (un shard par site)")
+    parser.add_argument("--n-sites", type=int, help="Nombre de sites fictifs à générer (un shard par site)")
+    args = parser.parse_args()
+
+    if args.sites or args.n_sites:
+        sites = load_sites(args.sites) if args.sites else synthetic_sites(args.n_sites, seed=args.seed or 0)
+        print(f"🏥 Simulation multi-sites : {len(sites)} sites, {START_DATE.year}-{END_DATE.year}...")
+        generate_sites(sites, seed=args.seed, n_workers=args.workers, fmt=args.format)
+        print(f"✅ Terminé ! Shards dans {os.path.join(RAW_DIR, storage.SITES_SUBDIR)}/")
+    else:
+        generate_grand_dataset(mode=args.mode, seed=args.seed, n_workers=args.workers,
+                               streaming=args.streaming, fmt=args.format)
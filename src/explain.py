@@ -0,0 +1,140 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from src.forecast import FEATURES
+
+# --- EXPLICATIONS SHAP PRÉCALCULÉES ---
+# Valeurs SHAP exactes des arbres (TreeSHAP natif d'XGBoost, pred_contribs) : pas de
+# dépendance à `shap` ni de masker sur tout le jeu d'entraînement comme dans le notebook 03.
+# Calcul par lots, en parallèle (un booster par worker, transmis une seule fois), puis
+# stockage par version du modèle : models/explanations/<version>.npz (dates, features, SHAP).
+# À chaque demande, seules les dates absentes du stock ou dont les features ont changé
+# (nouvelles données, jours futurs recalculés) sont recalculées.
+# Additivité : base + somme des contributions = prévision du modèle pour la date.
+
+EXPLAIN_SUBDIR = "explanations"
+TAILLE_LOT = 1024       # Lignes par appel à pred_contribs
+BASE = "base"           # Colonne de la valeur de référence (prévision moyenne du modèle)
+
+# Booster partagé par les lots d'un même processus (rempli par _init_worker)
+_BOOSTER = {}
+
+def _init_worker(brut):
+    booster = xgb.Booster(model_file=bytearray(brut))
+    booster.set_param({"nthread": 1})
+    _BOOSTER["b"] = booster
+
+def _contribs(X):
+    return _BOOSTER["b"].predict(xgb.DMatrix(X, feature_names=FEATURES), pred_contribs=True)
+
+def shap_values(model, X, batch_size=TAILLE_LOT, n_workers=1):
+    """Valeurs SHAP (n, n_features + 1) de X, la dernière colonne étant la base"""
+    X = np.asarray(X, dtype=np.float32)
+    if not len(X):
+        return np.empty((0, len(FEATURES) + 1), dtype=np.float32)
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    lots = [X[i:i + batch_size] for i in range(0, len(X), batch_size)]
+
+    if n_workers > 1 and len(lots) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(booster.save_raw("json"),)) as pool:
+            resultats = list(pool.map(_contribs, lots))
+    else:
+        _BOOSTER["b"] = booster
+        resultats = [_contribs(lot) for lot in lots]
+        _BOOSTER.clear()
+    return np.concatenate(resultats).astype(np.float32)
+
+# --- Stock par version du modèle ---
+
+def store_path(store_dir, version):
+    return os.path.join(store_dir, f"{version}.npz")
+
+def load_store(store_dir, version):
+    """Stock d'une version : dict dates (int64 ns), X (n, F), shap (n, F + 1), trié par date"""
+    chemin = store_path(store_dir, version)
+    if not os.path.exists(chemin):
+        return {"dates": np.empty(0, dtype=np.int64), "X": np.empty((0, len(FEATURES)), dtype=np.float32),
+                "shap": np.empty((0, len(FEATURES) + 1), dtype=np.float32)}
+    with np.load(chemin) as f:
+        return {k: f[k] for k in f.files}
+
+def _save_store(store_dir, version, stock):
+    """Écrit dans un fichier temporaire puis renomme (jamais de stock à moitié écrit)"""
+    os.makedirs(store_dir, exist_ok=True)
+    chemin = store_path(store_dir, version)
+    tmp = f"{chemin}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **stock)
+    os.replace(tmp, chemin)
+
+def explain_rows(model, version, dates, X, store_dir, batch_size=TAILLE_LOT, n_workers=1):
+    """Explications des lignes (dates, X) : DataFrame indexé par date. Colonnes : contribution
+    de chaque feature, base, flux_predit (= base + contributions) et valeur_<feature>.
+
+    Les dates déjà stockées pour cette version avec les mêmes features sont relues ;
+    les autres sont calculées puis ajoutées au stock.
+    """
+    cles = pd.DatetimeIndex(dates).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    X = np.asarray(X, dtype=np.float32)
+    stock = load_store(store_dir, version)
+
+    pos = np.searchsorted(stock["dates"], cles).clip(max=max(len(stock["dates"]) - 1, 0))
+    connu = np.zeros(len(cles), dtype=bool)
+    if len(stock["dates"]):
+        memes = (stock["X"][pos] == X) | (np.isnan(stock["X"][pos]) & np.isnan(X))
+        connu = (stock["dates"][pos] == cles) & memes.all(axis=1)
+
+    valeurs = np.empty((len(cles), len(FEATURES) + 1), dtype=np.float32)
+    valeurs[connu] = stock["shap"][pos[connu]]
+    if not connu.all():
+        manquant = ~connu
+        valeurs[manquant] = shap_values(model, X[manquant], batch_size, n_workers)
+        # Fusion : les nouvelles lignes remplacent les anciennes de même date
+        garde = ~np.isin(stock["dates"], cles[manquant])
+        dates_s = np.concatenate([stock["dates"][garde], cles[manquant]])
+        ordre = np.argsort(dates_s, kind="stable")
+        _save_store(store_dir, version, {
+            "dates": dates_s[ordre],
+            "X": np.concatenate([stock["X"][garde], X[manquant]])[ordre],
+            "shap": np.concatenate([stock["shap"][garde], valeurs[manquant]])[ordre]})
+
+    out = pd.DataFrame(valeurs, columns=FEATURES + [BASE], index=pd.DatetimeIndex(dates, name='date'))
+    out['flux_predit'] = valeurs.sum(axis=1)
+    out[[f"valeur_{f}" for f in FEATURES]] = X
+    return out
+
+def top_contributions(explication, date, n=5):
+    """Les `n` variables pesant le plus (en valeur absolue) sur la prévision d'une date.
+
+    DataFrame (variable, valeur, contribution), contribution en patients.
+    """
+    ligne = explication.loc[pd.Timestamp(date)]
+    contrib = ligne[FEATURES].astype(float)
+    ordre = list(contrib.abs().sort_values(ascending=False).index[:n])
+    return pd.DataFrame({
+        "variable": ordre,
+        "valeur": ligne[[f"valeur_{v}" for v in ordre]].to_numpy(dtype=float),
+        "contribution": contrib[ordre].to_numpy(),
+    })
+
+if __name__ == "__main__":
+    from src import dashboard_data, forecast_service
+
+    parser = argparse.ArgumentParser(description="Précalcule les explications SHAP des prévisions servies")
+    parser.add_argument("--start", default=dashboard_data.HISTORY_START)
+    parser.add_argument("--end", default=dashboard_data.HISTORY_END)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    service = forecast_service.ForecastService()
+    if service.source != "modele":
+        raise SystemExit("Aucun modèle entraîné (lancer `python -m src.training`)")
+    t0 = time.perf_counter()
+    explication = service.explain(args.start, args.end, n_workers=args.workers)
+    print(f"✅ {len(explication)} jours expliqués en {time.perf_counter() - t0:.2f}s "
+          f"-> {os.path.join(service.model_dir, EXPLAIN_SUBDIR)}/")
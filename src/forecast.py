@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+from src import instrumentation
+
+# --- MOTEUR DE PRÉVISION RÉCURSIVE (MULTI-STEP) ---
+# La prédiction du jour J devient le "patients_hier" du jour J+1. Au lieu d'un
+# model.predict par jour sur un DataFrame d'une ligne, la matrice de features est
+# préallouée pour tout l'horizon et N trajectoires indépendantes avancent en
+# parallèle : un seul appel batché au modèle par pas de temps.
+
+FEATURES = [
+    'jour_semaine', 'weekend', 'mois', 'hiver',      # Variables Calendaires (Vision Macro)
+    'patients_hier',                                 # Variable d'Inertie (Mémoire)
+    'effectif_present', 'taux_absenteisme',          # Variables RH (Vision Micro)
+    'nbre_lits_dispos', 'panne_materiel'             # Variables Matérielles (Vision Micro)
+]
+TARGET = 'nb_patients'
+
+CALENDAR_FEATURES = ['jour_semaine', 'weekend', 'mois', 'hiver']
+RESOURCE_FEATURES = ['effectif_present', 'taux_absenteisme', 'nbre_lits_dispos', 'panne_materiel']
+
+def calendar_features(dates):
+    """Variables calendaires (déterministes) d'une liste de dates"""
+    dates = pd.DatetimeIndex(dates)
+    return pd.DataFrame({
+        'jour_semaine': dates.weekday,
+        'weekend': dates.weekday.isin([5, 6]).astype(int),
+        'mois': dates.month,
+        'hiver': dates.month.isin([12, 1, 2]).astype(int),
+    }, index=dates)
+
+def default_scenario(df_hist):
+    """Scénario "Standard" du notebook 03 : moyennes historiques, aucune panne"""
+    return {
+        'effectif_present': df_hist['effectif_present'].mean(),
+        'taux_absenteisme': df_hist['taux_absenteisme'].mean(),
+        'nbre_lits_dispos': df_hist['nbre_lits_dispos'].mean(),
+        'panne_materiel': 0,
+    }
+
+def predictor(model):
+    """Fonction de prédiction la plus directe disponible pour le modèle.
+
+    Pour XGBoost, inplace_predict évite la construction d'une DMatrix à chaque pas.
+    Une fonction X -> prédictions (ex. src.service_forecast.service_predictor) est
+    utilisée telle quelle.
+    """
+    if callable(model):
+        return model
+    if hasattr(model, "get_booster"):
+        booster = model.get_booster()
+        return lambda X: booster.inplace_predict(X, validate_features=False)
+    return model.predict
+
+def build_feature_matrix(dates, scenario, n_trajectories=1):
+    """Matrice de features préallouée (n_trajectoires, horizon, n_features).
+
+    Chaque ressource du scénario peut être un scalaire, un vecteur (horizon,)
+    ou une matrice (n_trajectoires, horizon). patients_hier est laissé à NaN :
+    il est rempli pas à pas par la récursion.
+    """
+    cal = calendar_features(dates)
+    horizon = len(cal)
+    X = np.empty((n_trajectories, horizon, len(FEATURES)), dtype=np.float32)
+    for col in CALENDAR_FEATURES:
+        X[:, :, FEATURES.index(col)] = cal[col].to_numpy()
+    for col in RESOURCE_FEATURES:
+        X[:, :, FEATURES.index(col)] = np.broadcast_to(np.asarray(scenario[col], dtype=np.float32),
+                                                       (n_trajectories, horizon))
+    X[:, :, FEATURES.index('patients_hier')] = np.nan
+    return X
+
+@instrumentation.traced("prevision.recursive", lignes=np.size)
+def recursive_forecast(model, dates, scenario, patients_init, n_trajectories=None, X=None,
+                       flux_factor=None, noise=None):
+    """Prévision récursive de nb_patients sur `dates`, pour N trajectoires en parallèle.
+
+    patients_init : nb_patients du dernier jour connu (scalaire ou vecteur (N,)).
+    X : matrice déjà construite par build_feature_matrix (réutilisable entre appels).
+    flux_factor / noise : tableaux (N, horizon) optionnels appliqués à chaque prédiction
+    avant qu'elle ne serve d'inertie au jour suivant (choc de flux, bruit résiduel).
+    Retourne un tableau (N, horizon).
+    """
+    if n_trajectories is None:
+        n_trajectories = np.size(patients_init)
+    if X is None:
+        X = build_feature_matrix(dates, scenario, n_trajectories)
+    predict = predictor(model)
+    i_hier = FEATURES.index('patients_hier')
+
+    preds = np.empty(X.shape[:2], dtype=np.float32)
+    precedent = np.broadcast_to(np.asarray(patients_init, dtype=np.float32), (n_trajectories,))
+    for t in range(X.shape[1]):
+        # L'inertie vient du jour d'avant (prédiction de la veille pour t > 0)
+        X[:, t, i_hier] = precedent
+        precedent = predict(X[:, t, :])
+        if flux_factor is not None:
+            precedent = precedent * flux_factor[:, t]
+        if noise is not None:
+            precedent = np.maximum(precedent + noise[:, t], 0)
+        preds[:, t] = precedent
+    return preds
+
+# --- PRÉVISION DIRECTE MULTI-HORIZON (J+1..J+14) ---
+# Un seul modèle, entraîné sur l'historique empilé pour chaque horizon h : features du
+# jour cible, avec patients_hier remplacé par le dernier nb_patients connu (h jours
+# avant) et l'horizon en variable. Pas de récursion : les erreurs ne se cumulent pas et
+# tout l'horizon (pour toutes les trajectoires) est prédit en un seul appel batché.
+
+HORIZONS = 14
+DIRECT_FEATURES = FEATURES + ['horizon']
+
+def direct_training_set(df, horizons=HORIZONS):
+    """Jeu d'entraînement empilé (X, y) des horizons 1..`horizons` (jours consécutifs)"""
+    X = df[FEATURES].to_numpy(dtype=np.float32)
+    y = df[TARGET].to_numpy(dtype=np.float32)
+    i_hier = FEATURES.index('patients_hier')
+    blocs_X, blocs_y = [], []
+    for h in range(1, horizons + 1):
+        Xh = np.empty((len(X) - h, len(DIRECT_FEATURES)), dtype=np.float32)
+        Xh[:, :-1] = X[h:]
+        Xh[:, i_hier] = y[:-h]
+        Xh[:, -1] = h
+        blocs_X.append(Xh)
+        blocs_y.append(y[h:])
+    return np.concatenate(blocs_X), np.concatenate(blocs_y)
+
+def direct_feature_matrix(dates, scenario, patients_init, n_trajectories=1):
+    """Matrice (n_trajectoires, horizon, n_features + 1) : features des jours cibles,
+    patients_hier = dernier jour connu, horizon = 1..len(dates)"""
+    X = build_feature_matrix(dates, scenario, n_trajectories)
+    X[:, :, FEATURES.index('patients_hier')] = np.asarray(patients_init, dtype=np.float32).reshape(-1, 1)
+    return np.concatenate([X, np.broadcast_to(np.arange(1, X.shape[1] + 1, dtype=np.float32),
+                                              X.shape[:2])[:, :, None]], axis=2)
+
+@instrumentation.traced("prevision.directe", lignes=np.size)
+def direct_forecast(model, dates, scenario, patients_init, n_trajectories=None, X=None, horizons=HORIZONS):
+    """Prévision directe de nb_patients sur `dates` (au plus `horizons` jours après le
+    dernier jour connu), pour N trajectoires, en un seul appel au modèle.
+
+    model : modèle direct (src.training.train_direct_model).
+    X : matrice déjà construite par direct_feature_matrix.
+    Retourne un tableau (N, horizon).
+    """
+    if n_trajectories is None:
+        n_trajectories = np.size(patients_init)
+    if X is None:
+        X = direct_feature_matrix(dates, scenario, patients_init, n_trajectories)
+    if X.shape[1] > horizons:
+        raise ValueError(f"Horizon de {X.shape[1]} jours au-delà du modèle direct (J+{horizons}) : "
+                         "utiliser recursive_forecast")
+    preds = predictor(model)(X.reshape(-1, X.shape[2]))
+    return np.asarray(preds, dtype=np.float32).reshape(X.shape[:2])
+
+def forecast_frame(model, df_hist, dates, scenario=None):
+    """Trajectoire unique au format du notebook 03 (date, features, flux_predit)"""
+    scenario = scenario or default_scenario(df_hist)
+    X = build_feature_matrix(dates, scenario)
+    preds = recursive_forecast(model, dates, scenario, df_hist[TARGET].iloc[-1], X=X)
+    future_df = pd.DataFrame(X[0], columns=FEATURES)
+    future_df.insert(0, 'date', pd.DatetimeIndex(dates))
+    future_df['flux_predit'] = preds[0]
+    return future_df
@@ -0,0 +1,304 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from src import explain, instrumentation, service_forecast, training
+from src.forecast import (FEATURES, RESOURCE_FEATURES, TARGET, build_feature_matrix, default_scenario, predictor,
+                          recursive_forecast)
+
+# --- SERVICE DE PRÉVISION (MODÈLE PERSISTÉ + CACHE) ---
+# Le modèle entraîné (python -m src.training) est chargé une seule fois par processus.
+# Les requêtes J+1 / période sont mémoïsées dans un cache LRU à durée de vie limitée,
+# indexé par (période, scénario, version). La version combine l'empreinte du modèle et
+# la signature des fichiers de données : un nouveau modèle ou de nouvelles données
+# changent la version et vident le cache.
+#   - jours connus (historique) : prédiction J+1 à partir des features du jour,
+#   - jours suivants : moteur récursif (src.forecast) depuis le dernier jour connu.
+# Sans modèle entraîné, le service sert les prévisions précalculées du notebook 03
+# (dashboard_alertes.csv), sans scénario possible.
+# Les modèles par service (src.service_forecast), s'ils sont entraînés, sont servis de
+# la même façon (predict_services).
+# Les explications SHAP des prévisions (src.explain) sont stockées par version du modèle
+# et servies par le même cache (explain).
+# Une seule instance sert toutes les sessions du dashboard (threads) : le cache et le
+# rechargement sont protégés par un verrou, et un résultat calculé pendant un
+# rechargement n'est pas mis en cache sous la nouvelle version.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(PROJECT_ROOT, training.MODEL_DIR)
+TRAIN_PATH = os.path.join(PROJECT_ROOT, training.TRAIN_PATH)
+ALERTES_PATH = os.path.join(PROJECT_ROOT, "data", "processed", "dashboard_alertes.csv")
+SERVICES_MODEL_DIR = os.path.join(PROJECT_ROOT, service_forecast.SERVICES_MODEL_DIR)
+SERVICES_PATH = os.path.join(PROJECT_ROOT, service_forecast.SERVICES_PATH)
+
+CACHE_TAILLE = 256        # Nombre de requêtes gardées en mémoire
+CACHE_TTL = 3600          # Durée de vie d'une entrée (secondes)
+VERIF_INTERVALLE = 5      # Délai minimal entre deux contrôles des fichiers (secondes)
+
+COLONNES = ["date", "flux_reel", "flux_predit", "source"]
+
+class TTLCache:
+    """Cache LRU borné dont les entrées expirent après `ttl` secondes"""
+
+    def __init__(self, maxsize=CACHE_TAILLE, ttl=CACHE_TTL, clock=time.monotonic):
+        self.maxsize, self.ttl, self.clock = maxsize, ttl, clock
+        self._data = OrderedDict()
+        self._verrou = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        """Retourne (trouvé, valeur)"""
+        with self._verrou:
+            entree = self._data.get(key)
+            if entree is None or self.clock() - entree[0] > self.ttl:
+                self._data.pop(key, None)
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, entree[1]
+
+    def put(self, key, value):
+        with self._verrou:
+            self._data[key] = (self.clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._verrou:
+            self._data.clear()
+
+    def __len__(self):
+        with self._verrou:
+            return len(self._data)
+
+def _signature(*chemins):
+    """(mtime, taille) de chaque fichier : change dès qu'un fichier est réécrit"""
+    sig = []
+    for chemin in chemins:
+        try:
+            st = os.stat(chemin)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+def scenario_key(scenario):
+    """Clé hashable d'un scénario (surcharges de ressources)"""
+    if not scenario:
+        return ()
+    inconnues = set(scenario) - set(RESOURCE_FEATURES)
+    if inconnues:
+        raise ValueError(f"Ressources inconnues dans le scénario : {sorted(inconnues)}")
+    return tuple(sorted((k, float(v)) for k, v in scenario.items()))
+
+def site_service(site, **kwargs):
+    """Service de prévision d'un site (modèle models/sites/<site>, dataset du shard)"""
+    train_path, model_dir = training.site_paths(site)
+    dossier = os.path.dirname(train_path)
+    return ForecastService(
+        model_dir=os.path.join(PROJECT_ROOT, model_dir), train_path=os.path.join(PROJECT_ROOT, train_path),
+        alertes_path=os.path.join(PROJECT_ROOT, dossier, os.path.basename(ALERTES_PATH)),
+        services_model_dir=os.path.join(PROJECT_ROOT, model_dir, "services"),
+        services_path=os.path.join(PROJECT_ROOT, dossier, os.path.basename(SERVICES_PATH)), **kwargs)
+
+class ForecastService:
+    """Prévisions J+1 et par période, servies depuis le modèle persisté"""
+
+    def __init__(self, model_dir=MODEL_DIR, train_path=TRAIN_PATH, alertes_path=ALERTES_PATH,
+                 services_model_dir=SERVICES_MODEL_DIR, services_path=SERVICES_PATH,
+                 maxsize=CACHE_TAILLE, ttl=CACHE_TTL, check_interval=VERIF_INTERVALLE, clock=time.monotonic):
+        self.model_dir, self.train_path, self.alertes_path = model_dir, train_path, alertes_path
+        self.services_model_dir, self.services_path = services_model_dir, services_path
+        self.check_interval, self.clock = check_interval, clock
+        self.cache = TTLCache(maxsize, ttl, clock)
+        self.model = self.meta = self.hist = self.alertes = None
+        self.service_models = self.service_meta = self.hist_services = None
+        self._sig = None
+        self._dernier_controle = None
+        self._verrou = threading.RLock()
+        self.refresh(force=True)
+
+    # --- Chargement & invalidation ---
+    def _fichiers(self):
+        return (os.path.join(self.model_dir, training.MODEL_FILE), self.train_path, self.alertes_path,
+                os.path.join(self.services_model_dir, service_forecast.META_FILE), self.services_path)
+
+    def _load(self):
+        """Lit modèle et données, puis les remplace tous d'un coup"""
+        try:
+            model, meta = training.load_model(self.model_dir)
+        except FileNotFoundError:
+            model, meta = None, {}
+        hist = training.load_train_data(self.train_path) if os.path.exists(self.train_path) else None
+        alertes = None
+        if os.path.exists(self.alertes_path):
+            alertes = pd.read_csv(self.alertes_path, parse_dates=['date'], usecols=['date', 'flux_reel', 'flux_predit'])
+
+        service_models = service_meta = hist_services = None
+        if os.path.exists(self.services_path):
+            try:
+                service_models, service_meta = service_forecast.load_service_models(self.services_model_dir)
+                hist_services = service_forecast.load_service_data(self.services_path)
+            except FileNotFoundError:
+                service_models = service_meta = None
+
+        (self.model, self.meta, self.hist, self.alertes,
+         self.service_models, self.service_meta, self.hist_services) = (
+            model, meta, hist, alertes, service_models, service_meta, hist_services)
+
+    def refresh(self, force=False):
+        """Recharge modèle et données si un fichier a changé (contrôle au plus toutes les
+        `check_interval` secondes). Retourne True si le service a été rechargé"""
+        with self._verrou:
+            maintenant = self.clock()
+            if not force and self._dernier_controle is not None \
+                    and maintenant - self._dernier_controle < self.check_interval:
+                return False
+            self._dernier_controle = maintenant
+            sig = _signature(*self._fichiers())
+            if sig == self._sig and not force:
+                return False
+            self._load()
+            self._sig = sig
+            self.cache.clear()
+            return True
+
+    @property
+    def source(self):
+        if self.model is not None and self.hist is not None:
+            return "modele"
+        if self.alertes is not None:
+            return "precalcule"
+        return None
+
+    @property
+    def available(self):
+        return self.source is not None
+
+    @property
+    def version(self):
+        """Version du modèle + signature des données servies"""
+        with self._verrou:
+            modele = self.meta.get("version", "aucun") if self.meta else "aucun"
+            if self.service_meta:
+                modele += f"+{self.service_meta['version']}"
+            return f"{modele}-{hashlib.sha1(repr(self._sig).encode()).hexdigest()[:8]}"
+
+    def _cached(self, cle, calcul):
+        """Valeur en cache de `cle` (dont le dernier élément est la version), sinon calcul().
+        Le résultat n'est gardé que si aucun rechargement n'a eu lieu pendant le calcul"""
+        trouve, valeur = self.cache.get(cle)
+        if not trouve:
+            valeur = calcul()
+            with self._verrou:
+                if self.version == cle[-1]:
+                    self.cache.put(cle, valeur)
+        return valeur
+
+    # --- Requêtes ---
+    def predict_range(self, start, end, scenario=None):
+        """Prévisions de chaque jour de [start, end] (colonnes : date, flux_reel, flux_predit, source).
+
+        scenario : surcharges de ressources ({"taux_absenteisme": 0.3, ...}) appliquées
+        aux jours connus comme aux jours prévus. Le résultat est partagé via le cache :
+        ne pas le modifier en place.
+        """
+        self.refresh()
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        return self._cached((start, end, scenario_key(scenario), self.version),
+                            lambda: self._compute(start, end, scenario))
+
+    def predict_day(self, date, scenario=None):
+        """Prévision J+1 d'une date (NaN si la date n'est pas couverte)"""
+        preds = self.predict_range(date, date, scenario)
+        return float(preds['flux_predit'].iloc[0]) if len(preds) else np.nan
+
+    def predict_services(self, start, end):
+        """Prévisions par service sur [start, end] (dates x services), via le cache.
+        Tableau vide si aucun modèle par service n'est entraîné"""
+        self.refresh()
+        if self.service_models is None:
+            return pd.DataFrame()
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        return self._cached(("services", start, end, self.version), lambda: service_forecast.predict_services(
+            self.service_models, self.hist_services, start, end))
+
+    def feature_rows(self, start, end):
+        """(dates, X) des features servies sur [start, end] : features réelles pour les jours
+        connus, matrice remplie par la récursion (scénario standard) pour les jours suivants"""
+        hist = self.hist
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        connus = hist[(hist['date'] >= start) & (hist['date'] <= end)]
+        dates, blocs = [pd.DatetimeIndex(connus['date'])], [connus[FEATURES].to_numpy(dtype=np.float32)]
+
+        dernier = hist['date'].iloc[-1]
+        if end > dernier:
+            futur = pd.date_range(dernier + pd.Timedelta(days=1), end, freq='D')
+            scen = default_scenario(hist)
+            X = build_feature_matrix(futur, scen)
+            recursive_forecast(self.model, futur, scen, hist[TARGET].iloc[-1], X=X)
+            garde = futur >= start
+            dates.append(futur[garde])
+            blocs.append(X[0, garde])
+        return dates[0].append(dates[1:]), np.concatenate(blocs)
+
+    def explain(self, start, end, n_workers=1):
+        """Explications SHAP des prévisions de [start, end] (cf. src.explain.explain_rows).
+
+        Lues dans le stock de la version du modèle, seules les dates manquantes sont
+        calculées. Nécessite un modèle entraîné.
+        """
+        self.refresh()
+        if self.source != "modele":
+            raise FileNotFoundError("Explications indisponibles sans modèle entraîné (lancer `python -m src.training`)")
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        def calcul():
+            dates, X = self.feature_rows(start, end)
+            return explain.explain_rows(self.model, self.meta["version"], dates, X,
+                                        os.path.join(self.model_dir, explain.EXPLAIN_SUBDIR), n_workers=n_workers)
+        return self._cached(("shap", start, end, self.version), calcul)
+
+    @instrumentation.traced("prevision.service", lignes=len)
+    def _compute(self, start, end, scenario):
+        if self.source == "modele":
+            return self._compute_model(start, end, scenario)
+        if self.source == "precalcule":
+            if scenario:
+                raise ValueError("Scénario indisponible sans modèle entraîné (lancer `python -m src.training`)")
+            a = self.alertes
+            sel = a[(a['date'] >= start) & (a['date'] <= end)]
+            return sel.assign(source="precalcule").reset_index(drop=True)[COLONNES]
+        raise FileNotFoundError("Aucun modèle ni prévision précalculée disponible")
+
+    def _compute_model(self, start, end, scenario):
+        hist = self.hist
+        morceaux = []
+
+        # Jours connus : J+1 à partir des features réelles (un seul predict batché)
+        connus = hist[(hist['date'] >= start) & (hist['date'] <= end)]
+        if len(connus):
+            X = connus[FEATURES].to_numpy(dtype=np.float32)
+            for col, valeur in (scenario or {}).items():
+                X[:, FEATURES.index(col)] = valeur
+            morceaux.append(pd.DataFrame({
+                'date': connus['date'].to_numpy(), 'flux_reel': connus[TARGET].to_numpy(dtype=float),
+                'flux_predit': predictor(self.model)(X), 'source': "J+1"}))
+
+        # Jours suivants : récursion depuis le dernier jour connu jusqu'à `end`
+        dernier = hist['date'].iloc[-1]
+        if end > dernier:
+            futur = pd.date_range(dernier + pd.Timedelta(days=1), end, freq='D')
+            scen = {**default_scenario(hist), **(scenario or {})}
+            preds = recursive_forecast(self.model, futur, scen, hist[TARGET].iloc[-1])[0]
+            garde = futur >= start
+            morceaux.append(pd.DataFrame({
+                'date': futur[garde], 'flux_reel': np.nan, 'flux_predit': preds[garde], 'source': "recursif"}))
+
+        if not morceaux:
+            return pd.DataFrame({c: [] for c in COLONNES})
+        return pd.concat(morceaux, ignore_index=True)[COLONNES]
@@ -0,0 +1,182 @@
+import atexit
+import contextvars
+import functools
+import os
+import threading
+import time
+from collections import deque
+import pandas as pd
+
+# --- INSTRUMENTATION (SPANS, COMPTEURS, MÉMOIRE) ---
+# Chaque étape (boucles du générateur, écriture, agrégation, prédiction, construction des
+# vues) est entourée d'un span : durée, lignes traitées, variation de mémoire (RSS), span
+# parent. Désactivé par défaut : span() renvoie alors un objet vide partagé (un test de
+# drapeau, aucune mesure ni allocation), le coût est négligeable.
+# Activation pour tout le processus : variable d'environnement PITIE_PROFILE=1 ;
+# PITIE_PROFILE=<fichier .json | .csv> exporte en plus les spans à la fin du processus.
+# enable() / collect() n'agissent que sur le contexte courant (thread) : une session du
+# dashboard en mode diagnostic ne mesure pas les autres, et collect() lui réserve ses spans.
+# Les spans des workers (ProcessPoolExecutor) restent dans leur processus.
+
+MAX_SPANS = 100_000         # Spans gardés en mémoire (les plus anciens sont oubliés)
+COLONNES = ["nom", "parent", "profondeur", "debut", "duree_s", "lignes", "memoire_mo", "thread"]
+
+_ENV = os.environ.get("PITIE_PROFILE", "")
+ACTIF_PAR_DEFAUT = _ENV not in ("", "0")
+
+_ACTIF = contextvars.ContextVar("instrumentation_actif", default=ACTIF_PAR_DEFAUT)
+_COLLECTE = contextvars.ContextVar("instrumentation_collecte", default=None)
+_SPANS = deque(maxlen=MAX_SPANS)
+_VERROU = threading.Lock()
+_PILE = threading.local()
+_PAGE_MO = os.sysconf("SC_PAGE_SIZE") / 2**20 if hasattr(os, "sysconf") else None
+
+_STATM = {}                 # pid -> descripteur de /proc/<pid>/statm (relu sans réouverture)
+
+def _rss_mo():
+    """RSS courant (Mo) ; pic du processus si /proc n'est pas disponible"""
+    try:
+        pid = os.getpid()
+        if pid not in _STATM:
+            _STATM[pid] = os.open(f"/proc/{pid}/statm", os.O_RDONLY)
+        return int(os.pread(_STATM[pid], 128, 0).split()[1]) * _PAGE_MO
+    except (OSError, TypeError):
+        try:
+            import resource         # Unix seulement
+        except ImportError:
+            return float("nan")
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class _SpanNul:
+    """Span désactivé : ne mesure rien"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, lignes):
+        pass
+
+    start = __enter__
+
+    def stop(self):
+        pass
+
+_NUL = _SpanNul()
+
+class Span:
+    """Étape chronométrée (context manager, ou start() / stop())"""
+    __slots__ = ("nom", "lignes", "_t0", "_rss0", "_debut", "_parent", "_profondeur")
+
+    def __init__(self, nom, lignes=0):
+        self.nom, self.lignes = nom, lignes
+
+    def add(self, lignes):
+        """Ajoute des lignes traitées au compteur du span"""
+        self.lignes += int(lignes)
+
+    def __enter__(self):
+        pile = getattr(_PILE, "spans", None)
+        if pile is None:
+            pile = _PILE.spans = []
+        self._parent = pile[-1].nom if pile else None
+        self._profondeur = len(pile)
+        pile.append(self)
+        self._debut, self._rss0, self._t0 = time.time(), _rss_mo(), time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duree = time.perf_counter() - self._t0
+        _PILE.spans.pop()
+        ligne = (self.nom, self._parent, self._profondeur, self._debut, duree, self.lignes,
+                 _rss_mo() - self._rss0, threading.current_thread().name)
+        collecte = _COLLECTE.get()
+        if collecte is not None:
+            collecte.append(ligne)
+        else:
+            with _VERROU:
+                _SPANS.append(ligne)
+        return False
+
+    start = __enter__
+
+    def stop(self):
+        self.__exit__(None, None, None)
+
+def enable(actif=True):
+    """Active (ou désactive) l'instrumentation dans le contexte courant"""
+    _ACTIF.set(bool(actif))
+
+def disable():
+    _ACTIF.set(False)
+
+def enabled():
+    return _ACTIF.get()
+
+def collect(actif=True):
+    """Active l'instrumentation du contexte courant et y réserve ses spans : retourne la
+    liste qui les reçoit (à lire avec spans(liste)). collect(False) revient au réglage du
+    processus (PITIE_PROFILE) et au tampon global. Repart d'une pile de spans vide"""
+    _PILE.spans = []
+    collecte = [] if actif else None
+    _ACTIF.set(True if actif else ACTIF_PAR_DEFAUT)
+    _COLLECTE.set(collecte)
+    return collecte
+
+def span(nom, lignes=0):
+    """Span de l'étape `nom` (objet vide si l'instrumentation est désactivée)"""
+    if not _ACTIF.get():
+        return _NUL
+    return Span(nom, lignes)
+
+def traced(nom, lignes=None):
+    """Décorateur : un span par appel de la fonction ; lignes(résultat) = lignes traitées"""
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def appel(*args, **kwargs):
+            if not _ACTIF.get():
+                return fonction(*args, **kwargs)
+            with Span(nom) as s:
+                resultat = fonction(*args, **kwargs)
+                if lignes is not None:
+                    s.add(lignes(resultat))
+                return resultat
+        return appel
+    return decorateur
+
+def reset():
+    with _VERROU:
+        _SPANS.clear()
+
+def spans(collecte=None):
+    """Spans enregistrés (DataFrame, ordre de fin) : ceux d'une collecte (collect()),
+    sinon le tampon global"""
+    if collecte is None:
+        with _VERROU:
+            collecte = list(_SPANS)
+    return pd.DataFrame(list(collecte), columns=COLONNES)
+
+def summary(df=None):
+    """Résumé par étape : appels, temps total / moyen / max, lignes, lignes par seconde"""
+    df = spans() if df is None else df
+    resume = df.groupby("nom", sort=False).agg(
+        appels=("duree_s", "size"), total_s=("duree_s", "sum"), moyen_s=("duree_s", "mean"),
+        max_s=("duree_s", "max"), lignes=("lignes", "sum"), memoire_mo=("memoire_mo", "max"))
+    resume["lignes_s"] = (resume["lignes"] / resume["total_s"]).where(resume["lignes"] > 0)
+    return resume.sort_values("total_s", ascending=False).reset_index()
+
+def export(path, df=None):
+    """Écrit les spans en JSON (une liste d'objets) ou en CSV selon l'extension"""
+    df = spans() if df is None else df
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".csv"):
+        df.to_csv(path, index=False)
+    else:
+        df.to_json(path, orient="records", force_ascii=False, indent=1)
+    return path
+
+if ACTIF_PAR_DEFAUT and _ENV.endswith((".json", ".csv")):
+    atexit.register(lambda: export(_ENV))
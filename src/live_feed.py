@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import numpy as np
+import pandas as pd
+from src.data_generator import SERVICES, TYPES_EVENEMENTS, iter_events
+from src.scenario_cube import alert_level
+
+# --- MODE TEMPS RÉEL : DIFFUSION DU FLUX D'ÉVÉNEMENTS & INGESTION EN TAMPON CIRCULAIRE ---
+# Producteur : les événements du générateur (admissions, relèves de poste, inventaires)
+# sont rejoués au rythme du temps simulé / accélération (ou à un débit fixe), dans un
+# thread, vers un fichier JSON lines, une socket TCP locale ou une file en mémoire.
+# Consommateur (dashboard) : chaque lecture ne prend que les nouveaux événements, écrits
+# dans un tampon circulaire de taille fixe ; les KPI du jour (admissions, effectif présent,
+# lits disponibles) sont mis à jour de façon incrémentale, sans relire l'historique.
+# Chaque événement porte son instant d'émission : la latence bout en bout (émission ->
+# KPI à jour) est mesurée à l'ingestion.
+
+LIVE_DIR = os.path.join("data", "live")
+FEED_PATH = os.path.join(LIVE_DIR, "feed.jsonl")
+HOTE, PORT = "127.0.0.1", 8765
+
+ACCELERATION = 3600         # 1 heure simulée par seconde
+TAILLE_TAMPON = 65_536      # Événements gardés en mémoire par le consommateur
+LOT_MAX = 1000              # Événements envoyés au plus par écriture
+ATTENTE_MAX = 0.05          # Pause maximale du producteur entre deux contrôles (secondes)
+RAFRAICHISSEMENT = 1.0      # Période de rafraîchissement du panneau temps réel (secondes)
+FENETRE_DEBIT = 5.0         # Fenêtre de calcul du débit (secondes)
+
+NS_HEURE = 3600 * 10**9
+NS_JOUR = 24 * NS_HEURE
+CODES_TYPES = {t: i for i, t in enumerate(TYPES_EVENEMENTS)}
+
+# --- Transports (producteur -> consommateur) ---
+
+def _lignes(tampon, donnees):
+    """Découpe les lignes complètes ; retourne (événements, reste incomplet)"""
+    tampon += donnees
+    *completes, reste = tampon.split(b"\n")
+    return [json.loads(ligne) for ligne in completes if ligne], reste
+
+class QueueSink:
+    def __init__(self, file=None):
+        self.file = file if file is not None else queue.SimpleQueue()
+
+    def send(self, events):
+        self.file.put(events)
+
+    def close(self):
+        pass
+
+class QueueSource:
+    def __init__(self, file):
+        self.file = file
+
+    def poll(self):
+        events = []
+        try:
+            while True:
+                events.extend(self.file.get_nowait())
+        except queue.Empty:
+            return events
+
+    def close(self):
+        pass
+
+class FileSink:
+    """Fichier JSON lines (un événement par ligne), vidé au démarrage du producteur"""
+
+    def __init__(self, path=FEED_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.f = open(path, "w", encoding="utf-8")
+
+    def send(self, events):
+        self.f.write("".join(json.dumps(e) + "\n" for e in events))
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+class FileSource:
+    """Lit les lignes ajoutées au fichier depuis la lecture précédente (tail)"""
+
+    def __init__(self, path=FEED_PATH, from_start=False):
+        self.path, self.reste = path, b""
+        self.offset = 0 if from_start or not os.path.exists(path) else os.path.getsize(path)
+
+    def poll(self):
+        if not os.path.exists(self.path):
+            return []
+        if os.path.getsize(self.path) < self.offset:
+            # Fichier recréé par un nouveau producteur : relecture depuis le début
+            self.offset, self.reste = 0, b""
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            donnees = f.read()
+        self.offset += len(donnees)
+        events, self.reste = _lignes(self.reste, donnees)
+        return events
+
+    def close(self):
+        pass
+
+class SocketSink:
+    """Client TCP : envoie les événements en JSON lines au consommateur (SocketSource)"""
+
+    def __init__(self, host=HOTE, port=PORT):
+        self.sock = socket.create_connection((host, port))
+
+    def send(self, events):
+        self.sock.sendall("".join(json.dumps(e) + "\n" for e in events).encode())
+
+    def close(self):
+        self.sock.close()
+
+class SocketSource:
+    """Serveur TCP non bloquant : accepte les producteurs et lit ce qui est disponible"""
+
+    def __init__(self, host=HOTE, port=PORT):
+        self.serveur = socket.create_server((host, port))
+        self.serveur.setblocking(False)
+        self.clients = {}
+
+    def poll(self):
+        try:
+            while True:
+                client, _ = self.serveur.accept()
+                client.setblocking(False)
+                self.clients[client] = b""
+        except BlockingIOError:
+            pass
+        events = []
+        for client in list(self.clients):
+            try:
+                while donnees := client.recv(1 << 20):
+                    lus, self.clients[client] = _lignes(self.clients[client], donnees)
+                    events.extend(lus)
+                client.close()          # recv vide : producteur terminé
+                del self.clients[client]
+            except BlockingIOError:
+                pass
+        return events
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+        self.serveur.close()
+
+# --- Producteur ---
+
+def _records(ts, types, services, valeurs, debut, fin):
+    emis = time.time()
+    return [{"ts": int(t), "type": ty, "service": s, "valeur": float(v), "emis": emis}
+            for t, ty, s, v in zip(ts[debut:fin], types[debut:fin], services[debut:fin], valeurs[debut:fin])]
+
+def replay(blocs, sink, speedup=ACCELERATION, rate=None, stop=None, max_events=None, clock=time.monotonic):
+    """Diffuse les blocs d'événements (data_generator.iter_events) vers `sink`.
+
+    Rythme : temps simulé / speedup, ou `rate` événements par seconde ; au plus vite si
+    les deux sont None. `stop` (threading.Event) interrompt la diffusion.
+    Retourne le nombre d'événements envoyés.
+    """
+    t0, origine, envoyes = clock(), None, 0
+    for bloc in blocs:
+        ts = bloc['ts'].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        types, services, valeurs = bloc['type'].to_numpy(), bloc['service'].to_numpy(), bloc['valeur'].to_numpy()
+        if origine is None and len(ts):
+            origine = ts[0]
+        if rate:
+            echeances = (envoyes + np.arange(len(ts))) / rate
+        elif speedup:
+            echeances = (ts - origine) / 1e9 / speedup
+        else:
+            echeances = np.zeros(len(ts))
+
+        i = 0
+        while i < len(ts):
+            if stop is not None and stop.is_set():
+                return envoyes
+            ecoule = clock() - t0
+            j = min(int(np.searchsorted(echeances, ecoule, side="right")), i + LOT_MAX)
+            if max_events is not None:
+                j = min(j, i + max_events - envoyes)
+            if j <= i:
+                time.sleep(min(echeances[i] - ecoule, ATTENTE_MAX))
+                continue
+            sink.send(_records(ts, types, services, valeurs, i, j))
+            envoyes += j - i
+            i = j
+            if max_events is not None and envoyes >= max_events:
+                return envoyes
+    return envoyes
+
+def start_feed(blocs, sink, **kwargs):
+    """Diffusion asynchrone (thread) ; retourne (thread, stop)"""
+    stop = threading.Event()
+    thread = threading.Thread(target=replay, args=(blocs, sink), kwargs={**kwargs, "stop": stop}, daemon=True)
+    thread.start()
+    return thread, stop
+
+# --- Consommateur : tampon circulaire + agrégats incrémentaux ---
+
+class LiveState:
+    """Derniers événements (tampon circulaire de taille fixe) et KPI du jour simulé en cours"""
+
+    def __init__(self, capacity=TAILLE_TAMPON, services=SERVICES, clock=time.time):
+        self.capacity, self.services, self.clock = capacity, list(services), clock
+        self._codes = {s: i for i, s in enumerate(self.services)}
+        self.ts = np.zeros(capacity, dtype=np.int64)
+        self.type = np.zeros(capacity, dtype=np.int8)
+        self.service = np.zeros(capacity, dtype=np.int16)
+        self.valeur = np.zeros(capacity, dtype=np.float32)
+        self.recu = np.zeros(capacity, dtype=np.float64)
+        self.latence = np.zeros(capacity, dtype=np.float32)
+        self.n = 0                  # Événements ingérés depuis le début
+        self.jour = None            # Jour simulé en cours (jours depuis 1970)
+        self.dernier_ts = None
+        n_svc = len(self.services)
+        self.admissions = np.zeros(n_svc, dtype=np.int64)
+        self.ccmu = np.zeros(n_svc, dtype=np.float64)
+        self.effectif = np.full(n_svc, np.nan)
+        self.lits = np.full(n_svc, np.nan)
+
+    def _dernieres_valeurs(self, cible, svc, valeur):
+        """Dernière valeur reçue de chaque service"""
+        if len(svc):
+            services, premiers = np.unique(svc[::-1], return_index=True)
+            cible[services] = valeur[::-1][premiers]
+
+    def _agrege(self, type_, svc, valeur):
+        connu = svc >= 0
+        adm = connu & (type_ == CODES_TYPES["admission"])
+        self.admissions += np.bincount(svc[adm], minlength=len(self.services))
+        self.ccmu += np.bincount(svc[adm], weights=valeur[adm], minlength=len(self.services))
+        m = connu & (type_ == CODES_TYPES["releve_poste"])
+        self._dernieres_valeurs(self.effectif, svc[m], valeur[m])
+        m = connu & (type_ == CODES_TYPES["inventaire"])
+        self._dernieres_valeurs(self.lits, svc[m], valeur[m])
+
+    def ingest(self, events):
+        """Ajoute des événements (dicts, dans l'ordre du flux). Retourne le nombre ingéré"""
+        k = len(events)
+        if not k:
+            return 0
+        recu = self.clock()
+        ts = np.fromiter((e["ts"] for e in events), dtype=np.int64, count=k)
+        type_ = np.fromiter((CODES_TYPES[e["type"]] for e in events), dtype=np.int8, count=k)
+        svc = np.fromiter((self._codes.get(e["service"], -1) for e in events), dtype=np.int16, count=k)
+        valeur = np.fromiter((e["valeur"] for e in events), dtype=np.float32, count=k)
+        emis = np.fromiter((e["emis"] for e in events), dtype=np.float64, count=k)
+
+        # Agrégats du jour : remis à zéro à chaque changement de jour simulé
+        jours = ts // NS_JOUR
+        for debut, fin in zip(*self._segments(jours)):
+            if jours[debut] != self.jour:
+                self.jour = int(jours[debut])
+                self.admissions[:] = 0
+                self.ccmu[:] = 0
+            self._agrege(type_[debut:fin], svc[debut:fin], valeur[debut:fin])
+        self.dernier_ts = int(ts[-1])
+
+        # Tampon circulaire : seuls les `capacity` derniers événements sont gardés
+        garde = slice(max(k - self.capacity, 0), k)
+        pos = (self.n + np.arange(k)[garde]) % self.capacity
+        self.ts[pos], self.type[pos], self.service[pos], self.valeur[pos] = ts[garde], type_[garde], svc[garde], valeur[garde]
+        self.recu[pos] = recu
+        self.n += k
+        # Latence bout en bout : émission -> agrégats à jour
+        self.latence[pos] = self.clock() - emis[garde]
+        return k
+
+    @staticmethod
+    def _segments(jours):
+        coupures = np.flatnonzero(np.diff(jours)) + 1
+        return np.r_[0, coupures], np.r_[coupures, len(jours)]
+
+    def _tampon(self):
+        """Indices des événements du tampon, du plus ancien au plus récent"""
+        taille = min(self.n, self.capacity)
+        return (self.n - taille + np.arange(taille)) % self.capacity
+
+    def kpis(self, seuils=None):
+        """KPI temps réel : instant simulé, admissions du jour (et projection sur 24 h),
+        niveau d'alerte projeté, débit (événements/s) et latence (secondes)"""
+        if self.n == 0:
+            return {"evenements": 0}
+        idx = self._tampon()
+        heures = (self.dernier_ts % NS_JOUR) / NS_HEURE
+        flux_jour = int(self.admissions.sum())
+        flux_projete = flux_jour * 24 / max(heures, 1)
+        latence = self.latence[idx]
+        return {
+            "evenements": self.n,
+            "instant": pd.Timestamp(self.dernier_ts),
+            "admissions_jour": flux_jour,
+            "flux_projete": flux_projete,
+            "niveau": alert_level(flux_projete, seuils) if seuils else None,
+            "debit": float((self.recu[idx] >= self.clock() - FENETRE_DEBIT).sum() / FENETRE_DEBIT),
+            "latence_p50": float(np.percentile(latence, 50)),
+            "latence_p95": float(np.percentile(latence, 95)),
+        }
+
+    def par_service(self):
+        """État du jour par service : admissions, CCMU moyen, effectif présent, lits disponibles"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ccmu = np.where(self.admissions > 0, self.ccmu / self.admissions, np.nan)
+        return pd.DataFrame({"Service": self.services, "Admissions (jour)": self.admissions,
+                             "CCMU Moyen": ccmu, "Effectif Présent": self.effectif, "Lits Dispos": self.lits})
+
+    def recent(self, n=20):
+        """Les `n` derniers événements du tampon"""
+        idx = self._tampon()[-n:]
+        return pd.DataFrame({
+            "instant": pd.to_datetime(self.ts[idx]),
+            "type": np.array(TYPES_EVENEMENTS)[self.type[idx]],
+            "service": np.array(self.services + ["?"])[self.service[idx]],
+            "valeur": self.valeur[idx],
+        })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rejoue le générateur en flux d'événements temps réel")
+    parser.add_argument("--start", default="2025-01-01")
+    parser.add_argument("--end", default="2025-12-31")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--speedup", type=float, default=ACCELERATION, help="Accélération du temps simulé")
+    parser.add_argument("--rate", type=float, help="Débit fixe (événements/s), remplace --speedup")
+    parser.add_argument("--sink", choices=["file", "socket"], default="file")
+    parser.add_argument("--path", default=FEED_PATH)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    sink = FileSink(args.path) if args.sink == "file" else SocketSink(HOTE, args.port)
+    print(f"📡 Diffusion {args.start} -> {args.end} vers {args.path if args.sink == 'file' else f'{HOTE}:{args.port}'} "
+          f"({f'{args.rate:.0f} év/s' if args.rate else f'x{args.speedup:.0f}'}) - Ctrl+C pour arrêter")
+    t0 = time.perf_counter()
+    try:
+        n = replay(iter_events(args.start, args.end, seed=args.seed), sink, speedup=args.speedup, rate=args.rate)
+    except KeyboardInterrupt:
+        n = None
+    finally:
+        sink.close()
+    if n is not None:
+        print(f"✅ {n:,} événements en {time.perf_counter() - t0:.1f}s")
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.forecast import FEATURES, RESOURCE_FEATURES, TARGET, build_feature_matrix, recursive_forecast
+from src.thresholds import alert_thresholds
+
+# --- SIMULATION MONTE CARLO DES SCÉNARIOS ---
+# Au lieu d'une trajectoire unique (ressources figées à la moyenne, aucune panne),
+# on tire des milliers de trajectoires de ressources :
+#   - jours historiques du même mois tirés au hasard (staff, absentéisme, lits et pannes
+#     tirés ensemble pour garder leurs corrélations),
+#   - chocs optionnels (grève, épidémie) sur une fenêtre de dates,
+#   - bruit résiduel optionnel (erreurs du modèle sur l'historique).
+# Toutes les trajectoires passent ensemble dans le moteur récursif (un predict batché
+# par jour). Les blocs de trajectoires sont de taille fixe et ont chacun leur graine :
+# le résultat ne dépend pas du nombre de workers.
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+BLOC_TRAJECTOIRES = 2500
+
+# Effets relatifs d'un choc d'intensité 1 (taux_absenteisme : points ajoutés)
+CHOCS_TYPES = {
+    "greve": {"effectif_present": -0.25, "taux_absenteisme": 0.15, "nbre_lits_dispos": -0.20, "flux": 0.0},
+    "epidemie": {"effectif_present": -0.10, "taux_absenteisme": 0.08, "nbre_lits_dispos": -0.30, "flux": 0.25},
+}
+
+def sample_resource_paths(df_hist, dates, n_trajectories, rng):
+    """Tire (N, horizon) valeurs par ressource : un jour historique du même mois par case"""
+    dates = pd.DatetimeIndex(dates)
+    hist_mois = df_hist["date"].dt.month.to_numpy()
+    ressources = df_hist[RESOURCE_FEATURES].to_numpy(dtype=np.float32)
+    tirage = np.empty((n_trajectories, len(dates)), dtype=np.int64)
+
+    for mois in np.unique(dates.month):
+        pool = np.flatnonzero(hist_mois == mois)
+        if len(pool) == 0:
+            pool = np.arange(len(df_hist))
+        cols = np.flatnonzero(dates.month == mois)
+        tirage[:, cols] = pool[rng.integers(0, len(pool), size=(n_trajectories, len(cols)))]
+
+    return {col: ressources[tirage, i] for i, col in enumerate(RESOURCE_FEATURES)}
+
+def apply_shocks(scenario, dates, chocs, rng):
+    """Applique les chocs (grève, épidémie) aux trajectoires. Retourne le facteur de flux.
+
+    Un choc : {"type": "greve" | "epidemie", "debut": date, "fin": date,
+               "intensite": 1.0, "probabilite": 1.0, "effets": {...} (optionnel)}
+    Chaque trajectoire subit le choc avec la probabilité donnée.
+    """
+    dates = pd.DatetimeIndex(dates)
+    n = scenario[RESOURCE_FEATURES[0]].shape[0]
+    flux_factor = np.ones((n, len(dates)), dtype=np.float32)
+
+    for choc in chocs or []:
+        effets = {**CHOCS_TYPES.get(choc.get("type"), {}), **choc.get("effets", {})}
+        fenetre = (dates >= pd.Timestamp(choc["debut"])) & (dates <= pd.Timestamp(choc["fin"]))
+        touchee = rng.random(n) < choc.get("probabilite", 1.0)
+        masque = (touchee[:, None] & fenetre[None, :]).astype(np.float32) * choc.get("intensite", 1.0)
+
+        for col, effet in effets.items():
+            if col == "flux":
+                flux_factor *= 1 + masque * effet
+            elif col == "taux_absenteisme":
+                scenario[col] = np.clip(scenario[col] + masque * effet, 0, 1)
+            elif col == "panne_materiel":
+                scenario[col] = np.maximum(scenario[col], (rng.random((n, len(dates))) < masque * effet))
+            else:
+                scenario[col] = np.maximum(scenario[col] * (1 + masque * effet), 0)
+    return flux_factor
+
+def _simulate_block(args):
+    model, df_hist, dates, n, chocs, residuals, patients_init, seed_seq = args
+    rng = np.random.default_rng(seed_seq)
+    scenario = sample_resource_paths(df_hist, dates, n, rng)
+    flux_factor = apply_shocks(scenario, dates, chocs, rng)
+    noise = None
+    if residuals is not None and len(residuals):
+        noise = rng.choice(np.asarray(residuals, dtype=np.float32), size=(n, len(dates)))
+    X = build_feature_matrix(dates, scenario, n)
+    return recursive_forecast(model, dates, scenario, patients_init, n_trajectories=n, X=X,
+                              flux_factor=flux_factor, noise=noise)
+
+def simulate_paths(model, df_hist, dates, n_trajectories=10_000, chocs=None, residuals=None,
+                   seed=None, n_workers=1):
+    """Trajectoires Monte Carlo du flux (N, horizon), en blocs parallélisables"""
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    patients_init = float(df_hist[TARGET].iloc[-1])
+    tailles = [BLOC_TRAJECTOIRES] * (n_trajectories // BLOC_TRAJECTOIRES)
+    if n_trajectories % BLOC_TRAJECTOIRES:
+        tailles.append(n_trajectories % BLOC_TRAJECTOIRES)
+    hist = df_hist[["date", TARGET] + RESOURCE_FEATURES]
+    taches = [(model, hist, dates, n, chocs, residuals, patients_init,
+               np.random.SeedSequence(seed, spawn_key=(i,))) for i, n in enumerate(tailles)]
+
+    if n_workers > 1 and len(taches) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            blocs = list(pool.map(_simulate_block, taches))
+    else:
+        blocs = [_simulate_block(t) for t in taches]
+    return np.concatenate(blocs, axis=0)
+
+def summarize_paths(paths, dates, seuils, quantiles=QUANTILES):
+    """Quantiles journaliers et probabilités de franchir les seuils d'alerte"""
+    resume = pd.DataFrame({"date": pd.DatetimeIndex(dates)})
+    for q, valeurs in zip(quantiles, np.quantile(paths, quantiles, axis=0)):
+        resume[f"q{int(round(q * 100)):02d}"] = valeurs
+    resume["moyenne"] = paths.mean(axis=0)
+    resume["p_alerte"] = (paths >= seuils["SEUIL_ALERTE"]).mean(axis=0)
+    resume["p_critique"] = (paths >= seuils["SEUIL_CRITIQUE"]).mean(axis=0)
+    return resume
+
+def model_residuals(model, df_hist):
+    """Erreurs du modèle sur l'historique (réel - prédit), pour le bruit résiduel"""
+    X = df_hist[FEATURES].to_numpy(dtype=np.float32)
+    return df_hist[TARGET].to_numpy(dtype=np.float32) - np.asarray(model.predict(X), dtype=np.float32)
+
+def simulate(model, df_hist, dates, n_trajectories=10_000, chocs=None, residuals=None,
+             seed=None, n_workers=1, seuils=None):
+    """Simulation complète : trajectoires puis résumé par jour (quantiles, P(alerte), P(critique))"""
+    paths = simulate_paths(model, df_hist, dates, n_trajectories=n_trajectories, chocs=chocs,
+                           residuals=residuals, seed=seed, n_workers=n_workers)
+    return summarize_paths(paths, dates, seuils or alert_thresholds(df_hist))
@@ -0,0 +1,116 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from src import storage
+from src.data_generator import CAPACITY_CONFIG, RAW_DIR, SERVICES
+
+# --- SIMULATEUR D'OCCUPATION DES LITS (ÉVÉNEMENTIEL) ---
+# Chaque séjour produit deux événements : une entrée (date_et_heure_admission) et une
+# sortie (admission + duree_hospitalisation). Balayage (sweep-line) : on compte les
+# entrées et les sorties par (heure, service) avec np.bincount, puis une somme cumulée
+# le long du temps donne le nombre de patients présents. O(n séjours + heures x services),
+# sans boucle Python ni tas : plusieurs millions de séjours en quelques secondes.
+#
+# Convention : l'occupation de l'heure h est le nombre de patients présents à h:00
+# (entrés au plus tard à h:00 et sortis après h:00).
+
+DUREE_UNITE = storage.UNITES["patients"]["duree_hospitalisation"]
+COLONNES_SEJOURS = ["date_et_heure_admission", "duree_hospitalisation", "service_admission"]
+MARGE_JOURS = 30        # Admissions lues avant `start` : patients encore présents au début
+
+def load_stays(raw_dir=RAW_DIR, start=None, end=None, marge_jours=MARGE_JOURS):
+    """Séjours (admission, durée, service) des données brutes, admis à partir de
+    `start` - `marge_jours` (les patients arrivés avant la période et encore présents
+    sont comptés dès la première heure par simulate_occupancy)"""
+    if start is not None:
+        start = pd.Timestamp(start) - pd.Timedelta(days=marge_jours)
+    return storage.read_table("patients", raw_dir, columns=COLONNES_SEJOURS, start=start, end=end)
+
+def _heure_plafond(valeurs_ns, origine_ns):
+    """Indice de la première heure pleine >= instant (entier, peut être négatif)"""
+    pas = np.int64(3600 * 10**9)
+    return -((origine_ns - valeurs_ns) // pas)
+
+def simulate_occupancy(stays, start=None, end=None, services=SERVICES, capacites=None, duree_unite=DUREE_UNITE):
+    """Occupation horaire par service, par balayage des entrées / sorties.
+
+    stays : DataFrame (date_et_heure_admission, duree_hospitalisation, service_admission).
+    Retourne un dict : heures (DatetimeIndex), services, capacite (S,),
+    occupation (H, S) et lits_libres (H, S, négatif = débordement).
+    """
+    admission = stays["date_et_heure_admission"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    duree = np.round(stays["duree_hospitalisation"].to_numpy(dtype=float)
+                     * pd.Timedelta(1, unit=duree_unite).value).astype(np.int64)
+    svc = pd.Categorical(stays["service_admission"], categories=services).codes.astype(np.int64)
+
+    debut = pd.Timestamp(start).floor("D") if start is not None else pd.Timestamp(admission.min()).floor("D")
+    fin = pd.Timestamp(end).floor("D") + pd.Timedelta(days=1) if end is not None \
+        else pd.Timestamp(admission.max()).floor("D") + pd.Timedelta(days=1)
+    n_heures, n_svc = int((fin - debut) / pd.Timedelta(hours=1)), len(services)
+
+    # Événements ramenés à l'heure pleine suivante ; entrées antérieures comptées dès l'heure 0
+    entree = np.maximum(_heure_plafond(admission, debut.value), 0)
+    sortie = _heure_plafond(admission + np.maximum(duree, 0), debut.value)
+    valide = (svc >= 0) & (sortie > entree) & (entree < n_heures)
+    entree, sortie, svc = entree[valide], np.minimum(sortie[valide], n_heures), svc[valide]
+
+    taille = (n_heures + 1) * n_svc
+    delta = np.bincount(entree * n_svc + svc, minlength=taille) - np.bincount(sortie * n_svc + svc, minlength=taille)
+    occupation = np.cumsum(delta.reshape(n_heures + 1, n_svc)[:n_heures], axis=0).astype(np.int32)
+
+    capacites = capacites or {s: CAPACITY_CONFIG[s]["Lits"] for s in services}
+    capacite = np.array([capacites[s] for s in services], dtype=np.int32)
+    return {
+        "heures": pd.date_range(debut, periods=n_heures, freq="h"),
+        "services": list(services),
+        "capacite": capacite,
+        "occupation": occupation,
+        "lits_libres": capacite - occupation,
+    }
+
+def occupancy_frame(occ, mesure="occupation"):
+    """Vue large (heures x services) d'une mesure"""
+    return pd.DataFrame(occ[mesure], index=occ["heures"], columns=occ["services"])
+
+def daily_summary(occ):
+    """Résumé journalier par service : occupation moyenne / max, lits libres min, heures en débordement"""
+    n_jours = len(occ["heures"]) // 24
+    forme = (n_jours, 24, len(occ["services"]))
+    occupation = occ["occupation"][:n_jours * 24].reshape(forme)
+    libres = occ["lits_libres"][:n_jours * 24].reshape(forme)
+    index = pd.MultiIndex.from_product([occ["heures"][::24][:n_jours], occ["services"]], names=["date", "service"])
+    return pd.DataFrame({
+        "occupation_moyenne": occupation.mean(axis=1).ravel(),
+        "occupation_max": occupation.max(axis=1).ravel(),
+        "lits_libres_min": libres.min(axis=1).ravel(),
+        "heures_debordement": (libres < 0).sum(axis=1).ravel(),
+        "taux_occupation_max": (occupation.max(axis=1) / occ["capacite"]).ravel(),
+    }, index=index).reset_index()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Occupation horaire des lits par service (balayage des séjours)")
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--marge", type=int, default=MARGE_JOURS,
+                        help="Jours d'admissions lus avant --start (séjours en cours au début)")
+    parser.add_argument("--output", help="Fichier CSV de l'occupation horaire (heures x services)")
+    args = parser.parse_args()
+
+    df_sejours = load_stays(args.raw_dir, args.start, args.end, args.marge)
+    plus_long = df_sejours["duree_hospitalisation"].max() * pd.Timedelta(1, unit=DUREE_UNITE) if len(df_sejours) else None
+    if args.start and plus_long is not None and plus_long > pd.Timedelta(days=args.marge):
+        print(f"⚠️ Séjour le plus long ({plus_long}) au-delà de la marge de {args.marge} jours : "
+              f"occupation du début de période sous-estimée, augmenter --marge")
+    t0 = time.perf_counter()
+    occ = simulate_occupancy(df_sejours, args.start, args.end)
+    duree = time.perf_counter() - t0
+    print(f"✅ {len(df_sejours):,} séjours -> {len(occ['heures']):,} heures x {len(occ['services'])} services "
+          f"en {duree:.2f}s")
+    print(daily_summary(occ).groupby("service", sort=False)[["occupation_moyenne", "taux_occupation_max",
+                                                                "heures_debordement"]].mean().round(2))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        occupancy_frame(occ).to_csv(args.output, index_label="heure")
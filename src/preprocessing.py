@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from src import aggregation, storage
+
+# --- PIPELINE D'AGRÉGATION JOURNALIÈRE (version module du notebook 02) ---
+# Mode complet : recalcule train_data_hybride depuis toutes les données brutes.
+# Mode incrémental : ne lit et n'agrège que les jours postérieurs au watermark
+# (dernier jour traité), puis les ajoute au dataset. Le résultat est identique
+# à un recalcul complet.
+
+RAW_DIR = "data/raw"
+PROCESSED_DIR = "data/processed"
+TRAIN_FILE = "train_data_hybride.csv"
+WATERMARK_FILE = "train_data_hybride.watermark.json"
+SERVICES_FILE = "train_data_services.csv"
+
+TRAIN_COLUMNS = [
+    "date", "nb_patients", "jour_semaine", "weekend", "mois", "hiver", "patients_hier",
+    "effectif_present", "taux_absenteisme", "nbre_lits_dispos", "panne_materiel",
+]
+
+def load_raw(raw_dir=RAW_DIR, start=None):
+    """Charge uniquement les colonnes utiles des tables brutes, à partir de `start`"""
+    df_p = storage.read_table("patients", raw_dir, start=start, columns=[
+        "date_et_heure_admission", "service_admission", "age", "ccmu", "duree_hospitalisation"])
+    df_rh = storage.read_table("personnel", raw_dir, start=start, columns=[
+        "date_heure_prise_poste", "service", "effectif_present", "effectif_theorique",
+        "taux_absenteisme", "heures_supp"])
+    df_mat = storage.read_table("materiel", raw_dir, start=start, columns=[
+        "date_heure_inventaire", "services", "nbre_lits_dispos", "equipements_disponibles"])
+    return df_p, df_rh, df_mat
+
+def clean_patients(df_p):
+    """Nettoyage de base (validé en EDA) : âges aberrants écartés"""
+    return df_p[(df_p["age"] >= 0) & (df_p["age"] <= 110)]
+
+def build_cube(df_p, df_rh, df_mat, resolution="shift"):
+    """Cube jour x service x créneau des données brutes nettoyées"""
+    return aggregation.build_cube(
+        {"patients": clean_patients(df_p), "personnel": df_rh, "materiel": df_mat}, resolution=resolution)
+
+def aggregate_days(df_p, df_rh, df_mat):
+    """Une ligne par jour : flux, calendrier, RH et matériel (sans la variable d'inertie)"""
+    return aggregation.rollup_daily(build_cube(df_p, df_rh, df_mat))
+
+def finalize(df_days, patients_veille=None, moyenne_historique=None):
+    """Ajoute patients_hier (décalage d'un jour) et comble les trous.
+
+    patients_veille : nb_patients du dernier jour déjà traité (mode incrémental).
+    moyenne_historique : valeur du tout premier jour, qui n'a pas de "hier".
+    """
+    df = df_days.copy()
+    df["patients_hier"] = df["nb_patients"].shift(1)
+    if patients_veille is not None and len(df):
+        df.loc[df.index[0], "patients_hier"] = patients_veille
+    if moyenne_historique is None:
+        moyenne_historique = df["nb_patients"].mean()
+    df["patients_hier"] = df["patients_hier"].fillna(moyenne_historique)
+
+    # Si un jour n'a pas de donnée RH / matériel, on met 0
+    return df.fillna(0)[TRAIN_COLUMNS]
+
+def aggregate_service_days(df_p, df_rh, df_mat):
+    """Une ligne par (jour, service), sans la variable d'inertie"""
+    return aggregation.rollup_service_daily(build_cube(df_p, df_rh, df_mat))
+
+def finalize_services(df_svc):
+    """patients_hier par service (veille du même service, moyenne du service au premier jour)"""
+    df = df_svc.sort_values(["service", "date"], kind="stable")
+    groupes = df.groupby("service", observed=True)["nb_patients"]
+    df["patients_hier"] = groupes.shift(1).fillna(groupes.transform("mean"))
+    df = df.sort_values(["date", "service"], kind="stable").fillna(0).reset_index(drop=True)
+    return df[["date", "service"] + TRAIN_COLUMNS[1:]]
+
+def run_services(raw_dir=RAW_DIR, processed_dir=PROCESSED_DIR):
+    """Dataset par service (train_data_services), pour les modèles par service"""
+    df = finalize_services(aggregate_service_days(*load_raw(raw_dir)))
+    os.makedirs(processed_dir, exist_ok=True)
+    df.to_csv(os.path.join(processed_dir, SERVICES_FILE), index=False)
+    return df
+
+def _paths(processed_dir):
+    return os.path.join(processed_dir, TRAIN_FILE), os.path.join(processed_dir, WATERMARK_FILE)
+
+def read_watermark(processed_dir=PROCESSED_DIR):
+    """État du dernier passage (None si aucun dataset n'a encore été produit)"""
+    _, chemin = _paths(processed_dir)
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write(df, processed_dir):
+    chemin_train, chemin_wm = _paths(processed_dir)
+    os.makedirs(processed_dir, exist_ok=True)
+    df.to_csv(chemin_train, index=False)
+
+    # On garde de quoi prolonger la série sans relire l'historique :
+    # somme / nombre de jours pour la moyenne, dernier comptage pour le lag
+    etat = {
+        "watermark": df["date"].max().strftime("%Y-%m-%d"),
+        "nb_jours": int(len(df)),
+        "somme_patients": int(df["nb_patients"].sum()),
+        "dernier_nb_patients": int(df["nb_patients"].iloc[-1]),
+    }
+    with open(chemin_wm, "w", encoding="utf-8") as f:
+        json.dump(etat, f, indent=1)
+    return etat
+
+def run_full(raw_dir=RAW_DIR, processed_dir=PROCESSED_DIR):
+    """Recalcul complet de train_data_hybride"""
+    df = finalize(aggregate_days(*load_raw(raw_dir)))
+    _write(df, processed_dir)
+    return df
+
+def run_incremental(raw_dir=RAW_DIR, processed_dir=PROCESSED_DIR):
+    """Agrège seulement les jours postérieurs au watermark et les ajoute au dataset.
+
+    Sans watermark (premier passage), bascule sur un recalcul complet.
+    """
+    etat = read_watermark(processed_dir)
+    if etat is None:
+        return run_full(raw_dir, processed_dir)
+
+    debut = pd.Timestamp(etat["watermark"]) + pd.Timedelta(days=1)
+    bruts = load_raw(raw_dir, start=debut)
+    chemin_train, _ = _paths(processed_dir)
+    existant = pd.read_csv(chemin_train, parse_dates=["date"], float_precision="round_trip")
+    # Aucune ligne après le watermark : rien à agréger
+    if all(df.empty for df in bruts):
+        return existant
+    nouveaux = aggregate_days(*bruts)
+
+    # La moyenne du premier jour porte sur tout l'historique : elle bouge à chaque ajout
+    moyenne = (etat["somme_patients"] + nouveaux["nb_patients"].sum()) / (etat["nb_jours"] + len(nouveaux))
+    nouveaux = finalize(nouveaux, patients_veille=etat["dernier_nb_patients"], moyenne_historique=moyenne)
+    existant.loc[0, "patients_hier"] = moyenne
+
+    df = pd.concat([existant, nouveaux], ignore_index=True)
+    _write(df, processed_dir)
+    return df
+
+# --- MULTI-SITES ---
+# Chaque shard <raw_dir>/sites/<nom>/ donne son propre dataset (avec son watermark)
+# dans <processed_dir>/sites/<nom>/. Les sites sont traités en parallèle.
+
+def _run_site(args):
+    site, raw_dir, processed_dir, full = args
+    run = run_full if full else run_incremental
+    df = run(storage.site_dir(raw_dir, site), storage.site_dir(processed_dir, site))
+    return site, len(df)
+
+def run_sites(raw_dir=RAW_DIR, processed_dir=PROCESSED_DIR, sites=None, full=False, n_workers=1):
+    """Agrège chaque site (tous les shards par défaut). Retourne {site: nombre de jours}"""
+    sites = storage.list_sites(raw_dir) if sites is None else list(sites)
+    taches = [(site, raw_dir, processed_dir, full) for site in sites]
+    if n_workers > 1 and len(taches) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            return dict(pool.map(_run_site, taches))
+    return dict(map(_run_site, taches))
+
+def load_train_sites(processed_dir=PROCESSED_DIR, sites=None):
+    """train_data_hybride de plusieurs sites (tous par défaut), avec une colonne site"""
+    sites = storage.list_sites(processed_dir) if sites is None else list(sites)
+    morceaux = [pd.read_csv(_paths(storage.site_dir(processed_dir, s))[0], parse_dates=["date"]).assign(site=s)
+                for s in sites]
+    if not morceaux:
+        return pd.DataFrame(columns=["site"] + TRAIN_COLUMNS)
+    df = pd.concat(morceaux, ignore_index=True)
+    df["site"] = pd.Categorical(df["site"], categories=sites)
+    return df[["site"] + TRAIN_COLUMNS]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agrégation journalière -> train_data_hybride")
+    parser.add_argument("--full", action="store_true", help="Recalcul complet (ignore le watermark)")
+    parser.add_argument("--raw-dir", default=RAW_DIR)
+    parser.add_argument("--processed-dir", default=PROCESSED_DIR)
+    parser.add_argument("--services", action="store_true", help=f"Produit aussi {SERVICES_FILE} (un jour x service par ligne)")
+    parser.add_argument("--site", action="append", help="Site à agréger (répétable) ; sinon données principales")
+    parser.add_argument("--all-sites", action="store_true", help="Agrège tous les sites de <raw-dir>/sites")
+    parser.add_argument("--workers", type=int, default=1, help="Sites traités en parallèle")
+    args = parser.parse_args()
+
+    if args.site or args.all_sites:
+        jours = run_sites(args.raw_dir, args.processed_dir, sites=args.site, full=args.full, n_workers=args.workers)
+        for site, n in jours.items():
+            print(f"✅ {site} : {n} jours")
+        raise SystemExit(0)
+
+    if args.full:
+        df = run_full(args.raw_dir, args.processed_dir)
+    else:
+        df = run_incremental(args.raw_dir, args.processed_dir)
+    print(f"✅ {TRAIN_FILE} : {len(df)} jours, watermark {df['date'].max():%Y-%m-%d}")
+    if args.services:
+        df_svc = run_services(args.raw_dir, args.processed_dir)
+        print(f"✅ {SERVICES_FILE} : {len(df_svc)} lignes ({df_svc['service'].nunique()} services)")
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+from src import instrumentation
+
+# --- CUBE OPÉRATIONNEL PRÉCALCULÉ (DASHBOARD) ---
+# La vue Lits / Personnel / Matériel du dashboard ne dépend que du flux final
+# (flux de base du jour + slider flux) et du slider RH. On la précalcule une fois
+# pour toutes les combinaisons (date x pas sim_flux x pas sim_rh x service) en
+# NumPy vectorisé : un mouvement de slider devient une simple lecture de tableau.
+# Les valeurs sont identiques à l'ancienne boucle par service (même graine par flux),
+# sauf au seuil exact : un flux égal au seuil est dans le niveau atteint (>=, comme alert_level).
+
+SERVICES_OPS = ['Urgences', 'Pneumologie', 'Infectieux', 'Gériatrie', 'Chirurgie']
+CAPACITE_TOTALE = {'Urgences': 120, 'Pneumologie': 100, 'Infectieux': 80, 'Gériatrie': 200, 'Chirurgie': 350}
+# Répartition fixe du flux (repli quand aucun modèle par service n'est entraîné)
+FLUX_WEIGHTS = [0.45, 0.15, 0.10, 0.20, 0.10]
+# Services du générateur regroupés sous chaque service affiché (prévisions par service)
+SERVICES_SOURCES = {
+    'Urgences': ['Urgences'],
+    'Pneumologie': ['Pneumologie'],
+    'Infectieux': ['Infectieux'],
+    'Gériatrie': ['Geriatrie'],
+    'Chirurgie': ['Chirurgie_Ortho', 'Chirurgie_Viscerale', 'Chirurgie_Cardio'],
+}
+
+# Seuils d'alerte par défaut (série de démonstration). Avec un historique, le dashboard
+# utilise les quantiles du notebook 03 tenus à jour par src.thresholds
+SEUILS = {"PRE-ALERTE": 330, "ALERTE": 370, "CRITIQUE": 410}
+
+# Grilles des sliders du dashboard
+SIM_FLUX_STEPS = np.arange(-50, 151, 10)
+SIM_RH_STEPS = np.arange(0, 31, 5)
+
+# "Lits Fermés (RH)" et "Lits Dispos" : KPI clés pour la prévision des besoins Personnel / Lits
+COLONNES_OPS = ["Service", "Capacité Totale", "Lits Fermés (RH)", "Lits Occupés", "Lits Dispos",
+                "Taux Occ. %", "CCMU Moyen"]
+
+def alert_level(flux_total, seuils=SEUILS):
+    """Niveau d'alerte d'un flux (scalaire ou tableau) : seuil atteint, comme dans le notebook 03"""
+    flux_total = np.asarray(flux_total)
+    niveau = np.select(
+        [flux_total >= seuils["CRITIQUE"], flux_total >= seuils["ALERTE"], flux_total >= seuils["PRE-ALERTE"]],
+        ["CRITIQUE", "ALERTE", "PRE-ALERTE"], default="NORMAL")
+    return niveau.item() if niveau.ndim == 0 else niveau
+
+def _flux_noise(flux_values, n_services):
+    """Aléas par service pour chaque valeur de flux : np.random.seed(flux) puis
+    uniform(-0.02, 0.05) (absentéisme) et uniform(2.1, 3.8) (CCMU) en alternance"""
+    uniques, inverse = np.unique(flux_values, return_inverse=True)
+    tirages = np.stack([np.random.RandomState(int(f) % 2**32).random_sample(2 * n_services) for f in uniques])
+    bruit_abs = -0.02 + 0.07 * tirages[:, 0::2]
+    ccmu = 2.1 + 1.7 * tirages[:, 1::2]
+    forme = np.shape(flux_values) + (n_services,)
+    return bruit_abs[inverse.ravel()].reshape(forme), ccmu[inverse.ravel()].reshape(forme)
+
+@instrumentation.traced("vue.cube", lignes=lambda cube: cube["lits_dispos"].size)
+def build_cube(dates, flux_base, sim_flux_steps=SIM_FLUX_STEPS, sim_rh_steps=SIM_RH_STEPS, seuils=SEUILS,
+               weights=None, capacites=None):
+    """Précalcule l'état opérationnel pour chaque (date, pas flux, pas RH, service).
+
+    weights : part de chaque service, fixe (S,) ou jour par jour (D, S) (prévisions par
+    service). Par défaut, la répartition fixe FLUX_WEIGHTS.
+    capacites : capacité de chaque service affiché (par défaut CAPACITE_TOTALE).
+    """
+    capacite = np.array([(capacites or CAPACITE_TOTALE)[s] for s in SERVICES_OPS])
+    poids = np.asarray(FLUX_WEIGHTS if weights is None else weights, dtype=float)
+    poids = poids[:, None, :] if poids.ndim == 2 else poids                                       # (D, 1, S)
+
+    flux = np.asarray(flux_base, dtype=np.int64)[:, None] + np.asarray(sim_flux_steps)[None, :]   # (D, F)
+
+    # Absentéisme de base (selon alerte) + surcharge simulée (Grève, Epidémie)
+    abs_base = np.where(flux >= seuils["CRITIQUE"], 0.20, np.where(flux >= seuils["ALERTE"], 0.15, 0.10))
+    abs_total = np.minimum(abs_base[:, :, None] + np.asarray(sim_rh_steps)[None, None, :] / 100.0, 1.0)
+
+    bruit_abs, ccmu = _flux_noise(flux, len(SERVICES_OPS))                                          # (D, F, S)
+    taux_abs_svc = np.maximum(abs_total[..., None] + bruit_abs[:, :, None, :], 0)                   # (D, F, R, S)
+
+    patients = (flux[..., None] * poids).astype(np.int64)                                           # (D, F, S)
+    lits_fermes = (capacite * taux_abs_svc).astype(np.int64)
+    lits_ouverts = capacite - lits_fermes
+    lits_dispos = np.maximum(lits_ouverts - patients[:, :, None, :], 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taux_occ = np.where(lits_ouverts > 0, patients[:, :, None, :] / lits_ouverts * 100, 100)
+    taux_occ = np.minimum(taux_occ, 100)
+
+    return {
+        "dates": pd.DatetimeIndex(dates),
+        "sim_flux": np.asarray(sim_flux_steps),
+        "sim_rh": np.asarray(sim_rh_steps),
+        "flux": flux,
+        "capacite": capacite,
+        "lits_fermes": lits_fermes.astype(np.int16),
+        "lits_occupes": patients.astype(np.int16),
+        "lits_dispos": lits_dispos.astype(np.int16),
+        # Valeurs arrondies au dixième, stockées en dixièmes entiers (compactes et exactes)
+        "taux_occ_dixiemes": np.round(taux_occ * 10).astype(np.int16),
+        "ccmu_dixiemes": np.round(ccmu * 10).astype(np.int16),
+    }
+
+def _scenario_index(cube, sim_flux, sim_rh):
+    i_flux = int(np.searchsorted(cube["sim_flux"], sim_flux))
+    i_rh = int(np.searchsorted(cube["sim_rh"], sim_rh))
+    if i_flux >= len(cube["sim_flux"]) or cube["sim_flux"][i_flux] != sim_flux \
+            or i_rh >= len(cube["sim_rh"]) or cube["sim_rh"][i_rh] != sim_rh:
+        raise KeyError(f"Scénario hors grille : sim_flux={sim_flux}, sim_rh={sim_rh}")
+    return i_flux, i_rh
+
+def _frame(capacite, fermes, occupes, dispos, occ, ccmu):
+    return pd.DataFrame(dict(zip(COLONNES_OPS, [
+        SERVICES_OPS, capacite, fermes, occupes, dispos, occ, ccmu])))
+
+@instrumentation.traced("vue.jour", lignes=len)
+def day_view(cube, date, sim_flux, sim_rh):
+    """Tableau opérationnel d'un jour (mêmes colonnes que le dashboard)"""
+    d = cube["dates"].get_loc(pd.Timestamp(date))
+    f, r = _scenario_index(cube, sim_flux, sim_rh)
+    return _frame(cube["capacite"], cube["lits_fermes"][d, f, r].astype(int), cube["lits_occupes"][d, f].astype(int),
+                  cube["lits_dispos"][d, f, r].astype(int), cube["taux_occ_dixiemes"][d, f, r] / 10,
+                  cube["ccmu_dixiemes"][d, f] / 10)
+
+def period_states(cube, start, end, sim_flux, sim_rh):
+    """États opérationnels jour par jour sur [start, end] (une ligne par date x service).
+
+    La période est bornée aux dates du cube (recherche dichotomique, O(log n)).
+    """
+    f, r = _scenario_index(cube, sim_flux, sim_rh)
+    d0 = cube["dates"].searchsorted(pd.Timestamp(start), side="left")
+    d1 = cube["dates"].searchsorted(pd.Timestamp(end), side="right")
+    n_jours, n_svc = d1 - d0, len(SERVICES_OPS)
+    return pd.DataFrame({
+        "date": np.repeat(cube["dates"][d0:d1], n_svc),
+        "Service": np.tile(SERVICES_OPS, n_jours),
+        "Flux": np.repeat(cube["flux"][d0:d1, f], n_svc),
+        "Capacité Totale": np.tile(cube["capacite"], n_jours),
+        "Lits Fermés (RH)": cube["lits_fermes"][d0:d1, f, r].ravel().astype(int),
+        "Lits Occupés": cube["lits_occupes"][d0:d1, f].ravel().astype(int),
+        "Lits Dispos": cube["lits_dispos"][d0:d1, f, r].ravel().astype(int),
+        "Taux Occ. %": cube["taux_occ_dixiemes"][d0:d1, f, r].ravel() / 10,
+        "CCMU Moyen": cube["ccmu_dixiemes"][d0:d1, f].ravel() / 10,
+    })
+
+@instrumentation.traced("vue.periode", lignes=len)
+def period_view(cube, start, end, sim_flux, sim_rh):
+    """Tableau opérationnel d'une période : moyenne des états réels de chaque jour"""
+    etats = period_states(cube, start, end, sim_flux, sim_rh)
+    moyenne = etats.groupby("Service", sort=False)[COLONNES_OPS[1:]].mean()
+    entiers = ["Capacité Totale", "Lits Fermés (RH)", "Lits Occupés", "Lits Dispos"]
+    moyenne[entiers] = moyenne[entiers].round().astype(int)
+    moyenne[["Taux Occ. %", "CCMU Moyen"]] = moyenne[["Taux Occ. %", "CCMU Moyen"]].round(1)
+    return moyenne.reset_index()
@@ -0,0 +1,185 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+from src import training
+from src.forecast import FEATURES, RESOURCE_FEATURES, TARGET, build_feature_matrix, predictor, recursive_forecast
+from src.preprocessing import PROCESSED_DIR, SERVICES_FILE
+
+# --- PRÉVISION PAR SERVICE ---
+# Un modèle XGBoost par service (mêmes features que le modèle hôpital, calculées sur le
+# service), entraînés en parallèle dans un pool de processus. À la prédiction, les lignes
+# de tous les services sont empilées dans une seule matrice et chaque ligne est attribuée
+# au modèle de son service, par nom. La prédiction n'est PAS faite en un seul appel : des
+# boosters distincts ne partagent pas d'appel, il reste un appel natif par service et par
+# pas de temps. Un appel unique demanderait un modèle partagé avec le service en feature,
+# au prix de l'entraînement parallèle par service.
+# Les prévisions par service remplacent la répartition fixe du flux du dashboard.
+
+SERVICES_PATH = os.path.join(PROCESSED_DIR, SERVICES_FILE)
+SERVICES_MODEL_DIR = os.path.join(training.MODEL_DIR, "services")
+META_FILE = "services.meta.json"
+
+def load_service_data(path=SERVICES_PATH):
+    df = pd.read_csv(path, parse_dates=['date'])
+    # Ordre des services = ordre de première apparition (ordre du générateur)
+    df['service'] = pd.Categorical(df['service'], categories=list(dict.fromkeys(df['service'])))
+    return df
+
+def _train_one(args):
+    service, df_svc, params = args
+    return service, training.train_model(df_svc, params)
+
+def train_service_models(df_svc, params=None, n_workers=1):
+    """Un modèle par service, entraînés en parallèle. Retourne {service: modèle} (ordre des services)"""
+    params = dict(params or {})
+    if n_workers > 1:
+        # Un cœur par modèle : le parallélisme vient du pool, pas des threads XGBoost
+        params.setdefault("n_jobs", 1)
+    taches = [(svc, grp[FEATURES + [TARGET]], params)
+              for svc, grp in df_svc.groupby('service', observed=True, sort=True)]
+
+    if n_workers > 1 and len(taches) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            return dict(pool.map(_train_one, taches))
+    return dict(_train_one(t) for t in taches)
+
+def save_service_models(models, model_dir=SERVICES_MODEL_DIR, df_train=None):
+    """Un fichier JSON par service + métadonnées (version = empreinte de tous les modèles)"""
+    os.makedirs(model_dir, exist_ok=True)
+    empreintes = []
+    for i, (svc, model) in enumerate(models.items()):
+        chemin = os.path.join(model_dir, f"{i:02d}_{svc}.json")
+        model.save_model(chemin)
+        empreintes.append(training.file_digest(chemin))
+
+    meta = {
+        "version": hashlib.sha1("".join(empreintes).encode()).hexdigest()[:12],
+        "entraine_le": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "services": list(models),
+    }
+    if df_train is not None:
+        meta["dernier_jour"] = df_train['date'].max().strftime("%Y-%m-%d")
+    with open(os.path.join(model_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1, ensure_ascii=False)
+    return meta
+
+def load_service_models(model_dir=SERVICES_MODEL_DIR):
+    """Charge ({service: modèle}, métadonnées). FileNotFoundError si aucun artefact"""
+    meta_path = os.path.join(model_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"Aucun modèle par service dans {model_dir} (lancer `python -m src.service_forecast`)")
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    models = {}
+    for i, svc in enumerate(meta["services"]):
+        models[svc] = XGBRegressor()
+        models[svc].load_model(os.path.join(model_dir, f"{i:02d}_{svc}.json"))
+    return models, meta
+
+def service_predictor(models, services):
+    """Fonction de prédiction sur une matrice empilée : la ligne i est prédite par le
+    modèle de services[i] (nom du service). ValueError si un service n'a pas de modèle.
+    """
+    services = np.asarray(services, dtype=object)
+    inconnus = sorted(set(services) - set(models))
+    if inconnus:
+        raise ValueError(f"Services sans modèle : {inconnus}")
+    blocs = []
+    for svc in dict.fromkeys(services):
+        idx = np.flatnonzero(services == svc)
+        # Bloc contigu (lignes triées par service) : tranche sans copie
+        if idx[-1] - idx[0] + 1 == len(idx):
+            idx = slice(idx[0], idx[-1] + 1)
+        blocs.append((predictor(models[svc]), idx))
+
+    def predict(X):
+        if len(X) != len(services):
+            raise ValueError(f"{len(X)} lignes pour {len(services)} services")
+        out = np.empty(len(X), dtype=np.float32)
+        for f, idx in blocs:
+            out[idx] = f(X[idx])
+        return out
+    return predict
+
+def _par_service(df_svc, services):
+    """Lignes triées service puis date. ValueError si l'historique et les modèles ne
+    couvrent pas les mêmes services"""
+    presents = set(df_svc['service'].astype(str))
+    if presents != set(services):
+        raise ValueError(f"Services sans modèle : {sorted(presents - set(services))}, "
+                         f"sans historique : {sorted(set(services) - presents)}")
+    return df_svc.sort_values(['service', 'date'], kind="stable")
+
+def default_service_scenario(df_svc, services):
+    """Moyennes historiques des ressources de chaque service (vecteurs (S, 1)), aucune panne"""
+    moyennes = df_svc.groupby(df_svc['service'].astype(str))[RESOURCE_FEATURES].mean().reindex(services)
+    scenario = {col: moyennes[col].to_numpy(dtype=np.float32)[:, None] for col in RESOURCE_FEATURES}
+    scenario['panne_materiel'] = np.zeros((len(services), 1), dtype=np.float32)
+    return scenario
+
+def predict_services(models, df_svc, start, end, scenario=None):
+    """Prévision de chaque service sur [start, end] : tableau large (dates x services).
+
+    Jours connus : J+1 à partir des features du service (NaN pour un service sans ligne ce
+    jour-là). Jours suivants : récursion depuis le dernier jour connu, toutes les
+    trajectoires de services avancées ensemble.
+    """
+    services = list(models)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    df = _par_service(df_svc, services)
+    morceaux = []
+
+    connus = df[(df['date'] >= start) & (df['date'] <= end)]
+    if len(connus):
+        # Chaque ligne va au modèle de son service, résultat réaligné par date
+        noms = connus['service'].astype(str).to_numpy()
+        preds = service_predictor(models, noms)(connus[FEATURES].to_numpy(dtype=np.float32))
+        large = pd.DataFrame({'date': connus['date'].to_numpy(), 'service': noms,
+                              'pred': preds}).pivot(index='date', columns='service', values='pred')
+        morceaux.append(large.reindex(columns=services).rename_axis(None, axis=1).rename_axis(None))
+
+    dernier = df['date'].max()
+    if end > dernier:
+        futur = pd.date_range(dernier + pd.Timedelta(days=1), end, freq='D')
+        scen = {**default_service_scenario(df, services), **(scenario or {})}
+        X = build_feature_matrix(futur, scen, len(services))
+        init = df.groupby(df['service'].astype(str))[TARGET].last().reindex(services).to_numpy()
+        preds = recursive_forecast(service_predictor(models, services), futur, scen, init, X=X)
+        garde = futur >= start
+        morceaux.append(pd.DataFrame(preds[:, garde].T, index=futur[garde], columns=services))
+
+    if not morceaux:
+        return pd.DataFrame(columns=services, dtype=np.float32)
+    return pd.concat(morceaux).rename_axis('date')
+
+def service_shares(preds, groupes):
+    """Part de chaque groupe de services dans le flux prévu, jour par jour (lignes sommant à 1).
+
+    groupes : {nom affiché: [services sources]}. Retourne un tableau (n_jours, n_groupes).
+    """
+    flux = np.stack([preds[list(sources)].to_numpy(dtype=float).sum(axis=1) for sources in groupes.values()],
+                    axis=1)
+    flux = np.maximum(flux, 0)
+    total = flux.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, flux / total, 1 / len(groupes))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entraîne un modèle de flux par service (en parallèle)")
+    parser.add_argument("--data", default=SERVICES_PATH)
+    parser.add_argument("--model-dir", default=SERVICES_MODEL_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    df = load_service_data(args.data)
+    t0 = time.perf_counter()
+    modeles = train_service_models(df, n_workers=args.workers)
+    meta = save_service_models(modeles, args.model_dir, df_train=df)
+    print(f"✅ {len(modeles)} modèles (version {meta['version']}) entraînés en "
+          f"{time.perf_counter() - t0:.1f}s avec {args.workers} workers -> {args.model_dir}/")
@@ -0,0 +1,186 @@
+import os
+import numpy as np
+import pandas as pd
+from src import instrumentation
+
+# --- STOCKAGE COLONNAIRE (PARQUET PARTITIONNÉ ANNÉE/MOIS) ---
+# Les tables brutes du générateur peuvent être écrites en CSV (historique) ou en
+# Parquet partitionné par annee=/mois=. En Parquet, les lectures ne chargent que
+# les colonnes demandées et les partitions qui recoupent la plage de dates.
+
+FORMATS = ["csv", "parquet"]
+
+# Colonne temporelle de référence de chaque table (sert au partitionnement)
+DATE_COLUMNS = {
+    "patients": "date_et_heure_admission",
+    "personnel": "date_heure_prise_poste",
+    "materiel": "date_heure_inventaire",
+}
+
+# Schéma typé : catégories pour les libellés, petits entiers, timestamps natifs
+SCHEMAS = {
+    "patients": {
+        "ID_Patient": "string",
+        "age": "int16",
+        "sexe": "category",
+        "motif_admission": "category",
+        "ccmu": "int8",
+        "duree_hospitalisation": "float64",
+        "date_et_heure_admission": "datetime64[ns]",
+        "service_admission": "category",
+        "issue": "category",
+    },
+    "personnel": {
+        "id_personnel": "string",
+        "date_heure_prise_poste": "datetime64[ns]",
+        "service": "category",
+        "shift": "category",
+        "horaires_de_travail": "category",
+        "type_de_personnel": "category",
+        "effectif_theorique": "int16",
+        "effectif_present": "int16",
+        "taux_absenteisme": "float64",
+        "heures_supp": "int16",
+    },
+    "materiel": {
+        "date_heure_inventaire": "datetime64[ns]",
+        "services": "category",
+        "types_de_lits_disponibles": "category",
+        "nbre_lits_dispos": "int16",
+        "equipements_disponibles": "category",
+    },
+}
+
+# Unités des durées (les colonnes ne la portent pas) : le générateur tire la durée de
+# séjour en heures (log-normale, médiane ~12 h, +4 à 12 h quand le service n'a plus de lit)
+UNITES = {"patients": {"duree_hospitalisation": "h"}}
+
+PARTITION_COLUMNS = ["annee", "mois"]
+
+def table_path(name, root, fmt):
+    """Chemin d'une table : <root>/<name>.csv ou <root>/<name>/ (dataset Parquet)"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Format inconnu : {fmt!r} (attendu parmi {FORMATS})")
+    return os.path.join(root, f"{name}.csv" if fmt == "csv" else name)
+
+def detect_format(name, root):
+    """Format disponible sur disque pour une table (Parquet prioritaire)"""
+    if os.path.isdir(table_path(name, root, "parquet")):
+        return "parquet"
+    if os.path.exists(table_path(name, root, "csv")):
+        return "csv"
+    raise FileNotFoundError(f"Table '{name}' introuvable dans {root}")
+
+def apply_schema(df, name):
+    """Convertit un DataFrame brut vers le schéma typé de la table"""
+    schema = {col: dtype for col, dtype in SCHEMAS[name].items() if col in df.columns}
+    return df.astype(schema)
+
+def write_table(df, name, root, fmt="csv", append=False):
+    """Écrit (ou ajoute à) une table brute au format demandé"""
+    with instrumentation.span(f"ecriture.{fmt}", len(df)):
+        return _write_table(df, name, root, fmt, append)
+
+def _write_table(df, name, root, fmt, append):
+    chemin = table_path(name, root, fmt)
+    os.makedirs(root, exist_ok=True)
+
+    if fmt == "csv":
+        df.to_csv(chemin, mode="a" if append else "w", header=not append, index=False)
+        return chemin
+
+    if not append and os.path.isdir(chemin):
+        for dossier, _, fichiers in os.walk(chemin, topdown=False):
+            for f in fichiers:
+                os.remove(os.path.join(dossier, f))
+            os.rmdir(dossier)
+
+    df = apply_schema(df, name)
+    ts = df[DATE_COLUMNS[name]]
+    df = df.assign(annee=ts.dt.year.astype("int16"), mois=ts.dt.month.astype("int8"))
+    df.to_parquet(chemin, engine="pyarrow", partition_cols=PARTITION_COLUMNS, index=False)
+    return chemin
+
+def _partition_filters(start, end):
+    """Filtres annee/mois (forme DNF) qui ne gardent que les partitions recoupant [start, end]"""
+    bornes = []
+    if start is not None:
+        start = pd.Timestamp(start)
+        bornes.append([[("annee", ">", start.year)], [("annee", "=", start.year), ("mois", ">=", start.month)]])
+    if end is not None:
+        end = pd.Timestamp(end)
+        bornes.append([[("annee", "<", end.year)], [("annee", "=", end.year), ("mois", "<=", end.month)]])
+    if not bornes:
+        return None
+    if len(bornes) == 1:
+        return bornes[0]
+    return [a + b for a in bornes[0] for b in bornes[1]]
+
+def read_table(name, root, columns=None, start=None, end=None, fmt=None):
+    """Charge une table brute, en ne lisant que `columns` et la plage [start, end].
+
+    start / end bornent la colonne temporelle de la table (end inclus, à la journée
+    si une date est fournie sans heure).
+    """
+    fmt = fmt or detect_format(name, root)
+    date_col = DATE_COLUMNS[name]
+    cols = None if columns is None else list(dict.fromkeys(list(columns) + [date_col]))
+    fin = None if end is None else pd.Timestamp(end)
+    if fin is not None and fin == fin.normalize():
+        fin = fin + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+
+    if fmt == "csv":
+        df = pd.read_csv(table_path(name, root, "csv"), usecols=cols, parse_dates=[date_col])
+        df = apply_schema(df, name)
+    else:
+        df = pd.read_parquet(table_path(name, root, "parquet"), engine="pyarrow",
+                             columns=None if cols is None else cols + PARTITION_COLUMNS,
+                             filters=_partition_filters(start, end))
+        # Les partitions sont découvertes dans l'ordre lexicographique (mois=10 < mois=2) :
+        # on rétablit l'ordre chronologique sans toucher à l'ordre interne des fichiers
+        ordre = np.lexsort((df["mois"].astype(int).to_numpy(), df["annee"].astype(int).to_numpy()))
+        df = df.drop(columns=PARTITION_COLUMNS).take(ordre).reset_index(drop=True)
+
+    masque = np.ones(len(df), dtype=bool)
+    if start is not None:
+        masque &= (df[date_col] >= pd.Timestamp(start)).to_numpy()
+    if fin is not None:
+        masque &= (df[date_col] <= fin).to_numpy()
+    if not masque.all():
+        df = df.loc[masque].reset_index(drop=True)
+
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+# --- SHARDS PAR SITE (MULTI-SITES) ---
+# Chaque site a son propre dossier <root>/sites/<nom>/, avec les mêmes tables et le
+# même format que le dossier principal : toute lecture par site réutilise read_table.
+
+SITES_SUBDIR = "sites"
+SITE_CONFIG_FILE = "site.json"
+
+def site_dir(root, site):
+    """Dossier du shard d'un site"""
+    return os.path.join(root, SITES_SUBDIR, site)
+
+def list_sites(root):
+    """Sites disponibles sous <root>/sites (ordre alphabétique)"""
+    dossier = os.path.join(root, SITES_SUBDIR)
+    if not os.path.isdir(dossier):
+        return []
+    return sorted(d for d in os.listdir(dossier) if os.path.isdir(os.path.join(dossier, d)))
+
+def read_sites(name, root, sites=None, **kwargs):
+    """Table `name` de plusieurs sites (tous par défaut), avec une colonne "site".
+
+    Les arguments de read_table (columns, start, end, fmt) s'appliquent à chaque shard.
+    """
+    sites = list_sites(root) if sites is None else list(sites)
+    morceaux = [read_table(name, site_dir(root, s), **kwargs) for s in sites]
+    if not morceaux:
+        return pd.DataFrame()
+    longueurs = [len(m) for m in morceaux]
+    df = pd.concat(morceaux, ignore_index=True)
+    df.insert(0, "site", pd.Categorical.from_codes(np.repeat(np.arange(len(sites)), longueurs), categories=sites))
+    return df
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# --- MOTEUR DE SEUILS D'ALERTE (QUANTILES EN FLUX) ---
+# Les seuils du notebook 03 sont les quantiles 0.75 / 0.90 / 0.97 de nb_patients sur tout
+# l'historique. Les comptes journaliers étant entiers, un histogramme (nombre de jours par
+# valeur) suffit pour retrouver ces quantiles exactement (interpolation linéaire, comme
+# pandas) : la mémoire dépend de l'étendue des valeurs, pas du nombre de jours. Chaque
+# nouveau jour incrémente une case, sans relire l'historique.
+# Un histogramme global, un par saison et un par service (données par service), tenus à
+# jour de façon incrémentale et persistés en JSON (models/seuils_alerte.json).
+
+QUANTILES_ALERTE = {"SEUIL_PREALERTE": 0.75, "SEUIL_ALERTE": 0.90, "SEUIL_CRITIQUE": 0.97}
+# Nom des seuils côté dashboard (scenario_cube.SEUILS)
+NIVEAUX_SEUILS = {"SEUIL_PREALERTE": "PRE-ALERTE", "SEUIL_ALERTE": "ALERTE", "SEUIL_CRITIQUE": "CRITIQUE"}
+
+SAISONS = {12: "Hiver", 1: "Hiver", 2: "Hiver", 3: "Printemps", 4: "Printemps", 5: "Printemps",
+           6: "Été", 7: "Été", 8: "Été", 9: "Automne", 10: "Automne", 11: "Automne"}
+
+THRESHOLDS_FILE = "seuils_alerte.json"
+THRESHOLDS_PATH = os.path.join("models", THRESHOLDS_FILE)
+COLONNE = "nb_patients"
+
+class QuantileSketch:
+    """Histogramme de valeurs entières positives : quantiles exacts en mémoire bornée"""
+
+    def __init__(self, counts=None):
+        self.counts = np.asarray(counts if counts is not None else [], dtype=np.int64)
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def update(self, valeurs):
+        valeurs = np.asarray(valeurs, dtype=float).ravel()
+        valeurs = valeurs[~np.isnan(valeurs)]
+        if not len(valeurs):
+            return self
+        entiers = np.rint(valeurs).astype(np.int64)
+        if (entiers != valeurs).any() or (entiers < 0).any():
+            raise ValueError("QuantileSketch attend des comptes entiers positifs")
+        ajout = np.bincount(entiers)
+        if len(ajout) > len(self.counts):
+            self.counts = np.pad(self.counts, (0, len(ajout) - len(self.counts)))
+        self.counts[:len(ajout)] += ajout
+        return self
+
+    def merge(self, autre):
+        taille = max(len(self.counts), len(autre.counts))
+        return QuantileSketch(np.pad(self.counts, (0, taille - len(self.counts)))
+                              + np.pad(autre.counts, (0, taille - len(autre.counts))))
+
+    def _rang(self, cumul, k):
+        """Valeur de rang k (0 = minimum)"""
+        return float(np.searchsorted(cumul, k, side="right"))
+
+    def quantile(self, q):
+        """Quantile (interpolation linéaire, identique à pandas.Series.quantile)"""
+        if self.n == 0:
+            return np.nan
+        cumul = np.cumsum(self.counts)
+        h = (self.n - 1) * q
+        bas = int(np.floor(h))
+        a, b, t = self._rang(cumul, bas), self._rang(cumul, min(bas + 1, self.n - 1)), h - bas
+        # Même formule que numpy (lerp symétrique) : mêmes arrondis flottants
+        return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+class ThresholdEngine:
+    """Seuils d'alerte (global, par saison, par service) mis à jour jour après jour"""
+
+    def __init__(self):
+        self.sketches = {}
+        self.bornes = {}        # source -> [premier jour, dernier jour] ingérés
+
+    def _sketch(self, cle):
+        return self.sketches.setdefault(cle, QuantileSketch())
+
+    def update(self, df, colonne=COLONNE):
+        """Ingère les jours de `df` postérieurs au dernier jour déjà vu (date, colonne[, service]).
+
+        Avec une colonne `service`, alimente les histogrammes par service ; sinon le global
+        et ceux des saisons.
+        """
+        source = "services" if "service" in df else "hopital"
+        if source in self.bornes:
+            df = df[df['date'] > pd.Timestamp(self.bornes[source][1])]
+        if not len(df):
+            return self
+
+        if source == "services":
+            for svc, grp in df.groupby('service', observed=True, sort=False):
+                self._sketch(f"service:{svc}").update(grp[colonne].to_numpy())
+        else:
+            self._sketch("global").update(df[colonne].to_numpy())
+            for saison, grp in df.groupby(df['date'].dt.month.map(SAISONS), sort=False):
+                self._sketch(f"saison:{saison}").update(grp[colonne].to_numpy())
+
+        premier = self.bornes.get(source, [df['date'].min().strftime("%Y-%m-%d")])[0]
+        self.bornes[source] = [premier, df['date'].max().strftime("%Y-%m-%d")]
+        return self
+
+    def thresholds(self, service=None, saison=None):
+        """Seuils au format du notebook 03 ({"SEUIL_PREALERTE": ..., ...})"""
+        cle = f"service:{service}" if service else f"saison:{saison}" if saison else "global"
+        if cle not in self.sketches:
+            raise ValueError(f"Aucun historique pour {cle!r} (disponibles : {sorted(self.sketches)})")
+        return {nom: self.sketches[cle].quantile(q) for nom, q in QUANTILES_ALERTE.items()}
+
+    def seuils(self, service=None, saison=None):
+        """Seuils au format du dashboard ({"PRE-ALERTE": ..., ...}, cf. scenario_cube.alert_level)"""
+        return {NIVEAUX_SEUILS[nom]: v for nom, v in self.thresholds(service, saison).items()}
+
+    # --- Persistance ---
+    def to_dict(self):
+        return {"bornes": self.bornes, "sketches": {k: s.counts.tolist() for k, s in self.sketches.items()}}
+
+    @classmethod
+    def from_dict(cls, etat):
+        engine = cls()
+        engine.bornes = {k: list(v) for k, v in etat["bornes"].items()}
+        engine.sketches = {k: QuantileSketch(v) for k, v in etat["sketches"].items()}
+        return engine
+
+    def save(self, path=THRESHOLDS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=THRESHOLDS_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+def alert_thresholds(df_hist, colonne=COLONNE):
+    """Seuils d'alerte du notebook 03 (quantiles de tout l'historique)"""
+    return ThresholdEngine().update(df_hist, colonne).thresholds()
+
+def _meme_debut(engine, source, df):
+    """L'état persisté porte-t-il sur le même historique (même premier jour) ?"""
+    return source not in engine.bornes or engine.bornes[source][0] == df['date'].min().strftime("%Y-%m-%d")
+
+def refresh_engine(df_hist, path=THRESHOLDS_PATH, df_services=None):
+    """Moteur persisté à `path`, mis à jour avec les nouveaux jours de l'historique.
+
+    Reconstruit si l'historique ne prolonge pas celui de l'état (autre premier jour).
+    """
+    engine = ThresholdEngine.load(path) if os.path.exists(path) else ThresholdEngine()
+    if not _meme_debut(engine, "hopital", df_hist) \
+            or (df_services is not None and not _meme_debut(engine, "services", df_services)):
+        engine = ThresholdEngine()
+    avant = json.dumps(engine.bornes, sort_keys=True)
+    engine.update(df_hist)
+    if df_services is not None:
+        engine.update(df_services)
+    if json.dumps(engine.bornes, sort_keys=True) != avant or not os.path.exists(path):
+        engine.save(path)
+    return engine
+
+if __name__ == "__main__":
+    from src import training
+    from src.service_forecast import SERVICES_PATH, load_service_data
+
+    parser = argparse.ArgumentParser(description="Met à jour les seuils d'alerte (quantiles en flux)")
+    parser.add_argument("--data", default=training.TRAIN_PATH)
+    parser.add_argument("--services", default=SERVICES_PATH)
+    parser.add_argument("--output", default=THRESHOLDS_PATH)
+    args = parser.parse_args()
+
+    df_svc = load_service_data(args.services) if os.path.exists(args.services) else None
+    engine = refresh_engine(training.load_train_data(args.data), args.output, df_svc)
+    lignes = [{"groupe": cle, "jours": s.n, **engine.thresholds(
+        service=cle.split(":", 1)[1] if cle.startswith("service:") else None,
+        saison=cle.split(":", 1)[1] if cle.startswith("saison:") else None)} for cle, s in engine.sketches.items()]
+    print(pd.DataFrame(lignes).to_string(index=False, float_format="{:.1f}".format))
+    print(f"✅ Seuils à jour jusqu'au {engine.bornes['hopital'][1]} -> {args.output}")
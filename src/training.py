@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+from src import instrumentation, storage
+from src.forecast import FEATURES, HORIZONS, TARGET, direct_training_set
+
+# --- ENTRAÎNEMENT & ARTEFACT DU MODÈLE ---
+# Le modèle XGBoost du notebook 03, entraîné puis sauvegardé au format JSON natif
+# d'XGBoost, avec un fichier de métadonnées (version = empreinte du fichier modèle).
+#
+# Cache d'artefacts adressé par contenu (models/artifacts/<clé>/) : la clé est
+# l'empreinte des données d'entraînement et des hyperparamètres.
+#   - mêmes données, mêmes paramètres -> le modèle est relu, aucun entraînement,
+#   - données = un artefact + des jours ajoutés -> poursuite du boosting (quelques
+#     arbres de plus sur les résidus) au lieu d'un réentraînement complet,
+#   - sinon (historique modifié, paramètres changés) -> entraînement complet.
+
+TRAIN_PATH = "data/processed/train_data_hybride.csv"
+MODEL_DIR = "models"
+MODEL_FILE = "xgb_flux.json"
+META_FILE = "xgb_flux.meta.json"
+
+# Configuration du modèle (Paramètres robustes, cf. notebook 03)
+DEFAULT_PARAMS = {
+    "n_estimators": 200,     # Nombre d'arbres
+    "max_depth": 4,          # Profondeur max (évite le sur-apprentissage)
+    "learning_rate": 0.05,   # Vitesse d'apprentissage
+    "random_state": 42,
+}
+
+ARTIFACTS_SUBDIR = "artifacts"
+ARTIFACT_MODEL = "model.json"
+ARTIFACT_META = "meta.json"
+
+CONTINUATION_ARBRES = 20     # Arbres ajoutés à chaque poursuite du boosting
+MAX_CONTINUATIONS = 30       # Au-delà, entraînement complet (évite la dérive du modèle)
+
+def site_paths(site):
+    """(dataset, dossier du modèle) d'un site (shards multi-sites)"""
+    return (os.path.join(storage.site_dir(os.path.dirname(TRAIN_PATH), site), os.path.basename(TRAIN_PATH)),
+            storage.site_dir(MODEL_DIR, site))
+
+def load_train_data(path=TRAIN_PATH):
+    return pd.read_csv(path, parse_dates=['date'])
+
+def train_model(df, params=None):
+    """Entraîne le régresseur XGBoost sur tout `df`"""
+    model = XGBRegressor(**{**DEFAULT_PARAMS, **(params or {})})
+    with instrumentation.span("entrainement.recursif", len(df)):
+        model.fit(df[FEATURES], df[TARGET])
+    return model
+
+def train_direct_model(df, horizons=HORIZONS, params=None):
+    """Modèle direct multi-horizon (J+1..J+horizons, cf. src.forecast.direct_forecast)"""
+    X, y = direct_training_set(df.sort_values('date'), horizons)
+    model = XGBRegressor(**{**DEFAULT_PARAMS, **(params or {})})
+    with instrumentation.span("entrainement.direct", len(y)):
+        model.fit(X, y)
+    return model
+
+def file_digest(path):
+    """Empreinte courte du contenu d'un fichier (sert de version)"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for bloc in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloc)
+    return h.hexdigest()[:12]
+
+def save_model(model, model_dir=MODEL_DIR, df_train=None, params=None, extra=None):
+    """Sauvegarde le modèle et ses métadonnées (+ `extra`). Retourne les métadonnées"""
+    os.makedirs(model_dir, exist_ok=True)
+    chemin = os.path.join(model_dir, MODEL_FILE)
+    model.save_model(chemin)
+
+    meta = {
+        "version": file_digest(chemin),
+        "entraine_le": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "features": FEATURES,
+        "params": {**DEFAULT_PARAMS, **(params or {})},
+    }
+    if df_train is not None:
+        meta.update(nb_jours=int(len(df_train)), dernier_jour=df_train['date'].max().strftime("%Y-%m-%d"))
+    meta.update(extra or {})
+    with open(os.path.join(model_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    return meta
+
+def load_model(model_dir=MODEL_DIR):
+    """Charge (modèle, métadonnées). FileNotFoundError si aucun artefact"""
+    chemin = os.path.join(model_dir, MODEL_FILE)
+    if not os.path.exists(chemin):
+        raise FileNotFoundError(f"Aucun modèle dans {model_dir} (lancer `python -m src.training`)")
+    model = XGBRegressor()
+    model.load_model(chemin)
+
+    meta_path = os.path.join(model_dir, META_FILE)
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    meta.setdefault("version", file_digest(chemin))
+    return model, meta
+
+# --- CACHE D'ARTEFACTS (ADRESSÉ PAR CONTENU) ---
+
+def _empreinte(*morceaux):
+    h = hashlib.sha1()
+    for m in morceaux:
+        h.update(m if isinstance(m, bytes) else json.dumps(m, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+def _matrice(df):
+    """Données d'entraînement (features + cible) en float64, pour l'empreinte.
+
+    Le premier jour n'a pas de veille : son patients_hier (moyenne de tout l'historique)
+    change à chaque ajout de jours. Il est exclu de l'empreinte pour qu'un historique
+    prolongé soit bien reconnu comme tel.
+    """
+    M = np.ascontiguousarray(df[FEATURES + [TARGET]].to_numpy(dtype=np.float64))
+    if len(M):
+        M[0, FEATURES.index('patients_hier')] = np.nan
+    return M
+
+def data_fingerprint(df, n_lignes=None):
+    """Empreinte des `n_lignes` premières lignes (toutes par défaut) et de leurs dates"""
+    n = len(df) if n_lignes is None else n_lignes
+    dates = df['date'].iloc[:n].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    return _empreinte(_matrice(df.iloc[:n]).tobytes(), np.ascontiguousarray(dates).tobytes())
+
+def params_fingerprint(params=None):
+    return _empreinte({**DEFAULT_PARAMS, **(params or {})}, FEATURES)
+
+def _artifacts(cache_dir):
+    """Métadonnées de tous les artefacts du cache"""
+    if not os.path.isdir(cache_dir):
+        return []
+    metas = []
+    for cle in os.listdir(cache_dir):
+        chemin = os.path.join(cache_dir, cle, ARTIFACT_META)
+        if os.path.exists(chemin):
+            with open(chemin, encoding="utf-8") as f:
+                metas.append(json.load(f))
+    return metas
+
+def _load_artifact(cache_dir, cle):
+    model = XGBRegressor()
+    model.load_model(os.path.join(cache_dir, cle, ARTIFACT_MODEL))
+    return model
+
+def _store_artifact(cache_dir, model, meta):
+    """Écrit l'artefact dans un dossier temporaire puis le renomme (jamais à moitié écrit)"""
+    final = os.path.join(cache_dir, meta["cle"])
+    tmp = f"{final}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    model.save_model(os.path.join(tmp, ARTIFACT_MODEL))
+    with open(os.path.join(tmp, ARTIFACT_META), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+    if os.path.exists(final):
+        shutil.rmtree(final)
+    os.replace(tmp, final)
+
+def _parent(df, metas, p_hash):
+    """Artefact le plus long dont les données sont un préfixe strict de `df`"""
+    candidats = sorted((m for m in metas if m["params_hash"] == p_hash and m["nb_lignes"] < len(df)
+                        and m.get("continuations", 0) < MAX_CONTINUATIONS),
+                       key=lambda m: m["nb_lignes"], reverse=True)
+    for m in candidats:
+        if data_fingerprint(df, m["nb_lignes"]) == m["data_hash"]:
+            return m
+    return None
+
+def fit_cached(df, params=None, cache_dir=os.path.join(MODEL_DIR, ARTIFACTS_SUBDIR), warm_start=True):
+    """Modèle entraîné sur `df`, via le cache d'artefacts. Retourne (modèle, méta).
+
+    méta["statut"] : "cache" (aucun calcul), "continuation" (boosting poursuivi sur
+    un artefact dont les données sont un préfixe de df) ou "complet".
+    La clé d'un artefact dépend de sa lignée : entraînement complet (données, paramètres)
+    ou continuation (données, paramètres, artefact parent). Sans warm_start, seul un
+    entraînement complet est servi, jamais une continuation.
+    """
+    t0 = time.perf_counter()
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    d_hash, p_hash = data_fingerprint(df), params_fingerprint(params)
+
+    def _en_cache(cle, complet):
+        chemin = os.path.join(cache_dir, cle, ARTIFACT_META)
+        if not os.path.exists(chemin):
+            return None
+        with open(chemin, encoding="utf-8") as f:
+            meta = json.load(f)
+        # Anciens caches : une continuation pouvait occuper la clé d'un entraînement complet
+        if complet and meta.get("continuations", 0):
+            return None
+        return _load_artifact(cache_dir, cle), {**meta, "statut": "cache", "duree": time.perf_counter() - t0}
+
+    # Un entraînement complet déjà en cache est toujours préféré à une continuation
+    cle = _empreinte(d_hash, p_hash)
+    trouve = _en_cache(cle, complet=True)
+    if trouve is not None:
+        return trouve
+
+    parent = _parent(df, _artifacts(cache_dir), p_hash) if warm_start else None
+    if parent is not None:
+        cle = _empreinte(d_hash, p_hash, parent["cle"])
+        trouve = _en_cache(cle, complet=False)
+        if trouve is not None:
+            return trouve
+        # Quelques arbres de plus, ajustés sur les résidus du modèle parent (tout l'historique)
+        model = XGBRegressor(**{**params, "n_estimators": CONTINUATION_ARBRES})
+        with instrumentation.span("entrainement.continuation", len(df)):
+            model.fit(df[FEATURES], df[TARGET], xgb_model=_load_artifact(cache_dir, parent["cle"]).get_booster())
+        statut, continuations = "continuation", parent.get("continuations", 0) + 1
+    else:
+        model = train_model(df, params)
+        statut, continuations = "complet", 0
+
+    meta = {
+        "cle": cle, "data_hash": d_hash, "params_hash": p_hash, "params": params,
+        "nb_lignes": int(len(df)), "dernier_jour": df['date'].max().strftime("%Y-%m-%d"),
+        "parent": None if parent is None else parent["cle"], "continuations": continuations,
+        "cree_le": pd.Timestamp.now().isoformat(timespec="seconds"),
+    }
+    _store_artifact(cache_dir, model, meta)
+    return model, {**meta, "statut": statut, "duree": time.perf_counter() - t0}
+
+def refresh_model(df, model_dir=MODEL_DIR, params=None, warm_start=True):
+    """Met à jour le modèle servi (model_dir) via le cache d'artefacts.
+
+    Le modèle servi n'est réécrit que s'il change : un cache hit ne déclenche pas de
+    rechargement du service de prévision.
+    """
+    model, meta = fit_cached(df, params, os.path.join(model_dir, ARTIFACTS_SUBDIR), warm_start)
+    meta_path = os.path.join(model_dir, META_FILE)
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            if json.load(f).get("artefact") == meta["cle"]:
+                return meta
+    servi = save_model(model, model_dir, df_train=df, params=meta["params"],
+                       extra={"artefact": meta["cle"], "continuations": meta["continuations"]})
+    return {**meta, "version": servi["version"]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entraîne et sauvegarde le modèle de flux")
+    parser.add_argument("--train-path", default=TRAIN_PATH)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--site", help="Entraîne le modèle d'un site (shard data/processed/sites/<site>)")
+    parser.add_argument("--full", action="store_true", help="Entraînement complet (pas de poursuite du boosting)")
+    args = parser.parse_args()
+    if args.site:
+        args.train_path, args.model_dir = site_paths(args.site)
+
+    df = load_train_data(args.train_path)
+    meta = refresh_model(df, args.model_dir, warm_start=not args.full)
+    print(f"✅ Modèle {meta['cle']} ({meta['statut']}, {meta['duree']:.2f}s) servi depuis {args.model_dir}/ "
+          f"({meta['nb_lignes']} jours)")
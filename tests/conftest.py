@@ -0,0 +1,18 @@
+import os
+import sys
+import pytest
+
+# Accès aux modules du projet (src/) quand on lance `python -m pytest tests`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import data_generator, preprocessing
+
+@pytest.fixture(scope="session")
+def donnees_brutes():
+    """Tables patients / RH / matériel synthétiques (2 ans, graine fixe)"""
+    return data_generator.generate_period("2024-01-01", "2025-12-31", seed=42)
+
+@pytest.fixture(scope="session")
+def df_train(donnees_brutes):
+    """Dataset journalier synthétique"""
+    return preprocessing.finalize(preprocessing.aggregate_days(*donnees_brutes))
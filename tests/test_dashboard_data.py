@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import pandas as pd
+from src import dashboard_data, forecast_service, service_forecast, training
+
+def test_chemins_du_modele():
+    """Les chemins recopiés dans dashboard_data suivent ceux de training / service_forecast"""
+    assert dashboard_data.MODEL_DIR == forecast_service.MODEL_DIR
+    assert dashboard_data.MODEL_FILES == [training.MODEL_FILE, os.path.join(
+        os.path.relpath(service_forecast.SERVICES_MODEL_DIR, training.MODEL_DIR), service_forecast.META_FILE)]
+    assert dashboard_data.ALERTES_FILE == os.path.basename(forecast_service.ALERTES_PATH)
+    assert os.path.join(dashboard_data.PROCESSED_DIR, dashboard_data.TRAIN_FILE) == forecast_service.TRAIN_PATH
+
+def test_service_precalcule(tmp_path, monkeypatch, df_train):
+    """Le service de repli sert les mêmes prévisions et le même dataset que ForecastService sans modèle"""
+    alertes = tmp_path / "sites" / "nord" / dashboard_data.ALERTES_FILE
+    train = alertes.parent / dashboard_data.TRAIN_FILE
+    os.makedirs(alertes.parent)
+    df_train.to_csv(train, index=False)
+    dates = pd.date_range("2025-01-01", periods=30, freq="D")
+    pd.DataFrame({"date": dates, "flux_reel": range(30), "flux_predit": range(100, 130),
+                  "autre": 0}).to_csv(alertes, index=False)
+    monkeypatch.setattr(dashboard_data, "PROCESSED_DIR", str(tmp_path))
+    repli = dashboard_data.PrecomputedService("nord")
+    complet = forecast_service.ForecastService(model_dir=str(tmp_path / "absent"), train_path=str(train),
+                                               alertes_path=str(alertes), services_path=str(tmp_path / "absent_services.csv"))
+    assert repli.source == complet.source == "precalcule"
+    pd.testing.assert_frame_equal(repli.hist, complet.hist)
+    pd.testing.assert_frame_equal(repli.predict_range("2025-01-05", "2025-01-12"),
+                                  complet.predict_range("2025-01-05", "2025-01-12"))
+
+def test_import_sans_xgboost():
+    """La couche de données du dashboard n'importe pas xgboost"""
+    racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import sys; from src import dashboard_data; sys.exit('xgboost' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=racine).returncode == 0
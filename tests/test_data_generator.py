@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+from src import data_generator
+
+DEBUT, FIN = "2024-01-20", "2024-04-10"    # Quatre blocs mensuels, dont deux incomplets
+
+def _periode(seed, n_workers=1):
+    return data_generator.generate_period(DEBUT, FIN, seed=seed, n_workers=n_workers)
+
+@pytest.fixture(scope="module")
+def reference():
+    return _periode(seed=7)
+
+def test_independant_du_nombre_de_workers(reference):
+    """À graine égale, sortie identique bit à bit en séquentiel et en pool de processus"""
+    for attendu, obtenu in zip(reference, _periode(seed=7, n_workers=3)):
+        pd.testing.assert_frame_equal(obtenu, attendu, check_exact=True)
+
+def test_graine(reference):
+    """Même graine, même sortie ; autre graine, autre sortie"""
+    for attendu, obtenu in zip(reference, _periode(seed=7)):
+        pd.testing.assert_frame_equal(obtenu, attendu, check_exact=True)
+    autre = _periode(seed=8)
+    assert not reference[0].equals(autre[0])
+
+def test_boucle_sans_graine():
+    """Le mode boucle (non reproductible) refuse une graine au lieu de l'ignorer"""
+    with pytest.raises(ValueError, match="graine"):
+        data_generator.generate_grand_dataset(mode="boucle", seed=42)
@@ -0,0 +1,68 @@
+import sys
+import threading
+import time
+import pandas as pd
+from src import forecast_service, training
+
+def _service(tmp_path, df):
+    model_dir, train_path = tmp_path / "models", tmp_path / "train.csv"
+    training.save_model(training.train_model(df, {"n_estimators": 20}), str(model_dir), df_train=df)
+    df.to_csv(train_path, index=False)
+    return forecast_service.ForecastService(model_dir=str(model_dir), train_path=str(train_path),
+                                            alertes_path=str(tmp_path / "absent.csv"),
+                                            services_path=str(tmp_path / "absent_services.csv"))
+
+def _en_parallele(fonction, n_threads=8):
+    """Lance fonction(i) dans n_threads threads (bascules fréquentes) ; erreurs levées"""
+    erreurs, depart = [], threading.Barrier(n_threads)
+    intervalle = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    def tache(i):
+        depart.wait()
+        try:
+            fonction(i)
+        except Exception as e:
+            erreurs.append(e)
+    threads = [threading.Thread(target=tache, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    sys.setswitchinterval(intervalle)
+    return erreurs
+
+def test_ttl_cache_concurrent():
+    # Horloge qui rend la main aux autres threads entre lecture et mise à jour de l'entrée
+    def horloge():
+        time.sleep(0)
+        return time.monotonic()
+    cache = forecast_service.TTLCache(maxsize=4, ttl=60, clock=horloge)
+
+    def tache(i):
+        for k in range(5000):
+            cle = (i * 7 + k) % 6
+            trouve, valeur = cache.get(cle)
+            assert not trouve or valeur == cle
+            cache.put(cle, cle)
+            if k % 50 == 0:
+                cache.clear()
+
+    assert _en_parallele(tache) == []
+    assert len(cache) <= 4
+
+def test_service_concurrent_predictions(tmp_path, df_train):
+    service = _service(tmp_path, df_train)
+    attendu = {m: service.predict_range(f"2025-{m:02d}-01", f"2025-{m:02d}-28").copy() for m in range(1, 7)}
+    service.cache.clear()
+
+    def tache(i):
+        for k in range(30):
+            m = (i + k) % 6 + 1
+            if k % 10 == 0:
+                service.refresh(force=True)
+            preds = service.predict_range(f"2025-{m:02d}-01", f"2025-{m:02d}-28")
+            pd.testing.assert_frame_equal(preds, attendu[m])
+
+    assert _en_parallele(tache) == []
+    # Toutes les entrées en cache sont indexées par la version courante
+    assert all(cle[-1] == service.version for cle in service.cache._data)
@@ -0,0 +1,47 @@
+import threading
+from src import instrumentation
+
+def test_collect_isole_le_thread():
+    """collect() n'active que le thread appelant et lui réserve ses spans"""
+    instrumentation.reset()
+    pret, fin, resultats = threading.Barrier(2, timeout=5), threading.Event(), {}
+
+    def session():
+        collecte = instrumentation.collect()
+        pret.wait()
+        with instrumentation.span("session", lignes=3):
+            pass
+        fin.wait(5)
+        resultats["session"] = instrumentation.spans(collecte)
+
+    def autre():
+        pret.wait()
+        resultats["autre_actif"] = instrumentation.enabled()
+        with instrumentation.span("autre"):
+            pass
+        fin.set()
+
+    threads = [threading.Thread(target=session), threading.Thread(target=autre)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert resultats["session"]["nom"].tolist() == ["session"]
+    assert resultats["session"]["lignes"].tolist() == [3]
+    assert resultats["autre_actif"] is instrumentation.ACTIF_PAR_DEFAUT
+    assert "session" not in instrumentation.spans()["nom"].values
+
+def test_span_ferme_sur_exception():
+    """Un span interrompu par une exception est enregistré et ne reste pas parent des suivants"""
+    collecte = instrumentation.collect()
+    try:
+        with instrumentation.span("interrompu"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    with instrumentation.span("suivant"):
+        pass
+    instrumentation.collect(False)
+    etapes = instrumentation.spans(collecte)
+    assert etapes["nom"].tolist() == ["interrompu", "suivant"]
+    assert etapes["parent"].isna().all()
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+from src import preprocessing, storage
+from src.data_generator import RAW_TABLES
+
+COUPURE = pd.Timestamp("2025-06-30")
+
+def _ecrire(donnees, raw_dir, fmt, masque, append):
+    for df, nom in zip(donnees, RAW_TABLES):
+        dates = df[storage.DATE_COLUMNS[nom]]
+        storage.write_table(df[masque(dates.dt.normalize())], nom, str(raw_dir), fmt=fmt, append=append)
+
+def _lire(processed_dir):
+    return pd.read_csv(processed_dir / preprocessing.TRAIN_FILE, parse_dates=["date"])
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_incremental_egal_complet(tmp_path, donnees_brutes, fmt):
+    """Jours ajoutés après le watermark : même dataset qu'un recalcul complet"""
+    raw, incr, complet = tmp_path / "raw", tmp_path / "incremental", tmp_path / "complet"
+    _ecrire(donnees_brutes, raw, fmt, lambda d: d <= COUPURE, append=False)
+    preprocessing.run_incremental(str(raw), str(incr))
+    assert preprocessing.read_watermark(str(incr))["watermark"] == "2025-06-30"
+
+    _ecrire(donnees_brutes, raw, fmt, lambda d: d > COUPURE, append=True)
+    preprocessing.run_incremental(str(raw), str(incr))
+    preprocessing.run_full(str(raw), str(complet))
+    pd.testing.assert_frame_equal(_lire(incr), _lire(complet))
+    assert preprocessing.read_watermark(str(incr)) == preprocessing.read_watermark(str(complet))
+
+def test_incremental_sans_nouveau_jour(tmp_path, donnees_brutes):
+    """Aucune ligne après le watermark : dataset et watermark inchangés"""
+    raw, processed = tmp_path / "raw", tmp_path / "processed"
+    _ecrire(donnees_brutes, raw, "csv", lambda d: d <= COUPURE, append=False)
+    attendu = preprocessing.run_full(str(raw), str(processed))
+    etat = preprocessing.read_watermark(str(processed))
+
+    resultat = preprocessing.run_incremental(str(raw), str(processed))
+    pd.testing.assert_frame_equal(resultat, attendu, check_dtype=False)
+    pd.testing.assert_frame_equal(_lire(processed), attendu, check_dtype=False)
+    assert preprocessing.read_watermark(str(processed)) == etat
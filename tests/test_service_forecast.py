@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+from src import preprocessing, service_forecast
+
+@pytest.fixture(scope="module")
+def df_services(donnees_brutes, tmp_path_factory):
+    chemin = tmp_path_factory.mktemp("services") / preprocessing.SERVICES_FILE
+    preprocessing.finalize_services(preprocessing.aggregate_service_days(*donnees_brutes)).to_csv(chemin, index=False)
+    return service_forecast.load_service_data(chemin)
+
+@pytest.fixture(scope="module")
+def modeles(df_services):
+    return service_forecast.train_service_models(df_services, {"n_estimators": 10})
+
+def test_prevision_alignee_par_nom(df_services, modeles):
+    """Ni l'ordre des modèles ni l'ordre des catégories ne changent la prévision d'un service"""
+    reference = service_forecast.predict_services(modeles, df_services, "2025-12-20", "2026-01-10")
+    inverses = dict(reversed(list(modeles.items())))
+    melange = df_services.assign(service=df_services['service'].cat.reorder_categories(
+        df_services['service'].cat.categories[::-1]))
+    for m, df in ((inverses, df_services), (modeles, melange)):
+        resultat = service_forecast.predict_services(m, df, "2025-12-20", "2026-01-10")
+        pd.testing.assert_frame_equal(resultat[reference.columns], reference)
+
+def test_services_incoherents(df_services, modeles):
+    incomplet = dict(list(modeles.items())[1:])
+    with pytest.raises(ValueError, match="sans modèle"):
+        service_forecast.predict_services(incomplet, df_services, "2025-12-20", "2026-01-10")
+    with pytest.raises(ValueError, match="sans modèle"):
+        service_forecast.service_predictor(incomplet, list(modeles))
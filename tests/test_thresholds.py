@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.thresholds import QuantileSketch
+
+QUANTILES = [0.75, 0.90, 0.97]
+
+@pytest.mark.parametrize("graine", range(200))
+def test_quantiles_identiques_a_pandas(graine):
+    """Mêmes quantiles que pandas (interpolation linéaire), bit à bit"""
+    rng = np.random.default_rng(graine)
+    n = int(rng.integers(1, 2000))
+    entiers = rng.integers(0, int(rng.integers(1, 600)), n)
+    # Flottants à valeur entière, avec des NaN (ignorés comme par pandas)
+    flottants = np.where(rng.random(n) < 0.05, np.nan, rng.poisson(300, n).astype(float))
+    for valeurs in (entiers, flottants):
+        sketch = QuantileSketch()
+        for morceau in np.array_split(valeurs, int(rng.integers(1, 5))):
+            sketch.update(morceau)
+        serie = pd.Series(valeurs)
+        for q in QUANTILES:
+            np.testing.assert_equal(sketch.quantile(q), serie.quantile(q))
+
+def test_valeurs_non_entieres_refusees():
+    with pytest.raises(ValueError):
+        QuantileSketch().update([1.5, 2.0])
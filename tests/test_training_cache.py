@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+from src import training
+
+PARAMS = {"n_estimators": 20}
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_cache_hit_and_continuation(tmp_path, df_train):
+    cache = str(tmp_path / "artifacts")
+    _, meta = training.fit_cached(df_train.iloc[:600], PARAMS, cache)
+    assert meta["statut"] == "complet"
+    assert training.fit_cached(df_train.iloc[:600], PARAMS, cache)[1]["statut"] == "cache"
+
+    _, suite = training.fit_cached(df_train, PARAMS, cache)
+    assert suite["statut"] == "continuation" and suite["parent"] == meta["cle"]
+    assert training.fit_cached(df_train, PARAMS, cache)[1]["cle"] == suite["cle"]
+
+def test_full_fit_never_served_from_continuation(tmp_path, df_train):
+    cache = str(tmp_path / "artifacts")
+    training.fit_cached(df_train.iloc[:600], PARAMS, cache)
+    _, suite = training.fit_cached(df_train, PARAMS, cache)
+    assert suite["statut"] == "continuation"
+
+    _, complet = training.fit_cached(df_train, PARAMS, cache, warm_start=False)
+    assert complet["statut"] == "complet" and complet["continuations"] == 0
+    assert complet["cle"] != suite["cle"]
+    # Le complet est désormais en cache, et préféré à la continuation
+    assert training.fit_cached(df_train, PARAMS, cache, warm_start=False)[1]["statut"] == "cache"
+    assert training.fit_cached(df_train, PARAMS, cache)[1]["cle"] == complet["cle"]
+
+def test_cli_full_retrains_after_continuation(tmp_path, df_train):
+    train_path, model_dir = str(tmp_path / "train.csv"), str(tmp_path / "models")
+    commande = [sys.executable, "-m", "src.training", "--train-path", train_path, "--model-dir", model_dir]
+
+    def meta_servie():
+        with open(os.path.join(model_dir, training.META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+    df_train.iloc[:600].to_csv(train_path, index=False)
+    subprocess.run(commande, cwd=RACINE, check=True, capture_output=True)
+    df_train.to_csv(train_path, index=False)
+    subprocess.run(commande, cwd=RACINE, check=True, capture_output=True)
+    assert meta_servie()["continuations"] == 1
+
+    sortie = subprocess.run(commande + ["--full"], cwd=RACINE, check=True, capture_output=True, text=True).stdout
+    assert "complet" in sortie
+    assert meta_servie()["continuations"] == 0